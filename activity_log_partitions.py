@@ -0,0 +1,169 @@
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime
+from dotenv import load_dotenv
+from sqlalchemy import text
+from db_pool import engine
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# activity_logs is range-partitioned by month on "timestamp" (see the Alembic migration)
+ACTIVITY_LOG_PARTITIONS_AHEAD = int(os.getenv("ACTIVITY_LOG_PARTITIONS_AHEAD", "3"))  # Future months kept ready
+# Opt-in: with the default of 0 nothing is ever dropped
+ACTIVITY_LOG_RETENTION_MONTHS = int(os.getenv("ACTIVITY_LOG_RETENTION_MONTHS", "0"))
+ACTIVITY_LOG_MAINTENANCE_SECONDS = float(os.getenv("ACTIVITY_LOG_MAINTENANCE_SECONDS", "3600"))
+PARTITION_LOCK_KEY = int(os.getenv("ACTIVITY_LOG_PARTITION_LOCK_KEY", "720302"))
+
+PARENT_TABLE = "activity_logs"
+PARTITION_NAME = re.compile(r"^activity_logs_y(\d{4})m(\d{2})$")
+# Catches rows outside every monthly partition (e.g. maintenance fell behind) instead of failing the insert
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+# Table comment set on partitions detached for retention. Only tables carrying it are
+# dropped, so a monthly table an operator detached and kept (or whose comment they
+# changed) is left alone.
+DETACHED_MARKER = "detached for retention by activity_log_partitions"
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    month_index = day.year * 12 + (day.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_bounds(month: date) -> str:
+    return f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+
+
+def create_partition_sql(month: date) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} {partition_bounds(month)}"
+
+
+# Create the month's partition. Rows for it that already landed in the default partition
+# would make a plain CREATE fail, so they are moved into a new table that is then attached.
+def create_partition(connection, month: date):
+    in_range = {"start": month, "end": month_start(month, 1)}
+    misplaced = connection.execute(text(
+        f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end LIMIT 1"
+    ), in_range).first()
+    if misplaced is None:
+        connection.execute(text(create_partition_sql(month)))
+        return
+    name = partition_name(month)
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), in_range)
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {partition_bounds(month)}"))
+
+
+def list_partitions(connection) -> list:
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent"
+    ), {"parent": PARENT_TABLE}).scalars().all()
+    return sorted(rows)
+
+
+# Monthly tables detached by run_maintenance and not yet dropped, e.g. because the
+# process stopped in between. Tables without DETACHED_MARKER are never listed.
+def list_detached(connection) -> list:
+    rows = connection.execute(text(
+        "SELECT relname FROM pg_class "
+        "WHERE relkind = 'r' AND NOT relispartition AND relname LIKE :prefix AND pg_table_is_visible(oid) "
+        "AND obj_description(oid, 'pg_class') = :marker"
+    ), {"prefix": f"{PARENT_TABLE}_y%", "marker": DETACHED_MARKER}).scalars().all()
+    return sorted(name for name in rows if PARTITION_NAME.match(name))
+
+
+def partition_month(name: str):
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+# Create the default, current and upcoming monthly partitions and drop those past
+# retention. Serialised with an advisory lock so concurrent workers don't race on DDL.
+def run_maintenance(today: date = None) -> dict:
+    today = today or datetime.utcnow().date()
+    current = month_start(today)
+    created, dropped, expired = [], [], []
+
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        existing = set(list_partitions(connection))
+        if DEFAULT_PARTITION not in existing:
+            connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+            created.append(DEFAULT_PARTITION)
+
+        for offset in range(ACTIVITY_LOG_PARTITIONS_AHEAD + 1):
+            month = month_start(current, offset)
+            if partition_name(month) not in existing:
+                create_partition(connection, month)
+                created.append(partition_name(month))
+
+        if ACTIVITY_LOG_RETENTION_MONTHS > 0:
+            oldest_kept = month_start(current, -ACTIVITY_LOG_RETENTION_MONTHS)
+            for name in sorted(existing):
+                month = partition_month(name)
+                if month is not None and month < oldest_kept:
+                    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                    connection.execute(text(f"COMMENT ON TABLE {name} IS '{DETACHED_MARKER}'"))
+            expired = [name for name in list_detached(connection) if partition_month(name) < oldest_kept]
+
+    # DETACH holds an ACCESS EXCLUSIVE lock on the parent until its transaction commits, so
+    # the drops run afterwards, each in its own transaction that only locks the old table
+    for name in expired:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        dropped.append(name)
+
+    return {"created": created, "dropped": dropped}
+
+
+class PartitionMaintainer:
+    def __init__(self, interval_seconds: float = ACTIVITY_LOG_MAINTENANCE_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._thread = None
+        self._stopping = threading.Event()
+        self.last_run = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                result = run_maintenance()
+                self.last_run = datetime.utcnow()
+                if result["created"] or result["dropped"]:
+                    logger.info("Activity log partitions changed", extra=result)
+            except Exception:
+                logger.exception("Error maintaining activity log partitions")
+            self._stopping.wait(self.interval_seconds)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-log-partitions", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+
+partition_maintainer = PartitionMaintainer()
+
+
+# Run one maintenance pass from the command line (e.g. from cron): `python activity_log_partitions.py`
+if __name__ == "__main__":
+    print(run_maintenance())
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from models import ActivityLog
+from database import SessionLocal
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_LOG_FLUSH_SIZE = int(os.getenv("ACTIVITY_LOG_FLUSH_SIZE", "200"))  # Flush once this many rows are buffered
+ACTIVITY_LOG_FLUSH_SECONDS = float(os.getenv("ACTIVITY_LOG_FLUSH_SECONDS", "2"))  # ...or this long after the first one
+ACTIVITY_LOG_MAX_BUFFER = int(os.getenv("ACTIVITY_LOG_MAX_BUFFER", "10000"))
+# What to do when the buffer is full: "drop" the new row, or "block" the caller until there is room.
+# Callers on the event loop (async handlers such as login) never block; their row is dropped.
+ACTIVITY_LOG_OVERFLOW_POLICY = os.getenv("ACTIVITY_LOG_OVERFLOW_POLICY", "drop").lower()
+ACTIVITY_LOG_BLOCK_TIMEOUT_SECONDS = float(os.getenv("ACTIVITY_LOG_BLOCK_TIMEOUT_SECONDS", "1"))
+
+
+# Buffers activity log rows in memory and writes them with one multi-row INSERT
+# per flush, instead of a commit per log line on the request path.
+class ActivityLogSink:
+    def __init__(self, flush_size: int = ACTIVITY_LOG_FLUSH_SIZE, flush_seconds: float = ACTIVITY_LOG_FLUSH_SECONDS,
+                 max_buffer: int = ACTIVITY_LOG_MAX_BUFFER, overflow_policy: str = ACTIVITY_LOG_OVERFLOW_POLICY):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self.overflow_policy = overflow_policy
+        self._buffer = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # Only one flush writes at a time
+        self._thread = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0  # Rows the database refused (e.g. a foreign key violation), logged and dropped
+        self.flush_failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def add(self, user_id: int, action: str, details: str = None) -> bool:
+        row = {"user_id": user_id, "action": action, "details": details, "timestamp": datetime.utcnow()}
+        with self._condition:
+            if len(self._buffer) >= self.max_buffer:
+                if self.overflow_policy != "block" or _on_event_loop() or not self._condition.wait_for(
+                        lambda: len(self._buffer) < self.max_buffer, timeout=ACTIVITY_LOG_BLOCK_TIMEOUT_SECONDS):
+                    self.dropped += 1
+                    return False
+            self._buffer.append(row)
+            if len(self._buffer) >= self.flush_size:
+                self._condition.notify_all()
+        return True
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._condition:
+                rows, self._buffer = self._buffer, []
+                self._condition.notify_all()  # Wake callers blocked on a full buffer
+            if not rows:
+                return 0
+
+            db = SessionLocal()
+            try:
+                db.execute(insert(ActivityLog), rows)  # executemany -> multi-row INSERT
+                db.commit()
+                self.written += len(rows)
+                return len(rows)
+            except Exception as e:
+                db.rollback()
+                self.flush_failures += 1
+                logger.error("Error flushing activity logs: %s", e, extra={"rows": len(rows)})
+            finally:
+                db.close()
+            return self._write_each(rows)
+
+    # After a failed batch, write the rows one at a time, each in a savepoint, so a row
+    # the database refuses is dropped instead of failing every later flush. Any other
+    # error (e.g. the database is down) puts the remaining rows back for the next flush.
+    def _write_each(self, rows: list) -> int:
+        refused = set()  # id() of the rows the database refused
+        db = SessionLocal()
+        try:
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(ActivityLog), [row])
+                except (DataError, IntegrityError) as e:
+                    refused.add(id(row))
+                    self.rejected += 1
+                    logger.error("Dropping activity log row the database refused: %s", e.orig,
+                                 extra={"user_id": row["user_id"], "action": row["action"]})
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._requeue([row for row in rows if id(row) not in refused])
+            return 0
+        finally:
+            db.close()
+        self.written += len(rows) - len(refused)
+        return len(rows) - len(refused)
+
+    def _requeue(self, rows: list):
+        # Put rows back in front for the next attempt, keeping the buffer bounded
+        with self._condition:
+            room = max(0, self.max_buffer - len(self._buffer))
+            self.dropped += max(0, len(rows) - room)
+            self._buffer = rows[:room] + self._buffer
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopping or len(self._buffer) >= self.flush_size,
+                    timeout=self.flush_seconds
+                )
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                break
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="activity-log-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        # Flush whatever is still buffered before the process exits
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._condition:
+            buffered = len(self._buffer)
+        return {
+            "buffered": buffered,
+            "max_buffer": self.max_buffer,
+            "overflow_policy": self.overflow_policy,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flush_failures": self.flush_failures,
+        }
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+activity_log_sink = ActivityLogSink()
+
+
+def start_activity_log_sink():
+    activity_log_sink.start()
+
+
+def stop_activity_log_sink():
+    activity_log_sink.stop()
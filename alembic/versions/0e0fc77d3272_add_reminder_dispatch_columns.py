@@ -0,0 +1,42 @@
+"""add reminder dispatch columns
+
+Revision ID: 0e0fc77d3272
+Revises: b793df08bb61
+Create Date: 2026-10-18 09:12:41.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0e0fc77d3272'
+down_revision: Union[str, None] = 'b793df08bb61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bookings', sa.Column('reminder_sent_at', sa.DateTime(), nullable=True))
+
+    # Reminders that were due before this migration belonged to the old in-memory
+    # scheduler; don't let the dispatcher send them all at once after deploy.
+    op.execute("UPDATE bookings SET reminder_sent_at = reminder_time WHERE reminder_time < now()")
+
+    # The dispatcher only ever scans unsent reminders in reminder_time order
+    op.create_index(
+        'ix_bookings_pending_reminder_time',
+        'bookings',
+        ['reminder_time'],
+        unique=False,
+        postgresql_where=sa.text('reminder_sent_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_pending_reminder_time', table_name='bookings')
+    op.drop_column('bookings', 'reminder_sent_at')
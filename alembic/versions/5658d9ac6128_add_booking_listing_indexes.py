@@ -0,0 +1,30 @@
+"""add booking listing indexes
+
+Revision ID: 5658d9ac6128
+Revises: 0e0fc77d3272
+Create Date: 2026-10-18 10:03:17.204918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5658d9ac6128'
+down_revision: Union[str, None] = '0e0fc77d3272'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_bookings_user_id_booking_date_id', 'bookings', ['user_id', 'booking_date', 'id'], unique=False)
+    op.create_index('ix_bookings_provider_id_booking_date_id', 'bookings', ['provider_id', 'booking_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_provider_id_booking_date_id', table_name='bookings')
+    op.drop_index('ix_bookings_user_id_booking_date_id', table_name='bookings')
@@ -0,0 +1,33 @@
+"""bookings status not null
+
+Revision ID: 7a3d5c1f9e20
+Revises: c4f1e8a92b3d
+Create Date: 2026-10-18 21:58:47.201946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3d5c1f9e20'
+down_revision: Union[str, None] = 'c4f1e8a92b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ex_bookings_provider_no_overlap's "status NOT IN ('cancelled', 'rejected')" is NULL, not
+    # true, for a NULL status, so such bookings were never checked for overlaps. Treating them
+    # as pending brings them under the constraint; this fails if one overlaps an active booking,
+    # which then has to be cancelled first.
+    op.execute("UPDATE bookings SET status = 'pending' WHERE status IS NULL")
+    op.alter_column('bookings', 'status', existing_type=sa.String(), nullable=False, server_default='pending')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('bookings', 'status', existing_type=sa.String(), nullable=True, server_default=None)
@@ -0,0 +1,65 @@
+"""add provider availability
+
+Revision ID: 895f26120152
+Revises: 5b07b8e15c1e
+Create Date: 2026-10-18 18:02:37.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '895f26120152'
+down_revision: Union[str, None] = '5b07b8e15c1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('services', sa.Column('duration_minutes', sa.Integer(), server_default='60', nullable=False))
+    op.add_column('bookings', sa.Column('booking_end', sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE bookings b SET booking_end = b.booking_date + make_interval(mins => s.duration_minutes) "
+        "FROM services s WHERE s.id = b.service_id AND b.booking_date IS NOT NULL"
+    )
+
+    op.create_table(
+        'provider_availability',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider_id', sa.Integer(), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=True),
+        sa.Column('weekday', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('slot_minutes', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.CheckConstraint('weekday BETWEEN 0 AND 6', name='ck_provider_availability_weekday'),
+        sa.CheckConstraint('start_time < end_time', name='ck_provider_availability_hours'),
+    )
+    op.create_index(
+        'ix_provider_availability_provider_id_weekday', 'provider_availability', ['provider_id', 'weekday'], unique=False
+    )
+
+    # btree_gist lets the GiST index combine provider_id equality with range overlap.
+    # Existing overlapping active bookings must be cancelled before this constraint can be created.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        "ALTER TABLE bookings ADD CONSTRAINT ex_bookings_provider_no_overlap "
+        "EXCLUDE USING gist (provider_id WITH =, tsrange(booking_date, booking_end) WITH &&) "
+        "WHERE (booking_end IS NOT NULL AND status NOT IN ('cancelled', 'rejected'))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE bookings DROP CONSTRAINT ex_bookings_provider_no_overlap")
+    op.drop_index('ix_provider_availability_provider_id_weekday', table_name='provider_availability')
+    op.drop_table('provider_availability')
+    op.drop_column('bookings', 'booking_end')
+    op.drop_column('services', 'duration_minutes')
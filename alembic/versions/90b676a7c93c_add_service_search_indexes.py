@@ -0,0 +1,44 @@
+"""add service search indexes
+
+Revision ID: 90b676a7c93c
+Revises: 5658d9ac6128
+Create Date: 2026-10-18 10:41:52.663071
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90b676a7c93c'
+down_revision: Union[str, None] = '5658d9ac6128'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('services', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_services_search_vector', 'services', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_services_price_id', 'services', ['price', 'id'], unique=False)
+    op.create_index('ix_services_category', 'services', ['category'], unique=False)
+    op.create_index('ix_services_career_type_id', 'services', ['career_type_id'], unique=False)
+    op.create_index('ix_services_user_id', 'services', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_services_user_id', table_name='services')
+    op.drop_index('ix_services_career_type_id', table_name='services')
+    op.drop_index('ix_services_category', table_name='services')
+    op.drop_index('ix_services_price_id', table_name='services')
+    op.drop_index('ix_services_search_vector', table_name='services')
+    op.drop_column('services', 'search_vector')
@@ -0,0 +1,103 @@
+"""partition activity_logs by month
+
+Revision ID: b11dbbf36e81
+Revises: 90b676a7c93c
+Create Date: 2026-10-18 11:27:05.390142
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b11dbbf36e81'
+down_revision: Union[str, None] = '90b676a7c93c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created ahead of today; activity_log_partitions.py keeps this window rolling afterwards
+PARTITIONS_AHEAD = 3
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    month_index = day.year * 12 + (day.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # Keep the old table (and its id sequence) aside while the partitioned one is built
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_legacy")
+    op.execute("ALTER INDEX ix_activity_logs_id RENAME TO ix_activity_logs_legacy_id")
+    op.execute("ALTER TABLE activity_logs_legacy RENAME CONSTRAINT activity_logs_pkey TO activity_logs_legacy_pkey")
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY NONE")
+
+    # The partition key must be part of the primary key and cannot be NULL
+    op.execute("""
+        CREATE TABLE activity_logs (
+            id INTEGER NOT NULL DEFAULT nextval('activity_logs_id_seq'),
+            user_id INTEGER REFERENCES users (id),
+            action VARCHAR(100) NOT NULL,
+            details TEXT,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            CONSTRAINT activity_logs_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY activity_logs.id")
+
+    # Indexes for the admin activity log listing: newest first, optionally by user or action
+    op.create_index('ix_activity_logs_timestamp_id', 'activity_logs', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_activity_logs_user_id_timestamp_id', 'activity_logs', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_activity_logs_action_timestamp_id', 'activity_logs', ['action', 'timestamp', 'id'], unique=False)
+
+    # One partition per month from the oldest existing row through PARTITIONS_AHEAD months from now
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM activity_logs_legacy")).scalar()
+    today = datetime.utcnow().date()
+    month = _month_start(oldest.date() if oldest else today)
+    last = _month_start(today, PARTITIONS_AHEAD)
+    while month <= last:
+        next_month = _month_start(month, 1)
+        op.execute(
+            f"CREATE TABLE activity_logs_y{month.year:04d}m{month.month:02d} PARTITION OF activity_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+    # Rows outside every monthly partition land here rather than failing the insert
+    op.execute("CREATE TABLE activity_logs_default PARTITION OF activity_logs DEFAULT")
+
+    op.execute("""
+        INSERT INTO activity_logs (id, user_id, action, details, timestamp)
+        SELECT id, user_id, action, details, coalesce(timestamp, now() AT TIME ZONE 'utc')
+        FROM activity_logs_legacy
+    """)
+    op.execute("DROP TABLE activity_logs_legacy")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE activity_logs RENAME TO activity_logs_partitioned")
+    op.execute("ALTER TABLE activity_logs_partitioned RENAME CONSTRAINT activity_logs_pkey TO activity_logs_partitioned_pkey")
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY NONE")
+
+    op.create_table('activity_logs',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('activity_logs_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=100), nullable=False),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_activity_logs_id'), 'activity_logs', ['id'], unique=False)
+    op.execute("ALTER SEQUENCE activity_logs_id_seq OWNED BY activity_logs.id")
+
+    op.execute("""
+        INSERT INTO activity_logs (id, user_id, action, details, timestamp)
+        SELECT id, user_id, action, details, timestamp FROM activity_logs_partitioned
+    """)
+    op.execute("DROP TABLE activity_logs_partitioned CASCADE")
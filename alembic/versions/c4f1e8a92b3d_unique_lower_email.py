@@ -0,0 +1,30 @@
+"""unique lower(email)
+
+Revision ID: c4f1e8a92b3d
+Revises: d0e2d5ed230b
+Create Date: 2026-10-18 21:40:12.518304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f1e8a92b3d'
+down_revision: Union[str, None] = 'd0e2d5ed230b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fails if two accounts differ only in the case of their email; merge those first:
+    #   SELECT lower(email), array_agg(id) FROM users GROUP BY 1 HAVING count(*) > 1
+    op.create_index('ux_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_users_email_lower', table_name='users')
@@ -0,0 +1,46 @@
+"""add outbox
+
+Revision ID: d0e2d5ed230b
+Revises: 1c155978d6c7
+Create Date: 2026-10-18 19:52:41.086230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e2d5ed230b'
+down_revision: Union[str, None] = '1c155978d6c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    # Only undelivered rows are indexed, so the relay's poll stays cheap however much history is kept
+    op.create_index('ix_outbox_pending', 'outbox', ['available_at'], unique=False,
+                    postgresql_where=sa.text('sent_at IS NULL'))
+    op.create_index(op.f('ix_outbox_sent_at'), 'outbox', ['sent_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_outbox_sent_at'), table_name='outbox')
+    op.drop_index('ix_outbox_pending', table_name='outbox', postgresql_where=sa.text('sent_at IS NULL'))
+    op.drop_table('outbox')
@@ -0,0 +1,31 @@
+import os
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import DATABASE_URL
+from db_pool import DATABASE_MODE, engine_options, instrument_engine
+
+load_dotenv()
+
+# Same database as the sync engine, reached through asyncpg unless overridden. Whatever
+# driver DATABASE_URL names (postgresql://, postgresql+psycopg2://, ...) is swapped out.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+
+# Only built in async mode, so the sync deployment doesn't need asyncpg installed
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(async_driver=True)) if DATABASE_MODE == "async" else None
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)  # Same hold/query histograms and per-request query counts
+
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
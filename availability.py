@@ -0,0 +1,166 @@
+import os
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+from fastapi import HTTPException
+import pytz
+from sqlalchemy import select, func, exists, text, bindparam, Date, DateTime, Integer
+from models import Booking, ProviderAvailability, Service
+
+load_dotenv()
+
+AVAILABILITY_MAX_DAYS = int(os.getenv("AVAILABILITY_MAX_DAYS", "31"))  # Widest date range one search may cover
+DEFAULT_SERVICE_DURATION_MINUTES = 60
+# Booking times are stored naive, as wall-clock times in this zone (the reminder dispatcher reads the same setting)
+BOOKING_TIMEZONE = pytz.timezone(os.getenv("REMINDER_TIMEZONE", "Asia/Kuala_Lumpur"))
+
+# Bookings in these states no longer hold their time slot (mirrors ex_bookings_provider_no_overlap)
+INACTIVE_BOOKING_STATUSES = ("cancelled", "rejected")
+
+
+# The current time on the same naive wall clock as bookings.booking_date and reminder_time
+def booking_local_now() -> datetime:
+    return datetime.now(BOOKING_TIMEZONE).replace(tzinfo=None)
+
+
+def booking_end_for(booking_date: datetime, duration_minutes: int) -> datetime:
+    return booking_date + timedelta(minutes=duration_minutes or DEFAULT_SERVICE_DURATION_MINUTES)
+
+
+def active_booking_filter():
+    return Booking.status.not_in(INACTIVE_BOOKING_STATUSES) & Booking.booking_end.is_not(None)
+
+
+# Does an active booking of this provider overlap [start, end)? Answered by the
+# exclusion constraint's GiST index, so it's O(log n) in the provider's bookings.
+def booking_conflict_select(provider_id: int, start: datetime, end: datetime):
+    return select(
+        exists().where(
+            Booking.provider_id == provider_id,
+            active_booking_filter(),
+            func.tsrange(Booking.booking_date, Booking.booking_end).op("&&")(func.tsrange(start, end)),
+        )
+    )
+
+
+# 1 if the provider has no working hours defined at all (unrestricted, as before this
+# feature existed) or some rule for that weekday covers [start, end); 0 otherwise
+def within_working_hours_select(provider_id: int, service_id: int, start: datetime, end: datetime):
+    rules = select(ProviderAvailability.id).where(
+        ProviderAvailability.provider_id == provider_id,
+        (ProviderAvailability.service_id.is_(None)) | (ProviderAvailability.service_id == service_id),
+    )
+    covering = rules.where(
+        ProviderAvailability.weekday == start.weekday(),
+        ProviderAvailability.start_time <= start.time(),
+        ProviderAvailability.end_time >= end.time(),
+        func.date(start) == func.date(end),
+    )
+    return select(~rules.exists() | covering.exists())
+
+
+# Free slots for one provider/service over a date range, in a single statement: expand the
+# weekly rules into candidate slots per day, then drop the ones an active booking overlaps.
+AVAILABLE_SLOTS_SQL = text("""
+    WITH days AS (
+        SELECT d::date AS day
+        FROM generate_series(CAST(:date_from AS date), CAST(:date_to AS date), interval '1 day') AS d
+    ),
+    rules AS (
+        SELECT a.weekday, a.start_time, a.end_time,
+               make_interval(mins => s.duration_minutes) AS duration,
+               make_interval(mins => COALESCE(a.slot_minutes, s.duration_minutes)) AS step
+        FROM provider_availability a
+        JOIN services s ON s.id = :service_id
+        WHERE a.provider_id = :provider_id AND (a.service_id IS NULL OR a.service_id = :service_id)
+    ),
+    slots AS (
+        SELECT DISTINCT slot_start, slot_start + r.duration AS slot_end
+        FROM days d
+        JOIN rules r ON r.weekday = EXTRACT(ISODOW FROM d.day) - 1
+        CROSS JOIN LATERAL generate_series(
+            d.day + r.start_time, d.day + r.end_time - r.duration, r.step
+        ) AS slot_start
+    )
+    SELECT slot_start, slot_end
+    FROM slots
+    WHERE slot_start >= :not_before
+      AND NOT EXISTS (
+          SELECT 1 FROM bookings b
+          WHERE b.provider_id = :provider_id
+            AND b.booking_end IS NOT NULL
+            AND b.status NOT IN ('cancelled', 'rejected')
+            AND tsrange(b.booking_date, b.booking_end) && tsrange(slots.slot_start, slots.slot_end)
+      )
+    ORDER BY slot_start
+""").bindparams(
+    bindparam("date_from", type_=Date),
+    bindparam("date_to", type_=Date),
+    bindparam("provider_id", type_=Integer),
+    bindparam("service_id", type_=Integer),
+    bindparam("not_before", type_=DateTime),
+)
+
+
+def available_slots_params(provider_id: int, service_id: int, date_from: date, date_to: date,
+                           now: datetime = None) -> dict:
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {AVAILABILITY_MAX_DAYS} days")
+    return {
+        "provider_id": provider_id,
+        "service_id": service_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "not_before": now or booking_local_now(),  # Never offer slots in the past
+    }
+
+
+def service_provider_select(service_id: int):
+    return select(Service.user_id).where(Service.id == service_id)
+
+
+def ensure_provider_service(provider_id: int, service_provider_id):
+    if service_provider_id is None or service_provider_id != provider_id:
+        raise HTTPException(status_code=404, detail="Service not found for this provider")
+
+
+def to_slots(rows) -> list:
+    return [{"start": row.slot_start, "end": row.slot_end} for row in rows]
+
+
+def get_available_slots(db, provider_id: int, service_id: int, date_from: date, date_to: date) -> list:
+    params = available_slots_params(provider_id, service_id, date_from, date_to)
+    ensure_provider_service(provider_id, db.execute(service_provider_select(service_id)).scalar())
+    return to_slots(db.execute(AVAILABLE_SLOTS_SQL, params).all())
+
+
+async def get_available_slots_async(db, provider_id: int, service_id: int, date_from: date, date_to: date) -> list:
+    params = available_slots_params(provider_id, service_id, date_from, date_to)
+    ensure_provider_service(provider_id, (await db.execute(service_provider_select(service_id))).scalar())
+    return to_slots((await db.execute(AVAILABLE_SLOTS_SQL, params)).all())
+
+
+# Raises 409 when [start, end) is outside the provider's hours or already taken.
+# The exclusion constraint still catches two requests racing for the same slot.
+def ensure_bookable(db, provider_id: int, service_id: int, start: datetime, end: datetime):
+    if not db.execute(within_working_hours_select(provider_id, service_id, start, end)).scalar():
+        raise HTTPException(status_code=409, detail="Requested time is outside the provider's working hours")
+    if db.execute(booking_conflict_select(provider_id, start, end)).scalar():
+        raise HTTPException(status_code=409, detail="The provider is already booked at that time")
+
+
+# Replace a provider's weekly rules (for one service, or the all-services rules when service_id is None)
+def replace_working_hours(db, provider_id: int, service_id: int, rules: list):
+    query = db.query(ProviderAvailability).filter(ProviderAvailability.provider_id == provider_id)
+    if service_id is None:
+        query = query.filter(ProviderAvailability.service_id.is_(None))
+    else:
+        query = query.filter(ProviderAvailability.service_id == service_id)
+    query.delete(synchronize_session=False)
+    db.add_all(
+        ProviderAvailability(provider_id=provider_id, service_id=service_id, weekday=rule.weekday,
+                             start_time=rule.start_time, end_time=rule.end_time, slot_minutes=rule.slot_minutes)
+        for rule in rules
+    )
+    db.commit()
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_CACHE_TTL_SECONDS = int(os.getenv("CATALOGUE_CACHE_TTL_SECONDS", "300"))
+CATALOGUE_CACHE_MAX_ENTRIES = int(os.getenv("CATALOGUE_CACHE_MAX_ENTRIES", "5000"))
+# Set to share the cache (and invalidations) across worker processes, e.g. redis://localhost:6379/0
+CATALOGUE_CACHE_REDIS_URL = os.getenv("CATALOGUE_CACHE_REDIS_URL")
+
+VERSION_KEY = "catalogue:version"
+# Postgres channel carrying invalidations between workers that each have an in-memory backend
+CATALOGUE_CHANNEL = "catalogue_invalidations"
+
+
+# In-process backend. Also the reference for what a shared backend must implement.
+# Least recently used entries are evicted once max_entries is reached; counters
+# (the catalogue version) are kept apart so they are never evicted.
+class InMemoryBackend:
+    def __init__(self, max_entries: int = CATALOGUE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at or None, value), least recently used first
+        self._counters = {}  # key -> int
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: int = None):
+        with self._lock:
+            expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Redis-compatible backend. Takes any client exposing get/set(ex=)/incr, so a local fake works too.
+class RedisBackend:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str):
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: int = None):
+        self.client.set(key, value, ex=ttl_seconds)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+
+def _default_backend():
+    if CATALOGUE_CACHE_REDIS_URL:
+        import redis  # Optional dependency, only needed when a shared cache is configured
+        return RedisBackend(redis.Redis.from_url(CATALOGUE_CACHE_REDIS_URL))
+    return InMemoryBackend()
+
+
+# Tells the other workers to bump their own in-memory version. They receive it through
+# revocation_listener, which LISTENs on CATALOGUE_CHANNEL as well (see main.py).
+def notify_workers():
+    from sqlalchemy import text
+    from db_pool import engine  # Imported here so the cache itself doesn't need a database
+
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, '')"), {"channel": CATALOGUE_CHANNEL})
+    except Exception:
+        # The write is already committed; other workers catch up within the TTL
+        logger.exception("Could not notify other workers of a catalogue invalidation")
+
+
+# Read-through cache of serialised catalogue responses. Keys embed the catalogue
+# version, so bumping the version on any write invalidates every cached entry at once.
+# publish, when set, is called after every invalidate() so other workers drop their
+# copies too; a shared backend doesn't need it.
+class CatalogueCache:
+    def __init__(self, backend=None, ttl_seconds: int = CATALOGUE_CACHE_TTL_SECONDS, publish=None):
+        self.backend = backend if backend is not None else _default_backend()
+        self.ttl_seconds = ttl_seconds
+        self.publish = publish
+        self.hits = 0
+        self.misses = 0
+
+    def version(self) -> int:
+        value = self.backend.get(VERSION_KEY)
+        return int(value) if value is not None else 0
+
+    def _lookup(self, name: str):
+        key = f"catalogue:v{self.version()}:{name}"
+        body = self.backend.get(key)
+        if body is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return key, body
+
+    def _store(self, key: str, data) -> bytes:
+        body = json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+        self.backend.set(key, body, self.ttl_seconds)
+        return body
+
+    def get_or_load(self, name: str, loader):
+        # Returns (body, etag), or None when the loader found nothing (not cached)
+        key, body = self._lookup(name)
+        if body is None:
+            data = loader()
+            if data is None:
+                return None
+            body = self._store(key, data)
+        return body, make_etag(body)
+
+    async def get_or_load_async(self, name: str, loader):
+        # Same as get_or_load, for an async loader (e.g. one using an AsyncSession)
+        key, body = self._lookup(name)
+        if body is None:
+            data = await loader()
+            if data is None:
+                return None
+            body = self._store(key, data)
+        return body, make_etag(body)
+
+    def invalidate(self):
+        self.backend.incr(VERSION_KEY)
+        if self.publish is not None:
+            self.publish()
+
+    def apply_remote_invalidation(self, payload=None):
+        # Another worker invalidated (or the listener reconnected and may have missed one).
+        # This worker's own notifications come back too; that costs one extra miss per key.
+        self.backend.incr(VERSION_KEY)
+
+    def stats(self) -> dict:
+        stats = {"version": self.version(), "hits": self.hits, "misses": self.misses}
+        if isinstance(self.backend, InMemoryBackend):
+            stats.update(entries=len(self.backend), evictions=self.backend.evictions)
+        return stats
+
+
+def make_etag(body: bytes) -> str:
+    # Strong validator: identical bytes <=> identical tag
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    # no-cache: clients may store the body but must revalidate, which costs a 304 when unchanged
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+catalogue_cache = CatalogueCache(publish=None if CATALOGUE_CACHE_REDIS_URL else notify_workers)
@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Booking
+from schemas import BookingResponse, BookingPage
+from crud_operations.booking_crud import (
+    booking_response_select, booking_status_values, list_bookings_select, to_booking_page, to_booking_response
+)
+
+# Async counterparts of the booking_crud functions async_booking_router uses; they execute the same statements
+
+
+async def get_bookings_for_user(db: AsyncSession, user_id: int) -> list[BookingResponse]:
+    result = await db.execute(booking_response_select().where(Booking.user_id == user_id))
+    return [to_booking_response(row) for row in result.all()]
+
+
+async def list_bookings(db: AsyncSession, limit: int, cursor: str = None, user_id: int = None,
+                        provider_id: int = None, status: str = None, payment_status: str = None,
+                        date_from: datetime = None, date_to: datetime = None) -> BookingPage:
+    query = list_bookings_select(limit, cursor=cursor, user_id=user_id, provider_id=provider_id, status=status,
+                                 payment_status=payment_status, date_from=date_from, date_to=date_to)
+    result = await db.execute(query)
+    return to_booking_page(result.all(), limit)
+
+
+async def get_booking_response(db: AsyncSession, booking_id: int):
+    result = await db.execute(booking_response_select().where(Booking.id == booking_id))
+    row = result.first()
+    if row is None:
+        return None
+    return to_booking_response(row)
+
+
+async def update_booking_status(db: AsyncSession, booking_id: int, status: str = None, payment_status: str = None):
+    values = booking_status_values(status, payment_status)
+    if values:
+        result = await db.execute(update(Booking).where(Booking.id == booking_id).values(**values))
+        if not result.rowcount:
+            return None
+        await db.commit()
+
+    return await get_booking_response(db, booking_id)
@@ -0,0 +1,31 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import CareerType
+
+# Async counterparts of crud_operations/career_type.py, for async_career_type_router
+
+# Create a new career type
+async def create_career_type(db: AsyncSession, name: str):
+    db_career_type = CareerType(name=name)
+    db.add(db_career_type)
+    await db.commit()
+    await db.refresh(db_career_type)
+    return db_career_type
+
+# Get all career types (for the admin to review)
+async def get_all_career_types(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(CareerType).offset(skip).limit(limit))
+    return result.scalars().all()
+
+# Get career type by ID
+async def get_career_type_by_id(db: AsyncSession, career_type_id: int):
+    return await db.get(CareerType, career_type_id)
+
+# Approve a career type
+async def approve_career_type(db: AsyncSession, career_type_id: int):
+    db_career_type = await db.get(CareerType, career_type_id)
+    if db_career_type:
+        db_career_type.is_approved = True
+        await db.commit()
+        await db.refresh(db_career_type)
+    return db_career_type
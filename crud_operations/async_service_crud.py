@@ -0,0 +1,25 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Service
+from schemas import ServicePage
+from crud_operations.service_crud import search_services_select, to_service_page
+
+# Async counterparts of the read paths in crud_operations/service_crud.py, for async_service_router
+
+# Function to get all services with pagination
+async def get_services(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(Service).offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+async def search_services(db: AsyncSession, limit: int, cursor: str = None, q: str = None, category: str = None,
+                          career_type_id: int = None, provider_id: int = None, min_price: float = None,
+                          max_price: float = None, sort: str = "newest") -> ServicePage:
+    query = search_services_select(limit, cursor=cursor, q=q, category=category, career_type_id=career_type_id,
+                                   provider_id=provider_id, min_price=min_price, max_price=max_price, sort=sort)
+    result = await db.execute(query)
+    return to_service_page(result.scalars().all(), limit, sort)
+
+
+async def get_service_by_id(db: AsyncSession, service_id: int):
+    return await db.get(Service, service_id)
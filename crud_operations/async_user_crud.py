@@ -0,0 +1,106 @@
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models import User, ActivityLog
+from pagination import decode_cursor
+from role_registry import role_registry
+from email_utils import queue_verification_email
+from token_revocation import revoke_all_tokens
+from crud_operations.user_crud import add_user_roles, set_user_roles
+
+# Async counterparts of crud_operations/user_crud.py, for async_admin_router.
+# Roles are always loaded eagerly: lazy loads are not allowed on an AsyncSession. Role
+# changes, token revocation and the verification email reuse the sync helpers through
+# run_sync, so both paths write exactly the same rows.
+
+# The password must already be hashed (see password_service) so no bcrypt work happens here
+async def create_user(db: AsyncSession, email: str, full_name: str, hashed_password: str, roles: list = None,
+                      is_active: bool = True, send_verification: bool = False):
+    db_user = User(email=email, full_name=full_name, hashed_password=hashed_password, is_active=is_active)
+    db.add(db_user)
+    if send_verification:
+        await db.run_sync(queue_verification_email, email)  # Commits with the user, delivered by the outbox relay
+
+    # Assign roles if provided
+    if roles:
+        role_ids, _ = await db.run_sync(role_registry.ids_for, roles)
+        await db.flush()  # Need the user's id
+        await db.run_sync(add_user_roles, db_user.id, role_ids.values())
+
+    await db.commit()
+    return await get_user_by_id(db, db_user.id)
+
+
+# Get All Users
+async def get_users(db: AsyncSession):
+    result = await db.execute(select(User).options(selectinload(User.roles)))
+    return result.scalars().all()
+
+
+# Get User by ID
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.id == user_id).execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def update_user(db: AsyncSession, user_id: int, full_name: str = None, email: str = None,
+                      is_active: bool = None, roles: list = None):
+    db_user = await get_user_by_id(db, user_id)
+
+    if db_user:
+        if full_name:
+            db_user.full_name = full_name
+        if email:
+            db_user.email = email
+        if is_active is not None:
+            db_user.is_active = is_active
+
+        roles_changed = False
+        if roles is not None:  # Only update roles if provided; unknown names are ignored
+            role_ids, _ = await db.run_sync(role_registry.ids_for, roles)
+            roles_changed = await db.run_sync(set_user_roles, db_user.id, role_ids.values())
+
+        # Outstanding tokens carry the old email, roles or active flag as claims
+        if email or is_active is not None or roles_changed:
+            await db.run_sync(revoke_all_tokens, db_user.id)
+
+        await db.commit()
+        return await get_user_by_id(db, user_id)  # Reloads the roles changed behind the ORM's back
+    return None
+
+
+async def deactivate_user(db: AsyncSession, user_id: int):
+    db_user = await get_user_by_id(db, user_id)
+    if db_user:
+        db_user.is_active = False
+        await db.run_sync(revoke_all_tokens, db_user.id)
+        await db.commit()
+        return db_user
+    return None
+
+
+# Activity logs, newest first, with the same filters and keyset cursor as user_crud.get_logs
+async def get_logs(db: AsyncSession, limit: int = 100, skip: int = 0, user_id: int = None, action: str = None,
+                   since: datetime = None, until: datetime = None, cursor: str = None):
+    query = select(ActivityLog)
+    if user_id is not None:
+        query = query.where(ActivityLog.user_id == user_id)
+    if action:
+        query = query.where(ActivityLog.action == action)
+    # Time bounds also let Postgres prune partitions outside the window
+    if since is not None:
+        query = query.where(ActivityLog.timestamp >= since)
+    if until is not None:
+        query = query.where(ActivityLog.timestamp < until)
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor, datetime, int)
+        query = query.where(tuple_(ActivityLog.timestamp, ActivityLog.id) < tuple_(last_timestamp, last_id))
+    elif skip:
+        query = query.offset(skip)
+
+    query = query.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc()).limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
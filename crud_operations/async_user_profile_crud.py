@@ -0,0 +1,30 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import UserProfile
+from schemas import UserProfileCreate, UserProfileUpdate
+
+# Async counterparts of crud_operations/user_profile_crud.py, for async_user_profile_router
+
+# Function to create a user profile
+async def create_user_profile(db: AsyncSession, user_id: int, user_profile: UserProfileCreate):
+    db_profile = UserProfile(user_id=user_id, **user_profile.dict())
+    db.add(db_profile)
+    await db.commit()
+    await db.refresh(db_profile)
+    return db_profile
+
+# Function to get a user profile by user_id
+async def get_user_profile(db: AsyncSession, user_id: int):
+    result = await db.execute(select(UserProfile).where(UserProfile.user_id == user_id))
+    return result.scalars().first()
+
+# Function to update a user profile
+async def update_user_profile(db: AsyncSession, user_id: int, user_profile: UserProfileUpdate):
+    db_profile = await get_user_profile(db, user_id)
+    if db_profile:
+        for key, value in user_profile.dict().items():
+            setattr(db_profile, key, value)
+        await db.commit()
+        await db.refresh(db_profile)
+        return db_profile
+    return None
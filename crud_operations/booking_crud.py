@@ -0,0 +1,142 @@
+from datetime import datetime
+from sqlalchemy import select, insert, tuple_, update
+from sqlalchemy.orm import Session, aliased
+from models import Booking, Service, User
+from schemas import BookingResponse, BookingPage
+from pagination import encode_cursor, decode_cursor
+
+
+# Column-only projection that maps straight onto BookingResponse, so reading
+# bookings never lazy-loads Service (or anything else) row by row.
+# Statements are built with select() so async_booking_crud can execute the same SQL.
+def booking_response_select():
+    return (
+        select(
+            Booking.id,
+            Booking.user_id,
+            Booking.provider_id,
+            Booking.service_id,
+            Booking.status,
+            Booking.booking_date,
+            Booking.payment_status,
+            Service.name.label("service_name"),
+        )
+        .outerjoin(Service, Booking.service_id == Service.id)
+    )
+
+
+# Customer, provider and service of a new booking in one round trip; no row means one of them doesn't exist
+def booking_parties_select(user_id: int, provider_id: int, service_id: int):
+    customer = aliased(User)
+    provider = aliased(User)
+    return select(
+        customer.email.label("customer_email"),
+        customer.full_name.label("user_full_name"),
+        provider.full_name.label("provider_full_name"),
+        Service.name.label("service_name"),
+        Service.duration_minutes,
+    ).where(customer.id == user_id, provider.id == provider_id, Service.id == service_id)
+
+
+# INSERT ... RETURNING the columns BookingResponse needs, so nothing is re-read after the insert
+def insert_booking_statement(values: dict):
+    return insert(Booking).values(**values).returning(
+        Booking.id,
+        Booking.user_id,
+        Booking.provider_id,
+        Booking.service_id,
+        Booking.status,
+        Booking.booking_date,
+        Booking.payment_status,
+    )
+
+
+# service_name is passed separately for rows that come from INSERT ... RETURNING
+def to_booking_response(row, service_name: str = None) -> BookingResponse:
+    return BookingResponse(
+        booking_id=row.id,  # Map to the primary key 'id'
+        user_id=row.user_id,
+        provider_id=row.provider_id,
+        service_id=row.service_id,
+        status=row.status or "pending",  # Set default value if None
+        booking_date=row.booking_date,
+        service_details=row.service_name if service_name is None else service_name,
+        payment_status=row.payment_status or "unpaid",  # Set default value if None
+    )
+
+
+# Get all bookings made by a customer (one SQL statement regardless of count)
+def get_bookings_for_user(db: Session, user_id: int) -> list[BookingResponse]:
+    rows = db.execute(booking_response_select().where(Booking.user_id == user_id)).all()
+    return [to_booking_response(row) for row in rows]
+
+
+# Keyset-paginated booking listing, newest first, ordered by (booking_date, id).
+# Backed by the (user_id|provider_id, booking_date, id) indexes, so each page costs O(page).
+def list_bookings_select(limit: int, cursor: str = None, user_id: int = None, provider_id: int = None,
+                         status: str = None, payment_status: str = None, date_from: datetime = None,
+                         date_to: datetime = None):
+    query = booking_response_select()
+    if user_id is not None:
+        query = query.where(Booking.user_id == user_id)
+    if provider_id is not None:
+        query = query.where(Booking.provider_id == provider_id)
+    if status:
+        query = query.where(Booking.status == status)
+    if payment_status:
+        query = query.where(Booking.payment_status == payment_status)
+    if date_from is not None:
+        query = query.where(Booking.booking_date >= date_from)
+    if date_to is not None:
+        query = query.where(Booking.booking_date < date_to)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, datetime, int)
+        query = query.where(tuple_(Booking.booking_date, Booking.id) < tuple_(last_date, last_id))
+
+    # Fetch one extra row to know whether there is a next page
+    return query.order_by(Booking.booking_date.desc(), Booking.id.desc()).limit(limit + 1)
+
+
+def to_booking_page(rows: list, limit: int) -> BookingPage:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].booking_date, rows[-1].id)
+    return BookingPage(items=[to_booking_response(row) for row in rows], next_cursor=next_cursor)
+
+
+def list_bookings(db: Session, limit: int, cursor: str = None, user_id: int = None, provider_id: int = None,
+                  status: str = None, payment_status: str = None, date_from: datetime = None,
+                  date_to: datetime = None) -> BookingPage:
+    query = list_bookings_select(limit, cursor=cursor, user_id=user_id, provider_id=provider_id, status=status,
+                                 payment_status=payment_status, date_from=date_from, date_to=date_to)
+    return to_booking_page(db.execute(query).all(), limit)
+
+
+# Get a single booking as a response (one SQL statement)
+def get_booking_response(db: Session, booking_id: int):
+    row = db.execute(booking_response_select().where(Booking.id == booking_id)).first()
+    if row is None:
+        return None
+    return to_booking_response(row)
+
+
+def booking_status_values(status: str = None, payment_status: str = None) -> dict:
+    values = {}
+    if status:
+        values["status"] = status
+    if payment_status:
+        values["payment_status"] = payment_status
+    return values
+
+
+# Update status/payment status and return the refreshed booking response
+def update_booking_status(db: Session, booking_id: int, status: str = None, payment_status: str = None):
+    values = booking_status_values(status, payment_status)
+    if values:
+        result = db.execute(update(Booking).where(Booking.id == booking_id).values(**values))
+        if not result.rowcount:
+            return None
+        db.commit()
+
+    return get_booking_response(db, booking_id)
@@ -0,0 +1,81 @@
+from sqlalchemy import select, insert, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models import User, user_roles
+from role_registry import role_registry
+from token_revocation import revoke_all_tokens_for_users
+
+# Set-based counterparts of user_crud.create_user and roles.assign_role for bulk admin operations.
+# Nothing here commits; the caller commits once per chunk.
+
+
+# Emails (lower-cased) from the list that already have an account
+def existing_emails(db: Session, emails: list) -> set:
+    if not emails:
+        return set()
+    rows = db.execute(select(func.lower(User.email)).where(func.lower(User.email).in_([e.lower() for e in emails])))
+    return set(rows.scalars().all())
+
+
+# Role ids keyed by lower-cased name, for the names that exist
+def role_ids_by_name(db: Session, names: set) -> dict:
+    if not names:
+        return {}
+    found, _ = role_registry.ids_for(db, names)
+    return {name.lower(): role_id for name, role_id in found.items()}
+
+
+# One multi-row INSERT ... RETURNING for the users, then one for their role links.
+# rows: dicts with email, full_name, hashed_password, is_active and role_ids. Emails
+# registered concurrently, in any case, are skipped (ON CONFLICT on the lower(email)
+# unique index, DO NOTHING) and absent from the result.
+def insert_users(db: Session, rows: list) -> dict:
+    if not rows:
+        return {}
+    result = db.execute(
+        pg_insert(User).on_conflict_do_nothing(index_elements=[func.lower(User.email)]).returning(User.id, User.email),
+        [
+            {
+                "email": row["email"],
+                "full_name": row["full_name"],
+                "hashed_password": row["hashed_password"],
+                "is_active": row["is_active"],
+                "is_verified": False,
+            }
+            for row in rows
+        ],
+    )
+    ids_by_email = {email: user_id for user_id, email in result.all()}
+
+    links = [
+        {"user_id": ids_by_email[row["email"]], "role_id": role_id}
+        for row in rows if row["email"] in ids_by_email
+        for role_id in row["role_ids"]
+    ]
+    if links:
+        db.execute(insert(user_roles), links)
+    return ids_by_email
+
+
+# Give a role to every listed user that doesn't have it yet, in one INSERT ... SELECT.
+# Returns {user id: email} for the users that gained the role, and the emails that matched
+# no user.
+def assign_role_bulk(db: Session, role_id: int, emails: list) -> tuple:
+    lowered = [email.lower() for email in emails]
+    users = db.execute(select(User.id, User.email).where(func.lower(User.email).in_(lowered))).all()
+    found = {email.lower() for _, email in users}
+    missing = [email for email in emails if email.lower() not in found]
+
+    already = select(user_roles.c.user_id).where(user_roles.c.role_id == role_id)
+    candidates = (
+        select(User.id, literal(role_id))
+        .where(func.lower(User.email).in_(lowered), User.id.not_in(already))
+    )
+    inserted = db.execute(
+        insert(user_roles).from_select(["user_id", "role_id"], candidates).returning(user_roles.c.user_id)
+    ).scalars().all()
+
+    # Their outstanding tokens list the old roles
+    revoke_all_tokens_for_users(db, inserted)
+    emails_by_id = dict(users)
+    return {user_id: emails_by_id[user_id] for user_id in inserted}, missing
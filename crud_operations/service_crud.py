@@ -1,6 +1,12 @@
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
 from models import Service
-from schemas import ServiceCreate  # The Pydantic model for incoming data
+from schemas import ServiceCreate, ServicePage  # The Pydantic model for incoming data
+from pagination import encode_cursor, decode_cursor
+from catalogue_cache import catalogue_cache
+
+# Sort orders supported by search_services
+SERVICE_SORTS = {"newest", "price_asc", "price_desc"}
 
 # Function to create a service
 def create_service(db: Session, service: ServiceCreate, user_id: int):
@@ -11,10 +17,12 @@ def create_service(db: Session, service: ServiceCreate, user_id: int):
         category=service.category,
         user_id=user_id,  # The service provider
         career_type_id=service.career_type_id,  # The ID of the selected career type
-        currency=service.currency  # The currency value (e.g., "MYR")
+        currency=service.currency,  # The currency value (e.g., "MYR")
+        duration_minutes=service.duration_minutes
     )
     db.add(db_service)
     db.commit()
+    catalogue_cache.invalidate()
     db.refresh(db_service)
     return db_service
 
@@ -23,6 +31,71 @@ def create_service(db: Session, service: ServiceCreate, user_id: int):
 def get_services(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Service).offset(skip).limit(limit).all()
 
+# Search services with server-side filters and keyset (cursor) pagination.
+# Text search uses the GIN-indexed search_vector column; price sorts use the (price, id) index.
+# Built with select() so async_service_crud can execute the same statement.
+def search_services_select(limit: int, cursor: str = None, q: str = None, category: str = None,
+                           career_type_id: int = None, provider_id: int = None, min_price: float = None,
+                           max_price: float = None, sort: str = "newest"):
+    query = select(Service)
+    if q:
+        query = query.where(Service.search_vector.op("@@")(func.websearch_to_tsquery("simple", q)))
+    if category:
+        query = query.where(Service.category == category)
+    if career_type_id is not None:
+        query = query.where(Service.career_type_id == career_type_id)
+    if provider_id is not None:
+        query = query.where(Service.user_id == provider_id)
+    if min_price is not None:
+        query = query.where(Service.price >= min_price)
+    if max_price is not None:
+        query = query.where(Service.price <= max_price)
+
+    # Price sorts list priced services only: a NULL price has no place in the order, and
+    # in a (price, id) row comparison it would end the keyset walk early
+    if sort in {"price_asc", "price_desc"}:
+        query = query.where(Service.price.is_not(None))
+
+    if sort == "price_asc":
+        if cursor:
+            last_price, last_id = decode_cursor(cursor, float, int)
+            query = query.where(tuple_(Service.price, Service.id) > tuple_(last_price, last_id))
+        query = query.order_by(Service.price.asc(), Service.id.asc())
+    elif sort == "price_desc":
+        if cursor:
+            last_price, last_id = decode_cursor(cursor, float, int)
+            query = query.where(tuple_(Service.price, Service.id) < tuple_(last_price, last_id))
+        query = query.order_by(Service.price.desc(), Service.id.desc())
+    else:
+        if cursor:
+            last_id, = decode_cursor(cursor, int)
+            query = query.where(Service.id < last_id)
+        query = query.order_by(Service.id.desc())
+
+    # Fetch one extra row to know whether there is a next page
+    return query.limit(limit + 1)
+
+
+def to_service_page(services: list, limit: int, sort: str) -> ServicePage:
+    next_cursor = None
+    if len(services) > limit:
+        services = services[:limit]
+        last = services[-1]
+        if sort in {"price_asc", "price_desc"}:
+            next_cursor = encode_cursor(last.price, last.id)
+        else:
+            next_cursor = encode_cursor(last.id)
+    return ServicePage(items=services, next_cursor=next_cursor)
+
+
+def search_services(db: Session, limit: int, cursor: str = None, q: str = None, category: str = None,
+                    career_type_id: int = None, provider_id: int = None, min_price: float = None,
+                    max_price: float = None, sort: str = "newest") -> ServicePage:
+    query = search_services_select(limit, cursor=cursor, q=q, category=category, career_type_id=career_type_id,
+                                   provider_id=provider_id, min_price=min_price, max_price=max_price, sort=sort)
+    return to_service_page(db.execute(query).scalars().all(), limit, sort)
+
+
 def get_service_by_id(db: Session, service_id: int):
     return db.query(Service).filter(Service.id == service_id).first()
 
@@ -37,7 +110,9 @@ def update_service(db: Session, service_id: int, service: ServiceCreate):
         db_service.category = service.category
         db_service.currency = service.currency
         db_service.career_type_id = service.career_type_id
+        db_service.duration_minutes = service.duration_minutes
         db.commit()
+        catalogue_cache.invalidate()
         db.refresh(db_service)
         return db_service
     return None
@@ -49,5 +124,6 @@ def delete_service(db: Session, service_id: int):
     if db_service:
         db.delete(db_service)
         db.commit()
+        catalogue_cache.invalidate()
         return db_service
     return None
\ No newline at end of file
@@ -1,24 +1,52 @@
+from datetime import datetime
+from sqlalchemy import tuple_, select, insert, delete, exists, literal
 from sqlalchemy.orm import Session
-from models import User, Role, ActivityLog
-from passlib.context import CryptContext
+from models import User, Role, ActivityLog, user_roles
+from pagination import encode_cursor, decode_cursor
+from token_revocation import revoke_all_tokens
+from role_registry import role_registry
+from email_utils import queue_verification_email
 
-# Password hashing setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")  # Fixed the parenthesis
 
-# Hash the password
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# Role assignment is done against user_roles directly: one DELETE for the roles a user
+# should lose and one INSERT ... SELECT for the ones they lack.
+def revoke_user_roles_statement(user_id: int, keep_role_ids):
+    return delete(user_roles).where(user_roles.c.user_id == user_id, user_roles.c.role_id.not_in(list(keep_role_ids)))
 
 
-def create_user(db: Session, email: str, full_name: str, password: str, roles: list = None):
-    hashed_password = hash_password(password)
-    db_user = User(email=email, full_name=full_name, hashed_password=hashed_password)
+def grant_user_roles_statement(user_id: int, role_ids):
+    already = exists().where(user_roles.c.user_id == user_id, user_roles.c.role_id == Role.id)
+    missing = select(literal(user_id), Role.id).where(Role.id.in_(list(role_ids)), ~already)
+    return insert(user_roles).from_select(["user_id", "role_id"], missing)
+
+
+# Make the user's roles exactly role_ids; returns True if anything changed
+def set_user_roles(db: Session, user_id: int, role_ids) -> bool:
+    role_ids = set(role_ids)
+    removed = db.execute(revoke_user_roles_statement(user_id, role_ids)).rowcount
+    added = db.execute(grant_user_roles_statement(user_id, role_ids)).rowcount if role_ids else 0
+    return bool(removed or added)
+
+
+# Add role_ids to the user's roles, keeping the others; returns True if anything changed
+def add_user_roles(db: Session, user_id: int, role_ids) -> bool:
+    return bool(db.execute(grant_user_roles_statement(user_id, set(role_ids))).rowcount)
+
+
+# The password must already be hashed (see password_service) so no bcrypt work happens here
+def create_user(db: Session, email: str, full_name: str, hashed_password: str, roles: list = None,
+                is_active: bool = True, send_verification: bool = False):
+    db_user = User(email=email, full_name=full_name, hashed_password=hashed_password, is_active=is_active)
+    db.add(db_user)
+    if send_verification:
+        queue_verification_email(db, email)  # Commits with the user, delivered by the outbox relay
 
     # Assign roles if provided
     if roles:
-        db_user.roles = db.query(Role).filter(Role.name.in_(roles)).all()
+        role_ids, _ = role_registry.ids_for(db, roles)
+        db.flush()  # Need the user's id
+        add_user_roles(db, db_user.id, role_ids.values())
 
-    db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -46,13 +74,14 @@ def update_user(db: Session, user_id: int, full_name: str = None, email: str = N
         if is_active is not None:
             db_user.is_active = is_active
 
-        if roles is not None:  # Only update roles if provided
-            # Clear existing roles and add the new ones
-            db_user.roles.clear()
-            for role_name in roles:
-                role = db.query(Role).filter(Role.name == role_name).first()
-                if role:
-                    db_user.roles.append(role)
+        roles_changed = False
+        if roles is not None:  # Only update roles if provided; unknown names are ignored
+            role_ids, _ = role_registry.ids_for(db, roles)
+            roles_changed = set_user_roles(db, db_user.id, role_ids.values())
+
+        # Outstanding tokens carry the old email, roles or active flag as claims
+        if email or is_active is not None or roles_changed:
+            revoke_all_tokens(db, db_user.id)
 
         db.commit()
         db.refresh(db_user)
@@ -64,12 +93,39 @@ def deactivate_user(db: Session, user_id: int):
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
         db_user.is_active = False
+        revoke_all_tokens(db, db_user.id)
         db.commit()
         db.refresh(db_user)
         return db_user
     return None
 
 
-def get_logs(db: Session, limit: int = 100, skip: int = 0):
-    return db.query(ActivityLog).order_by(ActivityLog.timestamp.desc()).offset(skip).limit(limit).all()
+# Activity logs, newest first. Pass the cursor from the previous page for keyset pagination
+# (index-backed at any depth); skip is kept for older clients but degrades with depth.
+def get_logs(db: Session, limit: int = 100, skip: int = 0, user_id: int = None, action: str = None,
+             since: datetime = None, until: datetime = None, cursor: str = None):
+    query = db.query(ActivityLog)
+    if user_id is not None:
+        query = query.filter(ActivityLog.user_id == user_id)
+    if action:
+        query = query.filter(ActivityLog.action == action)
+    # Time bounds also let Postgres prune partitions outside the window
+    if since is not None:
+        query = query.filter(ActivityLog.timestamp >= since)
+    if until is not None:
+        query = query.filter(ActivityLog.timestamp < until)
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(tuple_(ActivityLog.timestamp, ActivityLog.id) < tuple_(last_timestamp, last_id))
+    elif skip:
+        query = query.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc()).offset(skip)
+        return query.limit(limit).all()
+
+    return query.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc()).limit(limit).all()
+
+
+def logs_cursor(logs: list):
+    # Cursor for the page after this one
+    last = logs[-1]
+    return encode_cursor(last.timestamp, last.id)
 
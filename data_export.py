@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import date, datetime
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from database import SessionLocal
+from models import User, Booking, ActivityLog
+
+load_dotenv()
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "2000"))  # Rows fetched per server-side cursor round trip
+EXPORT_FLUSH_BYTES = int(os.getenv("EXPORT_FLUSH_BYTES", "65536"))  # Response chunk size
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Plain column selects: no ORM identity map, so memory stays flat however many rows stream
+USER_EXPORT_COLUMNS = (User.id, User.email, User.full_name, User.is_active, User.is_verified, User.created_at)
+BOOKING_EXPORT_COLUMNS = (
+    Booking.id, Booking.user_id, Booking.provider_id, Booking.service_id, Booking.booking_date,
+    Booking.reminder_time, Booking.status, Booking.payment_status,
+)
+ACTIVITY_LOG_EXPORT_COLUMNS = (ActivityLog.id, ActivityLog.user_id, ActivityLog.action, ActivityLog.details, ActivityLog.timestamp)
+
+
+def users_export_select():
+    return select(*USER_EXPORT_COLUMNS).order_by(User.id)
+
+
+def bookings_export_select(since: datetime = None, until: datetime = None):
+    statement = select(*BOOKING_EXPORT_COLUMNS).order_by(Booking.id)
+    if since is not None:
+        statement = statement.where(Booking.booking_date >= since)
+    if until is not None:
+        statement = statement.where(Booking.booking_date < until)
+    return statement
+
+
+def activity_logs_export_select(user_id: int = None, action: str = None, since: datetime = None, until: datetime = None):
+    statement = select(*ACTIVITY_LOG_EXPORT_COLUMNS).order_by(ActivityLog.timestamp, ActivityLog.id)
+    if user_id is not None:
+        statement = statement.where(ActivityLog.user_id == user_id)
+    if action:
+        statement = statement.where(ActivityLog.action == action)
+    # Time bounds also let Postgres prune partitions outside the window
+    if since is not None:
+        statement = statement.where(ActivityLog.timestamp >= since)
+    if until is not None:
+        statement = statement.where(ActivityLog.timestamp < until)
+    return statement
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(fields: list, rows) -> str:
+    return "".join(json.dumps(dict(zip(fields, map(_json_value, row))), default=str) + "\n" for row in rows)
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+# Runs in Starlette's threadpool (sync generator). The session opens here rather than
+# via get_db because, depending on the FastAPI version, dependencies may be torn down
+# before the streaming body is sent; the generator owns everything it reads from.
+def _stream_rows(statement, fmt: str, compress: bool):
+    fields = [column.key for column in statement.selected_columns]
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip framing
+
+    def emit(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            yield emit(_encode_csv([fields]))
+        result = db.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER))
+        pending, pending_bytes = [], 0
+        for partition in result.partitions():
+            data = emit(_encode_ndjson(fields, partition) if fmt == "ndjson" else _encode_csv(partition))
+            pending.append(data)
+            pending_bytes += len(data)
+            if pending_bytes >= EXPORT_FLUSH_BYTES:
+                yield b"".join(pending)
+                pending, pending_bytes = [], 0
+        if compressor:
+            pending.append(compressor.flush())
+        if pending:
+            yield b"".join(pending)
+    finally:
+        db.close()
+
+
+def export_response(request: Request, statement, name: str, fmt: str = "ndjson", gzip: bool = None) -> StreamingResponse:
+    fmt = (fmt or "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{fmt}'")
+    if gzip is None:
+        gzip = "gzip" in request.headers.get("accept-encoding", "")
+
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(_stream_rows(statement, fmt, gzip), media_type=EXPORT_FORMATS[fmt], headers=headers)
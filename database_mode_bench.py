@@ -0,0 +1,156 @@
+# Sync vs async request path load test against a scratch database (DATABASE_URL):
+#     python database_mode_bench.py --requests 5000 --concurrency 64
+#
+# Starts the app under uvicorn once with DATABASE_MODE=sync and once with DATABASE_MODE=async,
+# drives the same mix of read requests (service search, booking list, availability) at a
+# fixed concurrency, and prints throughput and latency percentiles for each. Both servers
+# get the same pool size; it should cover the 40 threadpool threads of sync mode, or sync
+# requests queue behind pool timeouts instead. Bench rows belong to one tagged provider
+# and are deleted before and after the run.
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+import httpx
+from sqlalchemy import text
+from db_pool import engine
+
+BENCH_PROVIDER_EMAIL = "mode-bench@example.invalid"
+BENCH_CAREER_TYPE = "Database mode benchmark"
+
+
+# One bench provider and customer, `services` services in 10 categories and `bookings` bookings
+def seed(services: int, bookings: int) -> dict:
+    with engine.begin() as connection:
+        provider_id, customer_id = connection.execute(text(
+            "INSERT INTO users (email, full_name, hashed_password, is_active, is_verified, token_version) "
+            "VALUES (:email, 'Bench Provider', '', true, true, 0), "
+            "       ('customer-' || :email, 'Bench Customer', '', true, true, 0) RETURNING id"
+        ), {"email": BENCH_PROVIDER_EMAIL}).scalars().all()
+        career_type_id = connection.execute(text(
+            "INSERT INTO career_types (name, is_approved) VALUES (:name, true) RETURNING id"
+        ), {"name": BENCH_CAREER_TYPE}).scalar()
+        service_id = connection.execute(text(
+            "INSERT INTO services (name, description, price, category, currency, user_id, career_type_id, duration_minutes) "
+            "SELECT 'Service ' || i, 'Database mode benchmark', 10 + i % 500, 'category-' || i % 10, 'MYR', "
+            "       :provider_id, :career_type_id, 60 "
+            "FROM generate_series(1, :services) i RETURNING id"
+        ), {"provider_id": provider_id, "career_type_id": career_type_id, "services": services}).scalars().first()
+        connection.execute(text(
+            "INSERT INTO bookings (user_id, provider_id, service_id, booking_date, status, payment_status) "
+            "SELECT :customer_id, :provider_id, :service_id, now() - make_interval(hours => i), 'completed', 'paid' "
+            "FROM generate_series(1, :bookings) i"
+        ), {"customer_id": customer_id, "provider_id": provider_id, "service_id": service_id, "bookings": bookings})
+        connection.execute(text("ANALYZE users, services, bookings"))
+    return {"provider_id": provider_id, "service_id": service_id}
+
+
+def clean():
+    with engine.begin() as connection:
+        params = {"email": BENCH_PROVIDER_EMAIL, "customer": f"customer-{BENCH_PROVIDER_EMAIL}",
+                  "career_type": BENCH_CAREER_TYPE}
+        connection.execute(text(
+            "DELETE FROM bookings WHERE provider_id IN (SELECT id FROM users WHERE email = :email)"
+        ), params)
+        connection.execute(text("DELETE FROM services WHERE user_id IN (SELECT id FROM users WHERE email = :email)"), params)
+        connection.execute(text("DELETE FROM users WHERE email IN (:email, :customer)"), params)
+        connection.execute(text("DELETE FROM career_types WHERE name = :career_type"), params)
+
+
+def request_paths(ids: dict, count: int) -> list:
+    tomorrow = date.today() + timedelta(days=1)
+    templates = (
+        "/services/services/search?category=category-{n}&limit=20",
+        "/bookings/bookings/?provider_id={provider_id}&limit=20",
+        "/bookings/bookings/availability?provider_id={provider_id}&service_id={service_id}"
+        "&date_from={day}&date_to={day}",
+    )
+    return [
+        templates[i % len(templates)].format(n=i % 10, day=tomorrow.isoformat(), **ids)
+        for i in range(count)
+    ]
+
+
+async def drive(base_url: str, paths: list, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    queue = iter(paths)
+
+    async def worker(client):
+        nonlocal errors
+        for path in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+            except httpx.TransportError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    return {"rps": len(latencies) / elapsed, "p50": percentile(0.50), "p95": percentile(0.95),
+            "p99": percentile(0.99), "errors": errors}
+
+
+def start_server(mode: str, port: int, pool_size: int, max_overflow: int) -> subprocess.Popen:
+    environment = {**os.environ, "DATABASE_MODE": mode, "DB_POOL_SIZE": str(pool_size),
+                   "DB_MAX_OVERFLOW": str(max_overflow)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=environment,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn did not start in {mode} mode")
+
+
+def run(services: int, bookings: int, requests: int, concurrency: int, port: int, pool_size: int,
+        max_overflow: int):
+    clean()
+    ids = seed(services, bookings)
+    paths = request_paths(ids, requests)
+    print(f"{requests:,} requests at concurrency {concurrency}, pool {pool_size} + {max_overflow} overflow")
+    print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    try:
+        for mode in ("sync", "async"):
+            server = start_server(mode, port, pool_size, max_overflow)
+            try:
+                asyncio.run(drive(f"http://127.0.0.1:{port}", paths[:concurrency], concurrency))  # Warm up
+                result = asyncio.run(drive(f"http://127.0.0.1:{port}", paths, concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{mode:<6} {result['rps']:>8.0f} {result['p50']:>8.1f} {result['p95']:>8.1f} "
+                  f"{result['p99']:>8.1f} {result['errors']:>7}")
+    finally:
+        clean()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async request path load test")
+    parser.add_argument("--services", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--max-overflow", type=int, default=20)
+    args = parser.parse_args()
+    run(args.services, args.bookings, args.requests, args.concurrency, args.port, args.pool_size, args.max_overflow)
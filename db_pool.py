@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+import database
+from metrics import Histogram, count_query
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Connection pool settings (per process; total connections = workers * (size + overflow))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))  # Max wait for a free connection
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in {"true", "1", "yes", "on"}
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = no server-side timeout
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+# "sync" keeps every route on database.get_db; "async" mounts the asyncpg-backed routers
+# as well. Only async mode imports async_database (and so needs asyncpg and greenlet).
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+
+# How long callers wait for a connection, and how long they keep it
+checkout_wait_seconds = Histogram()
+connection_hold_seconds = Histogram()
+query_seconds = Histogram()
+
+
+def engine_options(async_driver: bool = False) -> dict:
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS:
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+# QueuePool that times how long each checkout waits and counts current waiters
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiting_lock = threading.Lock()
+        self.waiting = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        with self._waiting_lock:
+            self.waiting += 1
+        try:
+            return super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            with self._waiting_lock:
+                self.waiting -= 1
+            checkout_wait_seconds.observe(time.perf_counter() - started)
+
+
+def _statement_finished(conn, statement: str):
+    started_at = conn.info.get("query_started_at")
+    if not started_at:
+        return
+    elapsed = time.perf_counter() - started_at.pop()
+    query_seconds.observe(elapsed)  # Failed statements too, e.g. ones cancelled by statement_timeout
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            connection_hold_seconds.observe(time.perf_counter() - checked_out_at)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+        count_query()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _statement_finished(conn, statement)
+
+    # A failed statement never reaches after_cursor_execute; pop its start time here
+    # so it doesn't pair up with (and skew) the next statement on this connection
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        if exception_context.connection is not None and exception_context.statement is not None:
+            _statement_finished(exception_context.connection, exception_context.statement)
+
+    return engine
+
+
+def build_engine(url: str):
+    return instrument_engine(create_engine(url, poolclass=InstrumentedQueuePool, **engine_options()))
+
+
+# The configured, instrumented engine. Nothing connects until it is first used.
+engine = build_engine(database.DATABASE_URL)
+_configured = False
+
+
+# database.py creates a default-configured engine; point the shared SessionLocal at this
+# one instead, so every get_db session uses it. Call once at startup, before any session
+# is opened (the API lifespan and each standalone worker's entry point do).
+def configure_pool():
+    global _configured
+    if _configured:
+        return
+    database.SessionLocal.configure(bind=engine)
+    database.engine.dispose()
+    _configured = True
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    capacity = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "waiting": getattr(pool, "waiting", 0),
+        "timeouts": getattr(pool, "timeouts", 0),
+        "saturation": (checked_out / capacity) if capacity else 0.0,
+        "checkout_wait_seconds": checkout_wait_seconds.summary(),
+        "connection_hold_seconds": connection_hold_seconds.summary(),
+        "query_seconds": query_seconds.summary(),
+        "slow_query_threshold_ms": DB_SLOW_QUERY_MS,
+    }
+
+
+# The plan Postgres actually ran for a select(), for the benchmarks: `print(explain_analyze(...))`
+def explain_analyze(connection, statement) -> str:
+    compiled = statement.compile(dialect=connection.dialect)
+    rows = connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {compiled}", compiled.params)
+    return "\n".join(row[0] for row in rows)
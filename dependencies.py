@@ -1,18 +1,27 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from database import get_db
-from utils import verify_token
+from auth_tokens import InvalidToken, Principal, decode_token, principal_from_claims
 from models import User
 from fastapi import Request
+from token_revocation import revocation_store
 
 # OAuth2PasswordBearer instance to extract token from Authorization header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(
-    request: Request,
-    db: Session = Depends(get_db)
-) -> User:
+
+# Load the principal for a token subject from the database, for tokens without claims
+def load_principal(db: Session, user_email: str) -> Principal:
+    # Fetch the user and their roles together instead of lazy-loading roles later
+    user = db.query(User).options(selectinload(User.roles)).filter(User.email == user_email).first()
+    if not user:
+        return None
+    return Principal.from_user(user)
+
+
+# Raw access token from the cookie, or the Authorization header as a fallback
+def token_from_request(request: Request) -> str:
     # Try to get token from the cookie
     token = request.cookies.get("access_token")
 
@@ -24,16 +33,34 @@ def get_current_user(
 
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    return token
 
-    payload = verify_token(token)  # Verify and decode the token
-    if payload is None:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    user_email = payload.get("sub")  # Assuming 'sub' is the email in the token payload
-    user = db.query(User).filter(User.email == user_email).first()
+def get_token_payload(request: Request) -> dict:
+    try:
+        return decode_token(token_from_request(request))  # Served from the decoded-token cache after the first request
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=e.detail)
+
+
+def get_current_user(
+    request: Request,
+    db: Session = Depends(get_db)
+) -> Principal:
+    payload = get_token_payload(request)
+
+    # Access tokens carry id, verified flag and roles, so most requests never touch the database
+    user = principal_from_claims(payload)
+    if user is None:
+        user_email = payload.get("sub")  # Assuming 'sub' is the email in the token payload
+        user = load_principal(db, user_email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # In-memory check kept in sync across workers by token_revocation's listener
+    if revocation_store.is_revoked(user.id, payload):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
     if not user.is_verified:
         raise HTTPException(status_code=403, detail="Email not verified")
 
@@ -41,18 +68,17 @@ def get_current_user(
 
 # Role check decorator
 def role_required(required_roles: list[str]):
-    def role_checker(current_user: User = Depends(get_current_user)):
-        user_roles = [role.name for role in current_user.roles]
-        if not any(role in user_roles for role in required_roles):
+    def role_checker(current_user: Principal = Depends(get_current_user)):
+        if not any(role in current_user.role_names for role in required_roles):
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return current_user
     return role_checker
 
 
 # Helper function to check if user has admin role (case-insensitive)
-def admin_only(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> User:
+def admin_only(current_user: Principal = Depends(get_current_user)) -> Principal:
     # Ensure that the user has the admin role (case-insensitive)
-    if not any(role.name.lower() == "admin" for role in current_user.roles):  # Convert to lowercase for comparison
+    if not current_user.has_role("admin"):
         raise HTTPException(status_code=403, detail="Not authorized as admin")
 
     return current_user
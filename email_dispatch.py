@@ -0,0 +1,83 @@
+import os
+import smtplib
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+
+# SMTP server settings (point these at smtp_sink.py to run without a real mail server)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() in {"true", "1", "yes", "on"}
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+
+# Connection reuse settings
+EMAIL_CONNECTION_IDLE_SECONDS = float(os.getenv("EMAIL_CONNECTION_IDLE_SECONDS", "60"))
+EMAIL_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("EMAIL_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+
+def build_message(to_email: str, subject: str, html_body: str, text_body: str = None) -> MIMEMultipart:
+    # With a text part the message is multipart/alternative: clients show the last part they can render
+    msg = MIMEMultipart('alternative') if text_body is not None else MIMEMultipart()
+    msg['From'] = EMAIL_ADDRESS
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    if text_body is not None:
+        msg.attach(MIMEText(text_body, 'plain'))
+    msg.attach(MIMEText(html_body, 'html'))  # Attach the HTML body content
+    return msg
+
+
+# A long-lived, authenticated SMTP connection that is reused across messages
+class SMTPConnection:
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, use_tls: bool = SMTP_USE_TLS):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self._server = None
+        self._last_used = 0.0
+        self._sent_on_connection = 0
+        self.connections_opened = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        if self.use_tls:
+            server.starttls()  # Secure the connection
+        if EMAIL_ADDRESS and EMAIL_PASSWORD:
+            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+        self._server = server
+        self._sent_on_connection = 0
+        self.connections_opened += 1
+
+    def _ensure_connected(self):
+        if self._server is not None:
+            idle = time.monotonic() - self._last_used
+            if idle > EMAIL_CONNECTION_IDLE_SECONDS or self._sent_on_connection >= EMAIL_MAX_MESSAGES_PER_CONNECTION:
+                self.close()
+        if self._server is None:
+            self._connect()
+
+    def send(self, to_email: str, subject: str, html_body: str, text_body: str = None):
+        self._ensure_connected()
+        msg = build_message(to_email, subject, html_body, text_body)
+        try:
+            self._server.sendmail(EMAIL_ADDRESS, to_email, msg.as_string())
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError):
+            # The connection is in an unknown state; drop it so the next send reconnects
+            self.close()
+            raise
+        self._sent_on_connection += 1
+        self._last_used = time.monotonic()
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
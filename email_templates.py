@@ -0,0 +1,119 @@
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+from markupsafe import Markup
+
+load_dotenv()
+
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:9550")  # Default to localhost if not found
+
+EMAIL_TEMPLATE_DIR = os.getenv(
+    "EMAIL_TEMPLATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "email")
+)
+# Compiled template bytecode is kept here, so restarts and extra workers skip the Jinja parser
+EMAIL_TEMPLATE_CACHE_DIR = os.getenv(
+    "EMAIL_TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "serviceapp-email-templates")
+)
+
+# Every email has <name>.html (wrapped in _layout.html) and <name>.txt
+EMAIL_TEMPLATES = (
+    "booking_confirmation", "booking_reminder", "booking_reminder_digest", "verification", "password_reset"
+)
+
+_CONTENT_SLOT = "\x00content\x00"
+
+RenderedEmail = namedtuple("RenderedEmail", ["html", "text"])
+
+
+# Templates are compiled once (load() at startup, or on first use) and the layout, which is
+# the same in every email, is rendered once and split around its content slot. A render is
+# then just the per-email body plus two string concatenations.
+class EmailTemplates:
+    def __init__(self, template_dir: str = EMAIL_TEMPLATE_DIR, cache_dir: str = EMAIL_TEMPLATE_CACHE_DIR):
+        self.template_dir = template_dir
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._compiled = None  # name -> (html template, text template)
+        self._chrome = None  # (layout before the content, layout after it)
+        self.loads = 0
+        self.renders = 0
+
+    def _environment(self) -> Environment:
+        bytecode_cache = None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(self.cache_dir)
+        environment = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            bytecode_cache=bytecode_cache,
+            autoescape=select_autoescape(["html"]),  # Names and links are escaped in HTML, not in text
+            auto_reload=False,  # Templates only change with a deploy
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+        )
+        environment.globals["frontend_url"] = FRONTEND_URL
+        return environment
+
+    def load(self):
+        environment = self._environment()
+        layout = environment.get_template("_layout.html").render(content=Markup(_CONTENT_SLOT))
+        before, after = layout.split(_CONTENT_SLOT)
+        compiled = {
+            name: (environment.get_template(f"{name}.html"), environment.get_template(f"{name}.txt"))
+            for name in EMAIL_TEMPLATES
+        }
+        with self._lock:
+            self._compiled = compiled
+            self._chrome = (before, after)
+            self.loads += 1
+
+    def render(self, name: str, **context) -> RenderedEmail:
+        if self._compiled is None:
+            self.load()
+        html_template, text_template = self._compiled[name]
+        before, after = self._chrome
+        self.renders += 1
+        return RenderedEmail(before + html_template.render(context) + after, text_template.render(context))
+
+    def stats(self) -> dict:
+        return {"templates": len(self._compiled or ()), "loads": self.loads, "renders": self.renders}
+
+
+email_templates = EmailTemplates()
+
+
+def load_email_templates():
+    email_templates.load()
+
+
+# Reminder renders per second with the compiled templates: `python email_templates.py --bench`
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Email template render benchmark")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark")
+    parser.add_argument("--emails", type=int, default=20000, help="Reminder emails to render")
+    args = parser.parse_args()
+
+    if args.bench:
+        started = time.perf_counter()
+        email_templates.load()
+        print(f"load        {(time.perf_counter() - started) * 1000:10.1f} ms")
+
+        started = time.perf_counter()
+        for i in range(args.emails):
+            email_templates.render(
+                "booking_reminder",
+                id=i,
+                user_full_name=f"Customer {i}",
+                provider_full_name="Provider",
+                service_name="Consultation",
+                booking_date="2026-10-18 10:00:00",
+            )
+        elapsed = time.perf_counter() - started
+        print(f"render      {args.emails / elapsed:10,.0f} emails/s ({args.emails * 60 / elapsed:,.0f}/min)")
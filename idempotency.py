@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, update, delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from db_pool import engine
+from models import IdempotencyKey
+
+load_dotenv()
+
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))  # How long a stored response is replayed
+IDEMPOTENCY_KEY_MAX_LENGTH = 200  # As sent by the client; the stored key adds the user id in front
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def _expired_before():
+    return func.now() - func.make_interval(0, 0, 0, 0, IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+# Keys are per user: the same Idempotency-Key from two users names two different requests
+def scoped_key(user_id: int, key: str) -> str:
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+    return f"{user_id}:{key}"
+
+
+# Stable hash of the request body, so a key reused for a different request can be refused
+def request_fingerprint(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# Claim (key, endpoint) inside the caller's transaction, key being a scoped_key().
+# Returns None when the caller owns the key and should do the work, or the stored
+# (status_code, body) to replay. A concurrent request with the same key blocks on the
+# primary key until the first transaction commits (then sees its response) or rolls
+# back (then claims it itself).
+def claim_key(db, key: str, endpoint: str, request_hash: str):
+    statement = pg_insert(IdempotencyKey).values(key=key, endpoint=endpoint, request_hash=request_hash)
+    # A key older than the TTL is taken over in place rather than replayed
+    statement = statement.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key, IdempotencyKey.endpoint],
+        set_={
+            "request_hash": statement.excluded.request_hash,
+            "status_code": None,
+            "response_body": None,
+            "created_at": func.now(),
+        },
+        where=IdempotencyKey.created_at < _expired_before(),
+    ).returning(literal_column("1"))
+    if db.execute(statement).first() is not None:
+        return None
+
+    stored = db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body)
+        .where(IdempotencyKey.key == key, IdempotencyKey.endpoint == endpoint)
+    ).first()
+    if stored is None or stored.status_code is None:
+        # Pruned between the two statements; the client can simply retry
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return stored.status_code, stored.response_body
+
+
+# Record the response in the same transaction as the work, so both commit or neither does
+def store_response(db, key: str, endpoint: str, status_code: int, body):
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.endpoint == endpoint)
+        .values(status_code=status_code, response_body=body)
+    )
+
+
+def replay_response(stored) -> JSONResponse:
+    status_code, body = stored
+    return JSONResponse(status_code=status_code, content=body, headers={REPLAY_HEADER: "true"})
+
+
+def prune_expired_keys() -> int:
+    with engine.begin() as connection:
+        return connection.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < _expired_before())).rowcount
+
+
+if __name__ == "__main__":
+    print({"pruned": prune_expired_keys()})
@@ -1,23 +1,71 @@
 from fastapi import FastAPI
+from logging_config import configure_logging, shutdown_logging, RequestIdMiddleware
+
+configure_logging()  # Before the other imports, so module-level loggers go through the queue
+
+from db_pool import DATABASE_MODE, configure_pool
 from routers import auth, user, roles, verify, career_type_router, admin_panel_user_management
-from routers import service_router, user_profile_router, booking_router
+from routers import service_router, user_profile_router, booking_router, metrics_router
 from sche import start_scheduler, stop_scheduler
+from password_service import password_service
+from activity_log_sink import start_activity_log_sink, stop_activity_log_sink
+from activity_log_partitions import partition_maintainer
+from token_revocation import revocation_listener
+from catalogue_cache import CATALOGUE_CHANNEL, catalogue_cache
+from outbox import start_outbox_relay, stop_outbox_relay
+from email_templates import load_email_templates
+from request_metrics import MetricsMiddleware
+from rate_limit import RateLimitMiddleware
 
 
 # Define lifespan function to handle startup and shutdown events
 async def lifespan(app: FastAPI):
     # Run startup tasks
+    configure_pool()  # Before anything opens a database session
+    load_email_templates()  # Compile the email templates before the first email is rendered
     start_scheduler()  # Start the scheduler when the app starts
+    password_service.start()  # Spawn the bcrypt worker processes up front
+    start_activity_log_sink()  # Start batching activity log writes
+    partition_maintainer.start()  # Keep activity log partitions created ahead and pruned
+    if catalogue_cache.publish is not None:
+        # In-memory catalogue cache: drop cached pages when another worker changes the catalogue
+        revocation_listener.subscribe(CATALOGUE_CHANNEL, catalogue_cache.apply_remote_invalidation)
+    revocation_listener.start()  # Load revoked tokens and follow revocations from other workers
+    start_outbox_relay()  # Deliver emails recorded in the outbox
 
     # Yield control to FastAPI (this is where FastAPI starts handling requests)
     yield
 
     # Run shutdown tasks
     stop_scheduler()  # Stop the scheduler when the app shuts down
+    password_service.shutdown()
+    stop_activity_log_sink()  # Flush buffered activity logs before exiting
+    partition_maintainer.stop()
+    revocation_listener.stop()
+    stop_outbox_relay()  # Undelivered rows stay in the outbox for the next start
+    if DATABASE_MODE == "async":
+        from async_database import dispose_async_engine
+        await dispose_async_engine()
+    shutdown_logging()  # Last, so shutdown messages from the workers above are flushed
 
 
 # Create FastAPI app with lifespan handler
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(RateLimitMiddleware)  # Innermost: 429s still get a request id, and are labelled with the limited route in the metrics
+app.add_middleware(MetricsMiddleware)  # Per-route latency, in-flight and query-count metrics
+app.add_middleware(RequestIdMiddleware)  # Outermost, so every log line of a request carries its id
+
+# With DATABASE_MODE=async the asyncpg-backed routers are included first, so they serve
+# the service, booking, profile, career type and admin user paths they cover and the
+# sync versions of those are never reached
+if DATABASE_MODE == "async":
+    from routers import async_service_router, async_booking_router, async_user_profile_router
+    from routers import async_career_type_router, async_admin_router
+    app.include_router(async_service_router.router, prefix="/services", tags=["services"])
+    app.include_router(async_booking_router.router, prefix="/bookings", tags=["bookings"])
+    app.include_router(async_user_profile_router.router, prefix="/user-profile", tags=["user-profile"])
+    app.include_router(async_career_type_router.router, prefix="/admin", tags=["admin"])
+    app.include_router(async_admin_router.router, prefix="/admin_panel", tags=["admin_panel"])
 
 # Include the routers for authentication, user management, role management, and email verification
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -28,4 +76,5 @@ app.include_router(career_type_router.router, prefix="/admin", tags=["admin"])
 app.include_router(service_router.router, prefix="/services", tags=["services"])
 app.include_router(user_profile_router.router, prefix="/user-profile", tags=["user-profile"])
 app.include_router(booking_router.router, prefix="/bookings", tags=["bookings"])
-app.include_router(admin_panel_user_management.router, prefix="/admin_panel", tags=["admin_panel"])
\ No newline at end of file
+app.include_router(admin_panel_user_management.router, prefix="/admin_panel", tags=["admin_panel"])
+app.include_router(metrics_router.router, tags=["metrics"])
\ No newline at end of file
@@ -0,0 +1,146 @@
+import bisect
+import threading
+from contextvars import ContextVar
+
+# Latency buckets in seconds (upper bounds), roughly exponential from 1ms to 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Fixed-bucket histogram; observe() is a bisect plus two additions under a lock
+class Histogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = [], 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation (good enough for dashboards)
+        snapshot = self.snapshot()
+        if not snapshot["count"]:
+            return 0.0
+        target = q * snapshot["count"]
+        for bound, running in snapshot["buckets"]:
+            if running >= target:
+                # Report overflow as the largest finite bound so the value stays JSON-safe
+                return bound if bound != float("inf") else self.buckets[-1]
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        snapshot = self.snapshot()
+        count = snapshot["count"]
+        return {
+            "count": count,
+            "mean": (snapshot["sum"] / count) if count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+# A family of histograms keyed by label values, e.g. (method, route, status)
+class LabeledHistogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(_histogram_samples(self.name, child, _format_labels(self.label_names, values)))
+        return lines
+
+
+# Counters and gauges keyed by label values
+class LabeledValue:
+    def __init__(self, name: str, help_text: str, label_names: tuple, metric_type: str):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.metric_type = metric_type
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount: float = 1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def dec(self, *values, amount: float = 1):
+        self.inc(*values, amount=-amount)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{{{_format_labels(self.label_names, values)}}} {value}")
+        return lines
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    return ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+
+
+def _histogram_samples(name: str, histogram: Histogram, labels: str = "") -> list:
+    snapshot = histogram.snapshot()
+    lines = []
+    for bound, running in snapshot["buckets"]:
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {running}')
+    lines.append(f"{name}_sum{{{labels}}} {snapshot['sum']}")
+    lines.append(f"{name}_count{{{labels}}} {snapshot['count']}")
+    return lines
+
+
+def render_histogram(name: str, help_text: str, histogram: Histogram) -> list:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"] + _histogram_samples(name, histogram)
+
+
+def render_value(name: str, help_text: str, value: float, metric_type: str = "gauge") -> list:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {float(value)}"]
+
+
+# Per-request SQL statement counter. The metrics middleware sets a fresh [0] per request;
+# the engine's cursor hook increments it. A list so increments made in threadpool
+# copies of the context land on the same object.
+current_query_counter: ContextVar = ContextVar("current_query_counter", default=None)
+
+
+def count_query():
+    counter = current_query_counter.get()
+    if counter is not None:
+        counter[0] += 1
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Table, ForeignKey, Float, Text
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Boolean, DateTime, Time, Table, ForeignKey, Float, Text, Index, text, Computed, CheckConstraint
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, JSONB, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -47,6 +50,10 @@ class UserProfile(Base):
 
 class User(Base):
     __tablename__ = 'users'
+    # Emails are unique regardless of case, matching the case-insensitive existence checks
+    __table_args__ = (
+        Index('ux_users_email_lower', text('lower(email)'), unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
@@ -55,6 +62,8 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Access tokens carry the version they were issued at; bumping it revokes them all
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     roles = relationship("Role", secondary=user_roles, back_populates="users")
     services = relationship("Service", back_populates="user")
@@ -86,15 +95,25 @@ class Role(Base):
 
 class Service(Base):
     __tablename__ = 'services'
+    __table_args__ = (
+        Index('ix_services_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_services_price_id', 'price', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     description = Column(String)
     price = Column(Float)
-    category = Column(String)
+    category = Column(String, index=True)
     currency = Column(String, default="MYR")  # Optional field with a default value
-    user_id = Column(Integer, ForeignKey('users.id'))  # Foreign key to users
-    career_type_id = Column(Integer, ForeignKey('career_types.id'))  # Foreign key to career_types table
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)  # Foreign key to users
+    career_type_id = Column(Integer, ForeignKey('career_types.id'), index=True)  # Foreign key to career_types table
+    duration_minutes = Column(Integer, nullable=False, default=60, server_default="60")  # Length of one booking
+    # Full-text search document over name and description, maintained by Postgres
+    search_vector = Column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))", persisted=True)
+    )
 
     user = relationship("User", back_populates="services")
     career_type = relationship("CareerType", back_populates="services")
@@ -110,14 +129,33 @@ class Service(Base):
 
 class Booking(Base):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        # Keyset pagination of customer and provider booking histories
+        Index('ix_bookings_user_id_booking_date_id', 'user_id', 'booking_date', 'id'),
+        Index('ix_bookings_provider_id_booking_date_id', 'provider_id', 'booking_date', 'id'),
+        # Reminder dispatcher scan of unsent reminders
+        Index('ix_bookings_pending_reminder_time', 'reminder_time', postgresql_where=text('reminder_sent_at IS NULL')),
+        # A provider can't hold two active bookings whose [booking_date, booking_end) overlap.
+        # The GiST index behind it also answers conflict and availability probes in O(log n).
+        ExcludeConstraint(
+            ('provider_id', '='),
+            (text('tsrange(booking_date, booking_end)'), '&&'),
+            name='ex_bookings_provider_no_overlap',
+            using='gist',
+            where=text("booking_end IS NOT NULL AND status NOT IN ('cancelled', 'rejected')"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     provider_id = Column(Integer, ForeignKey('users.id'))
     service_id = Column(Integer, ForeignKey('services.id'))
     booking_date = Column(DateTime)
+    booking_end = Column(DateTime, nullable=True)  # booking_date + the service's duration
     reminder_time = Column(DateTime)
-    status = Column(String, default="pending")  # Add the status field
+    reminder_sent_at = Column(DateTime, nullable=True)  # Set by the reminder dispatcher once sent
+    # NOT NULL so the exclusion constraint's "status NOT IN (...)" can't skip a booking
+    status = Column(String, nullable=False, default="pending", server_default="pending")
     payment_status = Column(String, default="unpaid")  # Add the payment_status field
 
     user = relationship("User", back_populates="bookings_as_customer", foreign_keys=[user_id])
@@ -139,11 +177,80 @@ class Booking(Base):
 
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
-
-    id = Column(Integer, primary_key=True, index=True)
+    # Monthly range partitions on timestamp; see activity_log_partitions.py for creation/retention
+    __table_args__ = (
+        Index('ix_activity_logs_timestamp_id', 'timestamp', 'id'),
+        Index('ix_activity_logs_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        Index('ix_activity_logs_action_timestamp_id', 'action', 'timestamp', 'id'),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for system actions
     action = Column(String(100), nullable=False)
     details = Column(Text, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-
-    user = relationship("User", back_populates="activity_logs")
\ No newline at end of file
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)  # Partition key, so part of the PK
+
+    user = relationship("User", back_populates="activity_logs")
+
+
+# Individually revoked access tokens (logout), kept until the token would have expired anyway
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Weekly working hours of a provider, optionally for one service only (service_id NULL = all).
+# Bookable slots are generated from these rules by availability.py.
+class ProviderAvailability(Base):
+    __tablename__ = "provider_availability"
+    __table_args__ = (
+        Index('ix_provider_availability_provider_id_weekday', 'provider_id', 'weekday'),
+        CheckConstraint('weekday BETWEEN 0 AND 6', name='ck_provider_availability_weekday'),
+        CheckConstraint('start_time < end_time', name='ck_provider_availability_hours'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    provider_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), nullable=True)
+    weekday = Column(Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    slot_minutes = Column(Integer, nullable=True)  # Gap between slot starts; defaults to the service duration
+
+
+# Stored outcome of a request sent with an Idempotency-Key header. The row is written in
+# the same transaction as the work it guards, so a retry either sees the committed
+# response or blocks on the primary key until the first attempt finishes.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String(100), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+# Side effects (emails) recorded in the same transaction as the change that causes them.
+# outbox.py's relay delivers pending rows and marks them sent; nothing is lost if the
+# process dies between the commit and the delivery.
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index('ix_outbox_pending', 'available_at', postgresql_where=text('sent_at IS NULL')),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Next delivery attempt
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True, index=True)
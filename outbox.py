@@ -0,0 +1,281 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from sqlalchemy import select, insert, update, delete, func
+from database import SessionLocal
+from email_dispatch import SMTPConnection
+from models import OutboxMessage
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Relay settings
+OUTBOX_RELAY_WORKERS = int(os.getenv("OUTBOX_RELAY_WORKERS", "2"))  # Threads per process, each with one SMTP connection
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))  # Rows claimed per transaction
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))  # Rows are left for inspection after this many failures
+OUTBOX_RETRY_BACKOFF_SECONDS = float(os.getenv("OUTBOX_RETRY_BACKOFF_SECONDS", "30"))
+# A claimed batch is left to other relays if its outcome isn't recorded within this long
+# (e.g. the process died mid-batch); keep it well above a batch's worst-case send time
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "72"))  # Delivered rows are deleted after this
+OUTBOX_PRUNE_SECONDS = float(os.getenv("OUTBOX_PRUNE_SECONDS", "600"))
+# How often the relay re-counts the backlog for the metrics, which only read the last count
+OUTBOX_BACKLOG_REFRESH_SECONDS = float(os.getenv("OUTBOX_BACKLOG_REFRESH_SECONDS", "15"))
+# Run the relay inside the API process; set to false when running `python outbox.py` workers instead
+OUTBOX_RELAY_EMBEDDED = os.getenv("OUTBOX_RELAY_EMBEDDED", "true").lower() in {"true", "1", "yes", "on"}
+
+# kind -> handler(smtp, payload). Handlers raise to have the row retried later.
+HANDLERS = {}
+
+
+def register_handler(kind: str):
+    def decorator(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+# Add a message to the caller's transaction; it is only delivered if that transaction commits
+def enqueue(db, kind: str, payload: dict, available_at: datetime = None) -> OutboxMessage:
+    message = OutboxMessage(kind=kind, payload=payload)
+    if available_at is not None:
+        message.available_at = available_at
+    db.add(message)
+    return message
+
+
+# One multi-row INSERT for bulk callers (e.g. the user import)
+def enqueue_many(db, kind: str, payloads: list):
+    if payloads:
+        db.execute(insert(OutboxMessage), [{"kind": kind, "payload": payload} for payload in payloads])
+
+
+def pending_select(batch_size: int):
+    # SKIP LOCKED lets any number of relay threads and processes drain the table
+    # side by side, each claiming a disjoint batch without waiting on the others
+    return (
+        select(OutboxMessage.id)
+        .where(
+            OutboxMessage.sent_at.is_(None),
+            OutboxMessage.available_at <= datetime.now(timezone.utc),
+            OutboxMessage.attempts < OUTBOX_MAX_ATTEMPTS,
+        )
+        .order_by(OutboxMessage.available_at, OutboxMessage.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+# Lease the next batch: push available_at of the pending rows to lease_until, so no other
+# relay picks them up until then. Committed before anything is sent.
+def claim_statement(batch_size: int, lease_until: datetime):
+    return (
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(pending_select(batch_size).scalar_subquery()))
+        .values(available_at=lease_until)
+        .returning(OutboxMessage.id, OutboxMessage.kind, OutboxMessage.payload, OutboxMessage.attempts)
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    # Exponential backoff: 1x, 2x, 4x ... OUTBOX_RETRY_BACKOFF_SECONDS after each failure
+    return timedelta(seconds=OUTBOX_RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1)))
+
+
+class OutboxRelay:
+    def __init__(self, workers: int = OUTBOX_RELAY_WORKERS, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_seconds: float = OUTBOX_POLL_SECONDS):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._threads = []
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._last_prune = 0.0
+        self._last_backlog_refresh = 0.0
+        self.last_backlog = None  # backlog() as of the last refresh; None until the relay has run
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    # Lease a batch (short transaction), deliver it with no transaction or row lock open,
+    # then record the outcomes (second short transaction). Outcomes are only written while
+    # the lease is still ours; if it ran out and another relay re-claimed a row, that relay
+    # owns it now. A crash between the two leaves the rows to be retried once the lease
+    # expires, so delivery is at least once.
+    def relay_batch(self, smtp: SMTPConnection) -> int:
+        lease_until = datetime.now(timezone.utc) + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        db = SessionLocal()
+        try:
+            messages = db.execute(claim_statement(self.batch_size, lease_until)).all()
+            db.commit()
+        finally:
+            db.close()
+        if not messages:
+            return 0
+
+        sent_ids, failures = [], []
+        for message in messages:
+            handler = HANDLERS.get(message.kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"No outbox handler for '{message.kind}'")
+                handler(smtp, message.payload)
+                sent_ids.append(message.id)
+            except Exception as e:
+                failures.append((message, e))
+
+        dead = 0
+        now = datetime.now(timezone.utc)
+        leased = OutboxMessage.available_at == lease_until
+        db = SessionLocal()
+        try:
+            if sent_ids:
+                db.execute(update(OutboxMessage).where(OutboxMessage.id.in_(sent_ids), leased).values(sent_at=now))
+            for message, e in failures:
+                attempts = message.attempts + 1
+                db.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id == message.id, leased)
+                    .values(attempts=attempts, last_error=str(e)[:1000], available_at=now + retry_delay(attempts))
+                )
+                if attempts >= OUTBOX_MAX_ATTEMPTS:
+                    dead += 1
+                    logger.error("Giving up on outbox message: %s", e,
+                                 extra={"outbox_id": message.id, "kind": message.kind})
+                else:
+                    logger.warning("Outbox delivery failed: %s", e,
+                                   extra={"outbox_id": message.id, "kind": message.kind, "sample_key": "outbox.failed"})
+            db.commit()
+        finally:
+            db.close()
+
+        with self._stats_lock:
+            self.sent += len(sent_ids)
+            self.failed += len(failures)
+            self.dead += dead
+            self.batches += 1
+        return len(messages)
+
+    def prune(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=OUTBOX_RETENTION_HOURS)
+        db = SessionLocal()
+        try:
+            pruned = db.execute(delete(OutboxMessage).where(OutboxMessage.sent_at < cutoff)).rowcount
+            db.commit()
+            return pruned
+        finally:
+            db.close()
+
+    def _maybe_prune(self):
+        with self._stats_lock:
+            if time.monotonic() - self._last_prune < OUTBOX_PRUNE_SECONDS:
+                return
+            self._last_prune = time.monotonic()
+        self.prune()
+
+    def _maybe_refresh_backlog(self):
+        with self._stats_lock:
+            if time.monotonic() - self._last_backlog_refresh < OUTBOX_BACKLOG_REFRESH_SECONDS:
+                return
+            self._last_backlog_refresh = time.monotonic()
+        self.last_backlog = self.backlog()
+
+    def run_forever(self):
+        smtp = SMTPConnection()  # Reused across batches, reconnecting when idle
+        try:
+            while not self._stopping.is_set():
+                try:
+                    # Keep draining while batches come back full, then wait for the next poll
+                    while self.relay_batch(smtp) >= self.batch_size and not self._stopping.is_set():
+                        pass
+                    self._maybe_prune()
+                    self._maybe_refresh_backlog()
+                except Exception:
+                    logger.exception("Error relaying outbox messages")
+                self._stopping.wait(self.poll_seconds)
+        finally:
+            smtp.close()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.run_forever, name=f"outbox-relay-{index}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    # Table-wide, unlike stats(): undelivered rows still being retried, how long the oldest
+    # has waited (in database time), and rows left behind after their last attempt
+    def backlog(self) -> dict:
+        retrying = OutboxMessage.attempts < OUTBOX_MAX_ATTEMPTS
+        db = SessionLocal()
+        try:
+            pending, oldest_age, dead = db.execute(
+                select(
+                    func.count().filter(retrying),
+                    func.extract("epoch", func.now() - func.min(OutboxMessage.created_at).filter(retrying)),
+                    func.count().filter(~retrying),
+                ).where(OutboxMessage.sent_at.is_(None))
+            ).one()
+        finally:
+            db.close()
+        return {"pending": pending, "oldest_pending_age_seconds": float(oldest_age or 0), "dead": dead}
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": len(self._threads),
+                "sent": self.sent,
+                "failed": self.failed,
+                "dead": self.dead,
+                "batches": self.batches,
+            }
+
+
+outbox_relay = OutboxRelay()
+
+
+def start_outbox_relay():
+    if OUTBOX_RELAY_EMBEDDED:
+        outbox_relay.start()
+
+
+def stop_outbox_relay():
+    outbox_relay.stop()
+
+
+# Run relay workers as a standalone process: `python outbox.py`. Start as many as needed.
+if __name__ == "__main__":
+    # Importing these registers their handlers, on the importable "outbox" module rather than on __main__
+    import email_utils
+    import sche
+    from outbox import outbox_relay as relay
+    from db_pool import configure_pool
+
+    configure_pool()
+
+    print(f"Outbox relay: {OUTBOX_RELAY_WORKERS} worker(s), batch size {OUTBOX_BATCH_SIZE}")
+    relay.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        relay.stop()
@@ -0,0 +1,42 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# Opaque keyset cursor: the sort-key values of the last row on the page.
+# Datetimes are tagged so they round-trip back to datetime objects.
+def encode_cursor(*values) -> str:
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+# Cursors come back from clients, so each value is checked against the type the query
+# expects (e.g. decode_cursor(cursor, float, int)); a forged one is a 400, not a DataError.
+def decode_cursor(cursor: str, *types) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("wrong cursor length")
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in payload]
+        return [_cursor_value(value, expected) for value, expected in zip(values, types)]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _cursor_value(value, expected: type):
+    if isinstance(value, bool):
+        raise TypeError("bool in cursor")
+    if expected is float and isinstance(value, int):
+        return float(value)  # JSON doesn't keep 10.0 and 10 apart
+    if not isinstance(value, expected):
+        raise TypeError(f"cursor value is not {expected.__name__}")
+    return value
+
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+load_dotenv()
+
+# Worker processes doing bcrypt, and how much work may queue up before we shed load
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", str(PASSWORD_POOL_SIZE * 8)))
+PASSWORD_POOL_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_POOL_RETRY_AFTER_SECONDS", "1"))
+
+# Password hashing context (the only one in the app; workers use it too)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# These run inside the worker processes, so they must stay module-level
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash_many(passwords: list) -> list:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+class PasswordService:
+    def __init__(self, pool_size: int = PASSWORD_POOL_SIZE, max_pending: int = PASSWORD_POOL_MAX_PENDING):
+        self.pool_size = pool_size
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.pool_size)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _acquire_slot(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please retry shortly",
+                    headers={"Retry-After": str(PASSWORD_POOL_RETRY_AFTER_SECONDS)},
+                )
+            self._pending += 1
+
+    def _release_slot(self, failed: bool):
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def _submit(self, fn, *args) -> Future:
+        if self._executor is None:
+            self.start()
+        self._acquire_slot()
+        try:
+            return self._executor.submit(fn, *args)
+        except Exception:
+            self._release_slot(True)
+            raise
+
+    # Blocking: for sync routes, which FastAPI runs in its threadpool, off the event loop
+    def _run(self, fn, *args):
+        future = self._submit(fn, *args)
+        failed = True
+        try:
+            result = future.result()
+            failed = False
+            return result
+        finally:
+            self._release_slot(failed)
+
+    async def _run_async(self, fn, *args):
+        future = self._submit(fn, *args)
+        failed = True
+        try:
+            result = await asyncio.wrap_future(future)
+            failed = False
+            return result
+        finally:
+            self._release_slot(failed)
+
+    def hash_password(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: list) -> list:
+        # One task per worker rather than per password: bulk imports take pool_size
+        # slots however many rows they hash, and pay the IPC overhead once per slice
+        if not passwords:
+            return []
+        slices = [passwords[i::self.pool_size] for i in range(min(self.pool_size, len(passwords)))]
+        hashed_slices = await asyncio.gather(*(self._run_async(_hash_many, part) for part in slices))
+        hashed = [None] * len(passwords)
+        for offset, part in enumerate(hashed_slices):
+            hashed[offset::len(slices)] = part
+        return hashed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "max_pending": self.max_pending,
+                "queue_depth": max(0, self._pending - self.pool_size),
+                "in_flight": min(self._pending, self.pool_size),
+                "pending": self._pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+
+password_service = PasswordService()
+
+
+# Used by the sync routers; they block a threadpool thread, never the event loop
+def hash_password(password: str) -> str:
+    return password_service.hash_password(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return password_service.verify_password(plain_password, hashed_password)
+
+
+# Used by the bulk import, which runs on the event loop
+async def hash_passwords(passwords: list) -> list:
+    return await password_service.hash_many(passwords)
@@ -0,0 +1,409 @@
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qs
+from dotenv import load_dotenv
+from starlette.requests import Request
+from auth_tokens import InvalidToken, decode_token
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in {"true", "1", "yes", "on"}
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # Hard cap on buckets kept in process
+# Largest body read to find an email; bigger bodies on those routes are refused with 413
+RATE_LIMIT_MAX_BODY_BYTES = int(os.getenv("RATE_LIMIT_MAX_BODY_BYTES", "65536"))
+# Only trust X-Forwarded-For behind a proxy that sets it; otherwise clients could pick their own key
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in {"true", "1", "yes", "on"}
+# Set to share buckets across worker processes, e.g. redis://localhost:6379/1
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# JSON overriding or adding route policies, same shape as DEFAULT_POLICIES, e.g.
+# {"POST /auth/login/": [{"key": "ip", "rate": "30/minute"}]}
+RATE_LIMIT_POLICIES = os.getenv("RATE_LIMIT_POLICIES")
+
+# Scope key holding the route label for requests answered before routing
+ROUTE_LABEL_SCOPE_KEY = "route_label"
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# The routes that cost a bcrypt hash and/or an email per call. Keys: ip, user
+# (token subject, else ip) or email (from the query string, form or JSON body; requests
+# carrying no email share one bucket per ip, so leaving it out does not skip the limit).
+DEFAULT_POLICIES = {
+    "POST /auth/login/": [
+        {"key": "ip", "rate": "20/minute"},
+        {"key": "email", "rate": "5/minute"},  # Password guessing against one account from many addresses
+    ],
+    "POST /users/users/": [
+        {"key": "ip", "rate": "5/minute"},
+    ],
+    "POST /users/forgot-password": [
+        {"key": "ip", "rate": "5/minute"},
+        {"key": "email", "rate": "3/hour"},  # Each call sends an email to that address
+    ],
+}
+
+
+class RateLimitPolicy:
+    __slots__ = ("route", "path", "key", "rate", "burst", "name")
+
+    def __init__(self, route: str, key: str, rate: float, burst: float):
+        if key not in {"ip", "user", "email"}:
+            raise ValueError(f"Unknown rate limit key '{key}' for {route}")
+        self.route = route
+        self.path = route.partition(" ")[2]  # Same as the FastAPI route template, used as the metrics label
+        self.key = key
+        self.rate = rate  # Tokens added per second
+        self.burst = burst  # Bucket capacity
+        self.name = f"{route}:{key}"
+
+
+def parse_rate(rate: str) -> tuple:
+    # "5/minute" -> (tokens per second, default burst of 5)
+    count, _, period = rate.partition("/")
+    count = float(count)
+    return count / PERIODS[period.strip().lower()], count
+
+
+def load_policies(overrides: str = RATE_LIMIT_POLICIES) -> dict:
+    config = dict(DEFAULT_POLICIES)
+    if overrides:
+        config.update(json.loads(overrides))
+    policies = {}
+    for route, entries in config.items():
+        method, _, path = route.partition(" ")
+        route_policies = []
+        for entry in entries:
+            rate, burst = parse_rate(entry["rate"])
+            route_policies.append(RateLimitPolicy(route, entry["key"], rate, float(entry.get("burst", burst))))
+        policies[(method.upper(), path.rstrip("/"))] = route_policies
+    return policies
+
+
+# In-process token buckets. Only ever called from the event loop thread and never awaits
+# inside take(), so each check-and-update is atomic without a lock.
+class InMemoryBucketStore:
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> [tokens, updated_at, seconds to refill from empty], least recently used first
+        self._buckets = OrderedDict()
+        self.evictions = 0
+
+    def _sweep(self, now: float):
+        # Refilled buckets carry no state worth keeping: a new bucket starts full anyway.
+        # Only the oldest end is looked at, so each bucket is dropped at most once and a
+        # new key costs O(1) amortized.
+        while self._buckets:
+            bucket = next(iter(self._buckets.values()))
+            if now - bucket[1] < bucket[2]:
+                break
+            self._buckets.popitem(last=False)
+        # Hard cap: the least recently used bucket goes even if it hasn't refilled, which
+        # hands that key a fresh bucket next time
+        while len(self._buckets) >= self.max_keys:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> tuple:
+        # Returns (allowed, seconds until enough tokens, tokens left)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._sweep(now)
+            bucket = self._buckets[key] = [burst, now, burst / rate]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return True, 0.0, bucket[0]
+        return False, (cost - bucket[0]) / rate, bucket[0]
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "bucket_evictions": self.evictions}
+
+
+# Same algorithm as one Redis script, so concurrent workers update a bucket atomically
+TOKEN_BUCKET_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+# Shared buckets in Redis. Takes any asyncio client exposing eval(script, numkeys, *args),
+# so a local fake works too. If Redis is unreachable, requests are checked against the
+# in-process buckets instead of being refused or let through unlimited.
+class RedisBucketStore:
+    def __init__(self, client, fallback: InMemoryBucketStore = None, prefix: str = "ratelimit:"):
+        self.client = client
+        self.fallback = fallback or InMemoryBucketStore()
+        self.prefix = prefix
+        self.errors = 0
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> tuple:
+        try:
+            allowed, tokens = await self.client.eval(
+                TOKEN_BUCKET_SCRIPT, 1, self.prefix + key, rate, burst, cost, time.time()
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Rate limit backend unavailable: %s", e, extra={"sample_key": "rate_limit.backend"})
+            return await self.fallback.take(key, rate, burst, cost)
+        tokens = float(tokens)
+        return bool(int(allowed)), 0.0 if int(allowed) else (cost - tokens) / rate, tokens
+
+    def stats(self) -> dict:
+        return {"backend_errors": self.errors, **self.fallback.stats()}
+
+
+def _default_store():
+    if RATE_LIMIT_REDIS_URL:
+        import redis.asyncio  # Optional dependency, only needed when buckets are shared
+        return RedisBucketStore(redis.asyncio.Redis.from_url(RATE_LIMIT_REDIS_URL))
+    return InMemoryBucketStore()
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def token_subject(request: Request):
+    token = request.cookies.get("access_token")
+    if not token:
+        auth_header = request.headers.get("authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            token = auth_header[7:]
+    if not token:
+        return None
+    try:
+        return decode_token(token).get("sub")  # Served from the decoded-token cache
+    except InvalidToken:
+        return None
+
+
+def _multipart_fields(content_type: str, body: bytes) -> dict:
+    # The OAuth2 login form may also be posted as multipart/form-data
+    message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name and part.get_filename() is None:
+            fields.setdefault(name, part.get_content())
+    return fields
+
+
+def email_from_request(request: Request, body: bytes):
+    for name in ("email", "username"):  # username is the OAuth2 login form's field
+        value = request.query_params.get(name)
+        if value:
+            return value.strip().lower()
+    if not body:
+        return None
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            data = json.loads(body)
+            value = data.get("email") if isinstance(data, dict) else None
+        elif content_type.startswith("application/x-www-form-urlencoded"):
+            form = parse_qs(body.decode("utf-8", "replace"))
+            value = (form.get("username") or form.get("email") or [None])[0]
+        elif content_type.startswith("multipart/form-data"):
+            form = _multipart_fields(content_type, body)
+            value = form.get("username") or form.get("email")
+        else:
+            return None
+    except (ValueError, LookupError):
+        return None
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+async def _read_body(receive):
+    # Buffer the (small) body so it can be inspected and then replayed to the app.
+    # The body is None when it is larger than RATE_LIMIT_MAX_BODY_BYTES.
+    messages, size = [], 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        size += len(message.get("body", b""))
+        if size > RATE_LIMIT_MAX_BODY_BYTES or not message.get("more_body", False):
+            break
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.request")
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    return (body if size <= RATE_LIMIT_MAX_BODY_BYTES else None), replay
+
+
+# Route policies plus the bucket store. Routes without a policy cost one dict lookup;
+# limited routes are checked against every policy and refused as soon as one bucket is empty.
+class RateLimiter:
+    def __init__(self, store=None, policies: dict = None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.store = store if store is not None else _default_store()
+        self.policies = policies if policies is not None else load_policies()
+        self.enabled = enabled
+        self.needs_body = {route for route, entries in self.policies.items() if any(p.key == "email" for p in entries)}
+        self.allowed = 0
+        self.limited = {}  # policy name -> rejected requests
+        self.oversized = 0  # Refused with 413 before an email could be read
+
+    # Returns (None when allowed, else (status, seconds to wait), receive to pass on to the app)
+    async def check(self, scope, receive) -> tuple:
+        route = (scope["method"], scope["path"].rstrip("/"))
+        policies = self.policies.get(route)
+        if not policies:
+            return None, receive
+
+        request = Request(scope)
+        body = b""
+        if route in self.needs_body:
+            body, receive = await _read_body(receive)
+            if body is None:
+                # Padding the body must not hide the email from the per-account limit
+                self.oversized += 1
+                return (413, 0.0), receive
+
+        keys = {}
+        for policy in policies:
+            if policy.key not in keys:
+                if policy.key == "ip":
+                    keys["ip"] = client_ip(request)
+                elif policy.key == "user":
+                    subject = token_subject(request)
+                    keys["user"] = f"user:{subject}" if subject else f"ip:{client_ip(request)}"
+                else:
+                    email = email_from_request(request, body)
+                    keys["email"] = f"email:{email}" if email else f"ip:{client_ip(request)}"
+            allowed, retry_after, _ = await self.store.take(f"{policy.name}:{keys[policy.key]}", policy.rate, policy.burst)
+            if not allowed:
+                self.limited[policy.name] = self.limited.get(policy.name, 0) + 1
+                logger.warning("Rate limit exceeded", extra={"policy": policy.name, "sample_key": f"rate_limit.{policy.name}"})
+                return (429, retry_after), receive
+
+        self.allowed += 1
+        return None, receive
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "allowed": self.allowed,
+            "limited": dict(self.limited),
+            "oversized": self.oversized,
+            "policies": sorted(p.name for entries in self.policies.values() for p in entries),
+            **self.store.stats(),
+        }
+
+
+rate_limiter = RateLimiter()
+
+
+REJECTION_BODIES = {
+    413: b'{"detail":"Request body too large"}',
+    429: b'{"detail":"Too many requests"}',
+}
+
+
+async def _reject(send, status: int, retry_after: float):
+    body = REJECTION_BODIES[status]
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if status == 429:
+        headers.append((b"retry-after", str(max(1, math.ceil(retry_after))).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+# Pure ASGI middleware, like MetricsMiddleware: a 429 with Retry-After is sent before the
+# request reaches routing, dependencies, bcrypt or the outbox. Rejections never get a
+# matched route, so the policy's route template is left in scope for the metrics label.
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        rejection, receive = await self.limiter.check(scope, receive)
+        if rejection is not None:
+            policies = self.limiter.policies[(scope["method"], scope["path"].rstrip("/"))]
+            scope[ROUTE_LABEL_SCOPE_KEY] = policies[0].path
+            await _reject(send, *rejection)
+            return
+        await self.app(scope, receive, send)
+
+
+# Per-request overhead of the middleware around a no-op app: `python rate_limit.py --bench`
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Rate limit middleware overhead benchmark")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark")
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--clients", type=int, default=1000, help="Distinct client addresses in rotation")
+    args = parser.parse_args()
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def run(label: str, path: str, body: bytes):
+        # Generous limits so every request takes the allowed path
+        policies = load_policies(json.dumps({
+            route: [dict(entry, rate="1000000/second") for entry in entries] for route, entries in DEFAULT_POLICIES.items()
+        }))
+        limiter = RateLimiter(store=InMemoryBucketStore(), policies=policies, enabled=True)
+        middleware = RateLimitMiddleware(noop_app, limiter)
+        headers = [(b"content-type", b"application/x-www-form-urlencoded")]
+
+        async def send(message):
+            pass
+
+        async def timed(wrapped: bool) -> float:
+            started = time.perf_counter()
+            for i in range(args.requests):
+                messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+                async def receive():
+                    return messages.pop() if messages else {"type": "http.disconnect"}
+
+                scope = {"type": "http", "method": "POST", "path": path, "query_string": b"", "headers": headers,
+                         "client": (f"10.0.{i % args.clients // 256}.{i % 256}", 50000)}
+                await (middleware if wrapped else noop_app)(scope, receive, send)
+            return time.perf_counter() - started
+
+        baseline = await timed(False)
+        limited = await timed(True)
+        print(f"{label:22s} {(limited - baseline) / args.requests * 1e6:8.2f} us/request overhead")
+
+    if args.bench:
+        asyncio.run(run("unlimited route", "/services/", b""))
+        asyncio.run(run("ip policy", "/users/users/", b""))
+        asyncio.run(run("ip + email policies", "/auth/login/", b"username=user%40example.com&password=secret"))
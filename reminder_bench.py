@@ -0,0 +1,92 @@
+# Reminder dispatcher benchmark against a scratch database (DATABASE_URL):
+#     python reminder_bench.py --reminders 100000 --sent 100000
+#
+# Seeds due and already-sent reminders, prints the plan and scan time of one due batch,
+# then drains them all into the outbox. Bench rows are tagged by email and deleted
+# before and after the run.
+import argparse
+import time
+from sqlalchemy import text
+from database import SessionLocal
+from db_pool import configure_pool, engine, explain_analyze
+from availability import booking_local_now
+from sche import ReminderDispatcher
+
+BENCH_EMAIL_PATTERN = "reminder-bench-%@example.invalid"
+
+
+# Bench users, one service and bookings: `reminders` due now, `sent` already reminded
+def seed(reminders: int, sent: int, customers: int):
+    now = booking_local_now()
+    with engine.begin() as connection:
+        user_ids = connection.execute(text(
+            "INSERT INTO users (email, full_name, hashed_password, is_active, is_verified, token_version) "
+            "SELECT 'reminder-bench-' || i || '@example.invalid', 'Customer ' || i, '', true, true, 0 "
+            "FROM generate_series(0, :customers) i RETURNING id"
+        ), {"customers": customers}).scalars().all()
+        provider_id, first_customer = min(user_ids), min(user_ids) + 1
+        service_id = connection.execute(text(
+            "INSERT INTO services (name, description, price, category, currency, user_id, duration_minutes) "
+            "VALUES ('Consultation', 'Reminder benchmark', 100, 'bench', 'MYR', :provider_id, 60) RETURNING id"
+        ), {"provider_id": provider_id}).scalar()
+        # Already-sent history the partial index leaves out, then the pending reminders
+        connection.execute(text(
+            "INSERT INTO bookings (user_id, provider_id, service_id, booking_date, reminder_time, reminder_sent_at, "
+            "status, payment_status) "
+            "SELECT :first_customer + i % :customers, :provider_id, :service_id, "
+            "       :now + make_interval(mins => i), :now - make_interval(secs => i), "
+            "       CASE WHEN i < :sent THEN :now END, 'confirmed', 'paid' "
+            "FROM generate_series(0, :sent + :reminders - 1) i"
+        ), {"first_customer": first_customer, "customers": customers, "provider_id": provider_id,
+            "service_id": service_id, "now": now, "sent": sent, "reminders": reminders})
+        connection.execute(text("ANALYZE users, services, bookings"))
+
+
+def clean():
+    with engine.begin() as connection:
+        bench_users = "SELECT id FROM users WHERE email LIKE :pattern"
+        params = {"pattern": BENCH_EMAIL_PATTERN}
+        connection.execute(text("DELETE FROM outbox WHERE payload->>'to_email' LIKE :pattern"), params)
+        connection.execute(text(f"DELETE FROM bookings WHERE provider_id IN ({bench_users})"), params)
+        connection.execute(text(f"DELETE FROM services WHERE user_id IN ({bench_users})"), params)
+        connection.execute(text("DELETE FROM users WHERE email LIKE :pattern"), params)
+
+
+def run(reminders: int, sent: int, customers: int):
+    dispatcher = ReminderDispatcher()
+    clean()
+    started = time.perf_counter()
+    seed(reminders, sent, customers)
+    print(f"seed        {time.perf_counter() - started:10.1f} s ({reminders:,} due, {sent:,} sent)")
+    try:
+        db = SessionLocal()
+        try:
+            print(explain_analyze(db.connection(), dispatcher._due_query(db, booking_local_now()).statement))
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                dispatcher._fetch_due(db, booking_local_now())
+                timings.append(time.perf_counter() - started)
+            print(f"scan        {sorted(timings)[2] * 1000:10.1f} ms per batch of {dispatcher.batch_size} (median of 5)")
+        finally:
+            db.close()
+
+        started = time.perf_counter()
+        while dispatcher.dispatch_due() >= dispatcher.batch_size:
+            pass
+        elapsed = time.perf_counter() - started
+        print(f"drain       {elapsed:10.1f} s, {dispatcher.batches} polls, {dispatcher.queued:,} reminders "
+              f"({dispatcher.queued / elapsed:,.0f}/s) in {dispatcher.emails:,} emails")
+    finally:
+        clean()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reminder dispatcher benchmark")
+    parser.add_argument("--reminders", type=int, default=100000, help="Pending reminders, all due")
+    parser.add_argument("--sent", type=int, default=100000, help="Bookings whose reminder was already sent")
+    parser.add_argument("--customers", type=int, default=25000)
+    args = parser.parse_args()
+
+    configure_pool()
+    run(args.reminders, args.sent, args.customers)
@@ -0,0 +1,169 @@
+import time
+from metrics import (
+    LabeledHistogram, LabeledValue, current_query_counter, render_histogram, render_value
+)
+import db_pool
+from password_service import password_service
+from auth_tokens import token_cache
+from token_revocation import revocation_store
+from activity_log_sink import activity_log_sink
+from sche import reminder_dispatcher
+from outbox import outbox_relay
+from rate_limit import ROUTE_LABEL_SCOPE_KEY, rate_limiter
+import logging_config
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+request_duration = LabeledHistogram(
+    "http_request_duration_seconds", "Request latency by templated route",
+    ("method", "route", "status")
+)
+requests_in_flight = LabeledValue(
+    "http_requests_in_flight", "Requests currently being handled", ("method",), "gauge"
+)
+request_db_queries = LabeledHistogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+
+UNMATCHED_ROUTE = "__unmatched__"  # Keeps 404 scans from creating one series per raw path
+
+
+# Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead). The route label is
+# the matched route's path template, which FastAPI leaves in scope["route"] after routing;
+# requests the rate limiter answers before routing carry their policy's template instead.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_holder = [500]  # If the app raises before responding, count it as a 500
+        query_counter = [0]
+        token = current_query_counter.set(query_counter)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        requests_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec(method)
+            current_query_counter.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or scope.get(ROUTE_LABEL_SCOPE_KEY, UNMATCHED_ROUTE)
+            request_duration.labels(method, route_path, str(status_holder[0])).observe(elapsed)
+            request_db_queries.labels(method, route_path).observe(query_counter[0])
+
+
+def render_metrics() -> str:
+    lines = []
+    lines += request_duration.render()
+    lines += requests_in_flight.render()
+    lines += request_db_queries.render()
+
+    pool = db_pool.pool_status()
+    lines += render_value("db_pool_checked_out", "Connections checked out of the pool", pool["checked_out"])
+    lines += render_value("db_pool_waiting", "Callers waiting for a pooled connection", pool["waiting"])
+    lines += render_value("db_pool_saturation", "Checked-out connections / (pool_size + max_overflow)", pool["saturation"])
+    lines += render_histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a connection", db_pool.checkout_wait_seconds)
+    lines += render_histogram("db_connection_hold_seconds", "Time a connection stays checked out", db_pool.connection_hold_seconds)
+    lines += render_histogram("db_query_duration_seconds", "SQL statement latency", db_pool.query_seconds)
+
+    reminders = reminder_dispatcher.stats()
+    lines += render_value("reminder_dispatcher_leader", "1 if this process holds the reminder lock", int(reminders["is_leader"]))
+    lines += render_value("reminder_jobs_queued_total", "Booking reminders handed to the outbox", reminders["queued"], "counter")
+    lines += render_value("reminder_emails_queued_total", "Reminder emails queued, digests counted once", reminders["emails"], "counter")
+    lines += render_value("reminder_last_batch_size", "Due reminders picked up by the last poll", reminders["last_batch_size"])
+
+    relay = outbox_relay.stats()
+    lines += render_value("outbox_sent_total", "Outbox messages delivered by this process", relay["sent"], "counter")
+    lines += render_value("outbox_failed_total", "Outbox delivery attempts that failed", relay["failed"], "counter")
+    lines += render_value("outbox_dead_total", "Outbox messages given up after the last attempt", relay["dead"], "counter")
+    # Table-wide, as last counted by the relay loop, so a scrape never takes a pooled connection.
+    # Left out by processes that don't run the relay.
+    backlog = outbox_relay.last_backlog
+    if backlog is not None:
+        lines += render_value("outbox_pending", "Outbox messages waiting to be delivered", backlog["pending"])
+        lines += render_value("outbox_oldest_pending_age_seconds", "Age of the oldest undelivered outbox message", backlog["oldest_pending_age_seconds"])
+        lines += render_value("outbox_dead", "Undelivered outbox messages out of attempts", backlog["dead"])
+
+    limits = rate_limiter.stats()
+    lines += render_value("rate_limit_allowed_total", "Requests to rate-limited routes let through", limits["allowed"], "counter")
+    lines += render_value("rate_limit_rejected_total", "Requests refused with 429", sum(limits["limited"].values()), "counter")
+    lines += render_value("rate_limit_oversized_total", "Requests refused with 413 before their email could be read", limits["oversized"], "counter")
+    lines += render_value("rate_limit_bucket_evictions_total", "In-process buckets dropped at RATE_LIMIT_MAX_KEYS before they refilled", limits["bucket_evictions"], "counter")
+
+    passwords = password_service.stats()
+    lines += render_value("password_pool_queue_depth", "Password hash/verify calls waiting for a worker", passwords["queue_depth"])
+    lines += render_value("password_pool_rejected_total", "Password calls rejected with 503", passwords["rejected"], "counter")
+
+    tokens = token_cache.stats()
+    lines += render_value("token_cache_hits_total", "Access tokens served from the decoded-token cache", tokens["hits"], "counter")
+    lines += render_value("token_cache_misses_total", "Access tokens decoded and verified", tokens["misses"], "counter")
+
+    revocations = revocation_store.stats()
+    lines += render_value("token_revoked_rejections_total", "Requests rejected with a revoked token", revocations["rejected"], "counter")
+    lines += render_value("token_denylist_size", "Individually revoked tokens not yet expired", revocations["revoked_tokens"])
+
+    logs = activity_log_sink.stats()
+    lines += render_value("activity_log_buffered", "Activity log rows waiting to be flushed", logs["buffered"])
+    lines += render_value("activity_log_dropped_total", "Activity log rows dropped", logs["dropped"], "counter")
+    lines += render_value("activity_log_rejected_total", "Activity log rows the database refused", logs["rejected"], "counter")
+
+    log_queue = logging_config.stats()
+    lines += render_value("log_queue_depth", "Log records waiting for the writer thread", log_queue["queue_depth"])
+    lines += render_value("log_records_dropped_total", "Log records dropped because the queue was full", log_queue["dropped"], "counter")
+
+    return "\n".join(lines) + "\n"
+
+
+# Per-request overhead of the middleware around a no-op app: `python request_metrics.py --bench`
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    from types import SimpleNamespace
+
+    parser = argparse.ArgumentParser(description="Metrics middleware overhead benchmark")
+    parser.add_argument("--bench", action="store_true", help="Run the benchmark")
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--routes", type=int, default=20, help="Distinct route templates in rotation")
+    args = parser.parse_args()
+
+    routes = [SimpleNamespace(path=f"/services/{i}/{{service_id}}") for i in range(args.routes)]
+
+    # Stands in for routing: leaves the matched route in scope, as FastAPI does
+    async def noop_app(scope, receive, send):
+        scope["route"] = routes[scope["route_index"]]
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def timed(app) -> float:
+        started = time.perf_counter()
+        for i in range(args.requests):
+            scope = {"type": "http", "method": "GET", "path": f"/services/{i % args.routes}/{i}",
+                     "query_string": b"", "headers": [], "route_index": i % args.routes}
+            await app(scope, receive, send)
+        return time.perf_counter() - started
+
+    async def run():
+        baseline = await timed(noop_app)
+        measured = await timed(MetricsMiddleware(noop_app))
+        print(f"{'metrics middleware':22s} {(measured - baseline) / args.requests * 1e6:8.2f} us/request overhead")
+
+    if args.bench:
+        asyncio.run(run())
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from sqlalchemy import select
+from models import Role
+
+load_dotenv()
+
+# Roles are a handful of rows that almost never change; reload them at most this often
+ROLE_REGISTRY_TTL_SECONDS = float(os.getenv("ROLE_REGISTRY_TTL_SECONDS", "300"))
+# A name that a reload didn't find is not reloaded for again until this long has passed
+ROLE_REGISTRY_MISS_TTL_SECONDS = float(os.getenv("ROLE_REGISTRY_MISS_TTL_SECONDS", "30"))
+
+ROLES_SELECT = select(Role.id, Role.name)
+
+
+# In-process map of role name -> id. A lookup that misses reloads once before giving
+# up, so roles created by another worker are picked up without waiting for the TTL.
+# Names still missing after that reload are remembered for miss_ttl_seconds, so repeated
+# lookups of an unknown role don't reload the registry every time.
+class RoleRegistry:
+    def __init__(self, ttl_seconds: float = ROLE_REGISTRY_TTL_SECONDS,
+                 miss_ttl_seconds: float = ROLE_REGISTRY_MISS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self._by_name = {}
+        self._by_lower_name = {}
+        self._missed = {}  # lower-cased name -> when a reload last failed to find it
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _store(self, rows):
+        with self._lock:
+            self._by_name = {name: role_id for role_id, name in rows}
+            self._by_lower_name = {name.lower(): role_id for role_id, name in rows}
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+
+    def _remember_misses(self, names):
+        now = time.monotonic()
+        with self._lock:
+            self._missed.update((name.lower(), now) for name in names)
+
+    def _recently_missed(self, names) -> bool:
+        cutoff = time.monotonic() - self.miss_ttl_seconds
+        with self._lock:
+            return all(self._missed.get(name.lower(), cutoff) > cutoff for name in names)
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl_seconds
+
+    def _resolve(self, names) -> tuple:
+        # Exact name first, then case-insensitive (the admin checks have always ignored case)
+        found, missing = {}, []
+        for name in names:
+            role_id = self._by_name.get(name, self._by_lower_name.get(name.lower()))
+            if role_id is None:
+                missing.append(name)
+            else:
+                found[name] = role_id
+        return found, missing
+
+    # Returns ({name: id} for the names that exist, [names that don't])
+    def ids_for(self, db, names) -> tuple:
+        if self._stale():
+            self._store(db.execute(ROLES_SELECT).all())
+        found, missing = self._resolve(names)
+        if missing and not self._recently_missed(missing):
+            self._store(db.execute(ROLES_SELECT).all())
+            found, missing = self._resolve(names)
+            self._remember_misses(missing)
+        return found, missing
+
+    def id_for(self, db, name: str):
+        found, _ = self.ids_for(db, [name])
+        return found.get(name)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+            self._missed = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"roles": len(self._by_name), "reloads": self.reloads, "ttl_seconds": self.ttl_seconds}
+
+
+role_registry = RoleRegistry()
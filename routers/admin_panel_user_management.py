@@ -1,15 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Form
+from fastapi import APIRouter, Depends, HTTPException, Form, Response, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from models import User, Role
+from models import User
 from database import get_db
-from crud_operations.user_crud import get_users, create_user, update_user, deactivate_user, get_logs  # Don't use create_user here
+from crud_operations.user_crud import get_users, create_user, update_user, deactivate_user, get_logs, logs_cursor  # Don't use create_user here
 from dependencies import admin_only
-from schemas import AdminUserCreate, UserResponse, ActivityLogResponse
-from sqlalchemy import func
-from email_utils import send_verification_email
-from urllib.parse import quote
-from utils import  create_access_token, log_activity
+from schemas import AdminUserCreate, UserResponse, ActivityLogResponse, BulkRoleAssignment
+from utils import log_activity
+from auth_tokens import token_cache
+from token_revocation import revocation_listener
+from password_service import hash_password, password_service
+from outbox import outbox_relay
+from rate_limit import rate_limiter
+from catalogue_cache import catalogue_cache
+from activity_log_sink import activity_log_sink
+from pagination import clamp_page_size
+from user_import import detect_format, spool_upload, import_users
+from data_export import export_response, users_export_select, bookings_export_select, activity_logs_export_select
+from crud_operations.bulk_user_crud import assign_role_bulk
+from role_registry import role_registry
+from db_pool import pool_status
 import os
+from datetime import datetime
+from typing import Optional
 
 
 
@@ -27,38 +41,19 @@ def list_all_users(db: Session = Depends(get_db), current_user: User = Depends(a
 @router.post("/admin/users/", response_model=UserResponse)
 def create_admin_user(user: AdminUserCreate, db: Session = Depends(get_db), _current_user: User = Depends(admin_only)):
     # Ensure user does not exist already
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = db.query(User).filter(func.lower(User.email) == user.email.lower()).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Use the create_user function from users.py to handle user creation (general user registration)
-    new_user = create_user(db, email=user.email, full_name=user.full_name, password=user.password)
-
-    # Assign the admin role to the newly created user
-    role = db.query(Role).filter(func.lower(Role.name) == "admin").first()
-    if not role:
+    # Resolve the admin role before creating anything, so a missing role leaves no orphan user
+    if role_registry.id_for(db, "admin") is None:
         raise HTTPException(status_code=404, detail="Admin role not found")
-    new_user.roles.append(role)
-
-    # Set the user's activation status to False initially (awaiting email verification)
-    new_user.is_active = False
-
-    # Commit user creation to the database but without activating them yet
-    db.commit()
-    db.refresh(new_user)
 
-    # Create the email verification token
-    verification_token = create_access_token(data={"sub": new_user.email}, roles=[role.name for role in new_user.roles])
-
-    # Generate the verification URL
-    verification_url = f"{FRONTEND_URL}/verify/verify-email?token={quote(verification_token)}"
-
-    # Send the email verification link
-    send_verification_email(
-        new_user.email,
-        "Please verify your email address",  # Subject
-        f"Click the following link to verify your email: {verification_url}"  # Body
-    )
+    # Create the user with the admin role and the verification email in one commit,
+    # inactive until the email is verified
+    hashed_password = hash_password(user.password)
+    new_user = create_user(db, email=user.email, full_name=user.full_name, hashed_password=hashed_password,
+                           roles=["admin"], is_active=False, send_verification=True)
 
     log_activity(
         db=db,
@@ -80,6 +75,70 @@ def create_admin_user(user: AdminUserCreate, db: Session = Depends(get_db), _cur
 
 
 
+# **Export Users / Bookings / Activity Logs** (Admin Only)
+# Streamed from a server-side cursor as NDJSON (default) or CSV; gzip follows
+# Accept-Encoding unless ?gzip= is given explicitly.
+@router.get("/admin/export/users")
+def export_users(request: Request, format: str = "ndjson", gzip: Optional[bool] = None,
+                 _current_user: User = Depends(admin_only)):
+    return export_response(request, users_export_select(), "users", format, gzip)
+
+
+@router.get("/admin/export/bookings")
+def export_bookings(request: Request, format: str = "ndjson", gzip: Optional[bool] = None,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    _current_user: User = Depends(admin_only)):
+    return export_response(request, bookings_export_select(since, until), "bookings", format, gzip)
+
+
+@router.get("/admin/export/activity-logs")
+def export_activity_logs(request: Request, format: str = "ndjson", gzip: Optional[bool] = None,
+                         user_id: Optional[int] = None, action: Optional[str] = None,
+                         since: Optional[datetime] = None, until: Optional[datetime] = None,
+                         _current_user: User = Depends(admin_only)):
+    statement = activity_logs_export_select(user_id, action, since, until)
+    return export_response(request, statement, "activity_logs", format, gzip)
+
+
+# **Bulk Import Users** (Admin Only)
+# CSV (header: email,full_name,password,roles,is_active; roles separated by ";") or NDJSON.
+# Rows are processed in chunks and the response streams one NDJSON result per row.
+@router.post("/admin/users/import")
+async def bulk_import_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    _current_user: User = Depends(admin_only)
+):
+    fmt = detect_format(format, file.filename, file.content_type)
+    upload = await spool_upload(file)
+    return StreamingResponse(import_users(upload, fmt, _current_user.id), media_type="application/x-ndjson")
+
+
+# **Bulk Assign Role** (Admin Only)
+@router.post("/admin/roles/bulk-assign")
+def bulk_assign_role(data: BulkRoleAssignment, db: Session = Depends(get_db), _current_user: User = Depends(admin_only)):
+    role_id = role_registry.id_for(db, data.role_name)
+    if role_id is None:
+        raise HTTPException(status_code=404, detail="Role not found")
+
+    emails = list(dict.fromkeys(email.strip().lower() for email in data.emails))  # Dedupe, keep order
+    assigned, missing = assign_role_bulk(db, role_id, emails)
+    db.commit()
+
+    log_activity(
+        db=db,
+        user_id=_current_user.id,
+        action="Bulk Assign Role",
+        details=f"Assigned role {data.role_name} to {len(assigned)} user(s)"
+    )
+    return {
+        "role": data.role_name,
+        "assigned": len(assigned),
+        "already_had_role": len(emails) - len(assigned) - len(missing),
+        "not_found": missing,
+    }
+
+
 def str_to_bool(value: str) -> bool:
     if value.lower() in {"true", "1", "yes", "on"}:
         return True
@@ -155,7 +214,71 @@ def get_user_by_id(user_id: int, db: Session = Depends(get_db), _current_user: U
     return user
 
 
+# Filters are optional; when a full page is returned, X-Next-Cursor holds the cursor for the next one
 @router.get("/admin/activity-logs", response_model=list[ActivityLogResponse])
-def view_activity_logs(limit: int = 100, skip: int = 0, db: Session = Depends(get_db), _admin_user = Depends(admin_only)):
-    logs = get_logs(db=db, limit=limit, skip=skip)
-    return logs
\ No newline at end of file
+def view_activity_logs(
+    response: Response,
+    limit: int = 100,
+    skip: int = 0,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,  # Inclusive
+    until: Optional[datetime] = None,  # Exclusive
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    _admin_user = Depends(admin_only)
+):
+    limit = clamp_page_size(limit)
+    logs = get_logs(db=db, limit=limit, skip=skip, user_id=user_id, action=action, since=since, until=until,
+                    cursor=cursor)
+    if len(logs) == limit:
+        response.headers["X-Next-Cursor"] = logs_cursor(logs)
+    return logs
+
+
+# **Decoded Token Cache Statistics** (Admin Only)
+@router.get("/admin/diagnostics/token-cache")
+def token_cache_stats(_admin_user = Depends(admin_only)):
+    return token_cache.stats()
+
+
+# **Token Revocation Statistics** (Admin Only)
+@router.get("/admin/diagnostics/token-revocation")
+def token_revocation_stats(_admin_user = Depends(admin_only)):
+    return revocation_listener.stats()
+
+
+# **Password Pool Statistics** (Admin Only)
+@router.get("/admin/diagnostics/password-pool")
+def password_pool_stats(_admin_user = Depends(admin_only)):
+    return password_service.stats()
+
+
+# **Outbox Relay Statistics** (Admin Only)
+@router.get("/admin/diagnostics/outbox")
+def outbox_stats(_admin_user = Depends(admin_only)):
+    return {**outbox_relay.stats(), **outbox_relay.backlog()}
+
+
+# **Rate Limit Statistics** (Admin Only)
+@router.get("/admin/diagnostics/rate-limits")
+def rate_limit_stats(_admin_user = Depends(admin_only)):
+    return rate_limiter.stats()
+
+
+# **Catalogue Cache Statistics** (Admin Only)
+@router.get("/admin/diagnostics/catalogue-cache")
+def catalogue_cache_stats(_admin_user = Depends(admin_only)):
+    return catalogue_cache.stats()
+
+
+# **Activity Log Buffer Statistics** (Admin Only)
+@router.get("/admin/diagnostics/activity-log-buffer")
+def activity_log_buffer_stats(_admin_user = Depends(admin_only)):
+    return activity_log_sink.stats()
+
+
+# **Database Pool Diagnostics** (Admin Only)
+@router.get("/admin/diagnostics/db-pool")
+def db_pool_diagnostics(_admin_user = Depends(admin_only)):
+    return pool_status()
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, Form, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional
+from crud_operations import async_user_crud
+from crud_operations.user_crud import logs_cursor
+from async_database import get_async_db
+from dependencies import admin_only
+from schemas import ActivityLogResponse
+from pagination import clamp_page_size
+from utils import log_activity
+from routers.admin_panel_user_management import str_to_bool
+
+# Async (asyncpg) versions of the admin user management routes that only need the
+# database. Mounted ahead of admin_panel_user_management when DATABASE_MODE=async,
+# so they take over the same paths; creation, import, export and diagnostics stay sync.
+router = APIRouter()
+
+# **List All Users** (Admin Only)
+@router.get("/admin/users/")
+async def list_all_users(db: AsyncSession = Depends(get_async_db), _current_user = Depends(admin_only)):
+    return await async_user_crud.get_users(db)
+
+
+@router.patch("/admin/users/{user_id}")
+async def update_admin_user(
+    user_id: int,
+    full_name: str = Form(None),
+    email: str = Form(None),
+    is_active: str = Form(None),  # Receive as string
+    roles: list = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    _current_user = Depends(admin_only)
+):
+    if is_active is not None:
+        try:
+            is_active = str_to_bool(is_active)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid value for is_active")
+
+    user = await async_user_crud.update_user(
+        db=db, user_id=user_id, full_name=full_name, email=email, is_active=is_active, roles=roles
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    await db.run_sync(
+        log_activity,
+        user_id=_current_user.id,
+        action="Update User",
+        details=f"Updated User {user.email} with role(s) {', '.join([r.name for r in user.roles])}"
+    )
+    return user
+
+
+# **Deactivate User** (Admin Only)
+@router.patch("/admin/users/{user_id}/deactivate")
+async def deactivate_user_route(user_id: int, db: AsyncSession = Depends(get_async_db), _current_user = Depends(admin_only)):
+    user = await async_user_crud.deactivate_user(db=db, user_id=user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    await db.run_sync(
+        log_activity,
+        user_id=_current_user.id,
+        action="Deactivate User",
+        details=f"Deactivated User {user.email} with role(s) {', '.join([r.name for r in user.roles])}"
+    )
+    return {"message": "User deactivated successfully"}
+
+
+# **Get User by ID** (Admin Only)
+@router.get("/admin/users/{user_id}")
+async def get_user_by_id(user_id: int, db: AsyncSession = Depends(get_async_db), _current_user = Depends(admin_only)):
+    user = await async_user_crud.get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+# Filters are optional; when a full page is returned, X-Next-Cursor holds the cursor for the next one
+@router.get("/admin/activity-logs", response_model=list[ActivityLogResponse])
+async def view_activity_logs(
+    response: Response,
+    limit: int = 100,
+    skip: int = 0,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,  # Inclusive
+    until: Optional[datetime] = None,  # Exclusive
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    _admin_user = Depends(admin_only)
+):
+    limit = clamp_page_size(limit)
+    logs = await async_user_crud.get_logs(db=db, limit=limit, skip=skip, user_id=user_id, action=action, since=since,
+                                          until=until, cursor=cursor)
+    if len(logs) == limit:
+        response.headers["X-Next-Cursor"] = logs_cursor(logs)
+    return logs
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import Optional
+from crud_operations import async_booking_crud
+from schemas import BookingResponse, BookingPage, AvailabilityResponse
+from availability import get_available_slots_async
+from async_database import get_async_db
+from pagination import DEFAULT_PAGE_SIZE, clamp_page_size
+
+# Async (asyncpg) versions of the booking read/update routes. Mounted ahead of
+# booking_router when DATABASE_MODE=async, so they take over the same paths.
+router = APIRouter()
+
+# List bookings for a customer or provider, one page at a time
+@router.get("/bookings/", response_model=BookingPage)
+async def list_bookings(
+        user_id: Optional[int] = None,
+        provider_id: Optional[int] = None,
+        status: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        date_from: Optional[datetime] = None,  # Inclusive
+        date_to: Optional[datetime] = None,  # Exclusive
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        db: AsyncSession = Depends(get_async_db)
+):
+    if user_id is None and provider_id is None:
+        raise HTTPException(status_code=400, detail="user_id or provider_id is required")
+
+    return await async_booking_crud.list_bookings(
+        db=db,
+        limit=clamp_page_size(limit),
+        cursor=cursor,
+        user_id=user_id,
+        provider_id=provider_id,
+        status=status,
+        payment_status=payment_status,
+        date_from=date_from,
+        date_to=date_to
+    )
+
+
+# Declared before /bookings/{user_id} so "availability" isn't parsed as a user id
+@router.get("/bookings/availability", response_model=AvailabilityResponse)
+async def get_availability(
+        provider_id: int,
+        service_id: int,
+        date_from: date,
+        date_to: date,
+        db: AsyncSession = Depends(get_async_db)
+):
+    slots = await get_available_slots_async(db, provider_id, service_id, date_from, date_to)
+    return {"provider_id": provider_id, "service_id": service_id, "slots": slots}
+
+
+@router.get("/bookings/{user_id}", response_model=list[BookingResponse])
+async def get_bookings(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    bookings = await async_booking_crud.get_bookings_for_user(db=db, user_id=user_id)
+
+    if not bookings:
+        raise HTTPException(status_code=404, detail="No bookings found")
+
+    return bookings
+
+
+@router.patch("/bookings/{booking_id}", response_model=BookingResponse)
+async def update_booking_status(
+        booking_id: int,
+        status: str = None,  # Optional, only update if provided
+        payment_status: str = None,  # Optional, only update if provided
+        db: AsyncSession = Depends(get_async_db)
+):
+    db_booking = await async_booking_crud.update_booking_status(
+        db=db,
+        booking_id=booking_id,
+        status=status,
+        payment_status=payment_status
+    )
+
+    if not db_booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+
+    return db_booking
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from crud_operations import async_career_type
+from async_database import get_async_db
+
+# Async (asyncpg) versions of the career type routes. Mounted ahead of
+# career_type_router when DATABASE_MODE=async, so they take over the same paths.
+router = APIRouter()
+
+@router.post("/career_types/")
+async def create_career_type(name: str, db: AsyncSession = Depends(get_async_db)):
+    return await async_career_type.create_career_type(db=db, name=name)
+
+@router.get("/career_types/")
+async def get_career_types(db: AsyncSession = Depends(get_async_db)):
+    return await async_career_type.get_all_career_types(db=db)
+
+@router.put("/career_types/{career_type_id}/approve")
+async def approve_career_type(career_type_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_career_type = await async_career_type.approve_career_type(db=db, career_type_id=career_type_id)
+    if db_career_type is None:
+        raise HTTPException(status_code=404, detail="Career type not found")
+    return {"message": f"Career type {db_career_type.name} approved"}
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from crud_operations import async_service_crud
+from crud_operations.service_crud import SERVICE_SORTS
+from schemas import ServiceResponse, ServicePage
+from async_database import get_async_db
+from catalogue_cache import catalogue_cache, cached_json_response
+from pagination import DEFAULT_PAGE_SIZE, clamp_page_size
+
+# Async (asyncpg) versions of the service read routes. Mounted ahead of
+# service_router when DATABASE_MODE=async, so they take over the same paths.
+router = APIRouter()
+
+# Get all services
+@router.get("/services/", response_model=list[ServiceResponse])
+async def get_services(request: Request, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    skip, limit = max(skip, 0), clamp_page_size(limit)  # Before building the cache key
+    async def load_services():
+        services = await async_service_crud.get_services(db=db, skip=skip, limit=limit)
+        return [ServiceResponse.model_validate(s) for s in services]
+
+    body, etag = await catalogue_cache.get_or_load_async(f"services:{skip}:{limit}", load_services)
+    return cached_json_response(request, body, etag)
+
+# Search services
+@router.get("/services/search", response_model=ServicePage)
+async def search_services(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    career_type_id: Optional[int] = None,
+    provider_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if sort not in SERVICE_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(sorted(SERVICE_SORTS))}")
+
+    return await async_service_crud.search_services(
+        db=db,
+        limit=clamp_page_size(limit),
+        cursor=cursor,
+        q=q,
+        category=category,
+        career_type_id=career_type_id,
+        provider_id=provider_id,
+        min_price=min_price,
+        max_price=max_price,
+        sort=sort
+    )
+
+# Get a service by ID
+@router.get("/services/{service_id}", response_model=ServiceResponse)
+async def get_service(request: Request, service_id: int, db: AsyncSession = Depends(get_async_db)):
+    async def load_service():
+        db_service = await async_service_crud.get_service_by_id(db=db, service_id=service_id)
+        return ServiceResponse.model_validate(db_service) if db_service is not None else None
+
+    cached = await catalogue_cache.get_or_load_async(f"service:{service_id}", load_service)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return cached_json_response(request, *cached)
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from crud_operations import async_user_profile_crud
+from schemas import UserProfileCreate, UserProfileUpdate, UserProfileResponse
+from dependencies import get_current_user
+from async_database import get_async_db
+
+# Async (asyncpg) versions of the user profile routes. Mounted ahead of
+# user_profile_router when DATABASE_MODE=async, so they take over the same paths.
+router = APIRouter()
+
+# Create User Profile
+@router.post("/profile/", response_model=UserProfileResponse)
+async def create_profile(profile: UserProfileCreate, db: AsyncSession = Depends(get_async_db),
+                         current_user: int = Depends(get_current_user)):
+    return await async_user_profile_crud.create_user_profile(db=db, user_id=current_user.id, user_profile=profile)
+
+# Get User Profile
+@router.get("/profile/", response_model=UserProfileResponse)
+async def get_profile(db: AsyncSession = Depends(get_async_db), current_user: int = Depends(get_current_user)):
+    db_profile = await async_user_profile_crud.get_user_profile(db=db, user_id=current_user.id)
+    if db_profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return db_profile
+
+# Update User Profile
+@router.put("/profile/", response_model=UserProfileResponse)
+async def update_profile(profile: UserProfileUpdate, db: AsyncSession = Depends(get_async_db),
+                         current_user: int = Depends(get_current_user)):
+    db_profile = await async_user_profile_crud.update_user_profile(db=db, user_id=current_user.id, user_profile=profile)
+    if db_profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return db_profile
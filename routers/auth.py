@@ -3,14 +3,19 @@ from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from database import get_db
 from models import User
-from utils import verify_password, create_access_token, log_activity
+from utils import log_activity
+from auth_tokens import issue_access_token
+from password_service import verify_password
+import logging
 import os
-from dependencies import get_current_user
+from dependencies import get_current_user, get_token_payload
+from token_revocation import revoke_token, revoke_all_tokens
 
 
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:9550")
 
 @router.post("/login/")
@@ -25,14 +30,10 @@ def login(
     if not user.is_verified:
         raise HTTPException(status_code=403, detail="Email not verified")
 
-    access_token = create_access_token(
-        data={"sub": user.email},
-        roles=[role.name for role in user.roles]
-    )
+    access_token = issue_access_token(user)
 
-    # Log the access token and roles for debugging
-    print(f"Access Token: {access_token}")
-    print(f"Roles: {[role.name for role in user.roles]}")
+    # Never log the token itself; it is a bearer credential
+    logger.info("User logged in", extra={"user_id": user.id, "sample_key": "auth.login"})
 
     # Set the token as a cookie
     response.set_cookie(
@@ -54,6 +55,23 @@ def login(
     return {"message": "Login successful"}
 
 @router.post("/logout")
-def logout(response: Response, user: User = Depends(get_current_user)):
+def logout(
+    response: Response,
+    user: User = Depends(get_current_user),
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db)
+):
+    # Deleting the cookie alone would leave a copied token valid until it expires
+    revoke_token(db, user.id, payload)
+    db.commit()
+    response.delete_cookie("access_token")
+    return {"message": f"User {user.email} successfully logged out"}
+
+
+# Revoke every token issued to the user, on every device
+@router.post("/logout-all")
+def logout_all(response: Response, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    revoke_all_tokens(db, user.id)
+    db.commit()
     response.delete_cookie("access_token")
-    return {"message": f"User {user.email} successfully logged out"}
\ No newline at end of file
+    return {"message": f"User {user.email} logged out of all sessions"}
\ No newline at end of file
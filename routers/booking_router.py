@@ -1,99 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import date, datetime, timedelta
+from typing import Optional
 from database import get_db
-from email_utils import send_booking_confirmation_email
-from models import Booking, User, Service
-from schemas import BookingCreate, BookingResponse
-from sche import schedule_reminder_email  # Import the scheduler function
+from email_utils import queue_booking_confirmation_email
+from schemas import BookingCreate, BookingResponse, BookingPage, AvailabilityResponse, WorkingHoursUpdate
+from crud_operations import booking_crud
+from pagination import DEFAULT_PAGE_SIZE, clamp_page_size
+from idempotency import scoped_key, request_fingerprint, claim_key, store_response, replay_response
+from availability import booking_end_for, ensure_bookable, get_available_slots, replace_working_hours
+from dependencies import get_current_user
+from auth_tokens import Principal
 
 router = APIRouter()
 
-@router.post("/bookings/", status_code=201)
-async def create_booking(
-        booking_details: BookingCreate,
-        background_tasks: BackgroundTasks,
-        db: Session = Depends(get_db)
-):
-    # Fetch the user, provider, and service from the database
-    user = db.query(User).filter(User.id == booking_details.user_id).first()
-    provider = db.query(User).filter(User.id == booking_details.provider_id).first()
-    service = db.query(Service).filter(Service.id == booking_details.service_id).first()
-
-    # Check if the user, provider, or service does not exist
-    if not user or not provider or not service:
-        raise HTTPException(status_code=404, detail="User, Provider, or Service not found")
-
-    # Calculate the reminder time (1 day before the booking date)
-    reminder_time = booking_details.booking_date - timedelta(days=1)
-
-    # Create new booking
-    new_booking = Booking(
-        booking_date=booking_details.booking_date,
-        reminder_time=reminder_time,  # Use the calculated reminder time
-        user_id=booking_details.user_id,
-        provider_id=booking_details.provider_id,
-        service_id=booking_details.service_id
-    )
+BOOKING_IDEMPOTENCY_ENDPOINT = "POST /bookings/"
+BOOKING_OVERLAP_CONSTRAINT = "ex_bookings_provider_no_overlap"
 
-    db.add(new_booking)
-    db.commit()
 
-    # Refresh the new booking object to load relationships
-    db.refresh(new_booking)  # Ensure relationships are loaded
+def _violated_constraint(error: IntegrityError):
+    # psycopg2 and psycopg 3 both expose the constraint name on the driver error
+    return getattr(getattr(error.orig, "diag", None), "constraint_name", None)
 
-    # Prepare the booking details for the reminder email
-    booking_details_dict = {
-        "customer_email": user.email,
-        "user_full_name": user.full_name,
-        "provider_full_name": provider.full_name,
-        "service_name": service.name,
-        "booking_date": new_booking.booking_date,
-        "id": new_booking.id,
-        "user_id": booking_details.user_id,  # Add user_id for later use
-        "provider_id": booking_details.provider_id,  # Add provider_id for later use
-        "service_id": booking_details.service_id,  # Add service_id for later use
-    }
 
-    send_booking_confirmation_email(user.email, "Booking Confirmation", new_booking)
+# A plain def so the blocking Session work runs in the threadpool, not on the event loop.
+# Everything below runs in one transaction: the idempotency key, the booking, its outbox
+# email and the stored response commit together, so a retried request replays instead
+# of re-booking and the confirmation can't be lost to a crash after the commit.
+@router.post("/bookings/", status_code=201, response_model=BookingResponse)
+def create_booking(
+        booking_details: BookingCreate,
+        idempotency_key: Optional[str] = Header(None),
+        db: Session = Depends(get_db)
+):
+    if idempotency_key is not None:
+        # Scoped to the customer the booking is for, so one customer's key can't replay another's
+        idempotency_key = scoped_key(booking_details.user_id, idempotency_key)
+        request_hash = request_fingerprint(booking_details.model_dump(mode="json"))
+        stored = claim_key(db, idempotency_key, BOOKING_IDEMPOTENCY_ENDPOINT, request_hash)
+        if stored is not None:
+            db.rollback()
+            return replay_response(stored)
+
+    try:
+        # Customer, provider and service in one query
+        parties = db.execute(booking_crud.booking_parties_select(
+            booking_details.user_id, booking_details.provider_id, booking_details.service_id
+        )).first()
+        if parties is None:
+            raise HTTPException(status_code=404, detail="User, Provider, or Service not found")
+
+        # The booking occupies the provider for the service's duration
+        booking_end = booking_end_for(booking_details.booking_date, parties.duration_minutes)
+        ensure_bookable(db, booking_details.provider_id, booking_details.service_id,
+                        booking_details.booking_date, booking_end)
+
+        row = db.execute(booking_crud.insert_booking_statement({
+            "booking_date": booking_details.booking_date,
+            "booking_end": booking_end,
+            "reminder_time": booking_details.booking_date - timedelta(days=1),  # 1 day before the booking
+            "user_id": booking_details.user_id,
+            "provider_id": booking_details.provider_id,
+            "service_id": booking_details.service_id,
+        })).one()
+        response = booking_crud.to_booking_response(row, service_name=parties.service_name)
+        body = response.model_dump(mode="json")
+        # The confirmation commits with the booking and is delivered by the outbox relay
+        queue_booking_confirmation_email(db, parties.customer_email, {
+            "id": row.id,
+            "booking_date": str(row.booking_date),
+            "user_full_name": parties.user_full_name,
+            "provider_full_name": parties.provider_full_name,
+            "service_name": parties.service_name,
+        })
+        if idempotency_key is not None:
+            store_response(db, idempotency_key, BOOKING_IDEMPOTENCY_ENDPOINT, 201, body)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if _violated_constraint(e) != BOOKING_OVERLAP_CONSTRAINT:
+            raise
+        # Another request took the slot after our check
+        raise HTTPException(status_code=409, detail="The provider is already booked at that time")
+    except HTTPException:
+        # Release the idempotency key too, so the client may retry once the problem is fixed
+        db.rollback()
+        raise
+
+    # The reminder is sent by the reminder dispatcher (sche.py) once reminder_time is due
+    return response
+
+
+# Free slots of a provider for a service between two dates (inclusive), computed in one query.
+# Declared before /bookings/{user_id} so "availability" isn't parsed as a user id.
+@router.get("/bookings/availability", response_model=AvailabilityResponse)
+def get_availability(
+        provider_id: int,
+        service_id: int,
+        date_from: date,
+        date_to: date,
+        db: Session = Depends(get_db)
+):
+    slots = get_available_slots(db, provider_id, service_id, date_from, date_to)
+    return {"provider_id": provider_id, "service_id": service_id, "slots": slots}
 
-    # Schedule the reminder email
-    schedule_reminder_email(booking_details_dict, reminder_time)
 
-    # Return the new booking object
-    return new_booking
+# Replace a provider's weekly working hours (the provider themselves or an admin)
+@router.put("/providers/{provider_id}/working-hours", status_code=204)
+def set_working_hours(
+        provider_id: int,
+        data: WorkingHoursUpdate,
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_current_user)
+):
+    if current_user.id != provider_id and not current_user.has_role("admin"):
+        raise HTTPException(status_code=403, detail="Not allowed to change this provider's working hours")
+    for rule in data.rules:
+        if rule.start_time >= rule.end_time:
+            raise HTTPException(status_code=400, detail="start_time must be before end_time")
+    replace_working_hours(db, provider_id, data.service_id, data.rules)
+
+
+# List bookings for a customer or provider, one page at a time
+@router.get("/bookings/", response_model=BookingPage)
+def list_bookings(
+        user_id: Optional[int] = None,
+        provider_id: Optional[int] = None,
+        status: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        date_from: Optional[datetime] = None,  # Inclusive
+        date_to: Optional[datetime] = None,  # Exclusive
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        db: Session = Depends(get_db)
+):
+    if user_id is None and provider_id is None:
+        raise HTTPException(status_code=400, detail="user_id or provider_id is required")
+
+    return booking_crud.list_bookings(
+        db=db,
+        limit=clamp_page_size(limit),
+        cursor=cursor,
+        user_id=user_id,
+        provider_id=provider_id,
+        status=status,
+        payment_status=payment_status,
+        date_from=date_from,
+        date_to=date_to
+    )
 
 
 @router.get("/bookings/{user_id}", response_model=list[BookingResponse])
 def get_bookings(user_id: int, db: Session = Depends(get_db)):
-    # Fetch bookings from the database
-    bookings = db.query(Booking).filter(Booking.user_id == user_id).all()
+    # Fetch bookings (with service names) in a single query
+    bookings = booking_crud.get_bookings_for_user(db=db, user_id=user_id)
 
     if not bookings:
         raise HTTPException(status_code=404, detail="No bookings found")
 
-    # Ensure status and payment_status are populated with defaults if None
-    for booking in bookings:
-        booking.status = booking.status or "pending"  # Set default value if None
-        booking.payment_status = booking.payment_status or "unpaid"  # Set default value if None
-
-    # Convert SQLAlchemy Booking objects to Pydantic BookingResponse objects
-    return [
-        BookingResponse(
-            booking_id=booking.id,  # Map to the primary key 'id'
-            user_id=booking.user_id,
-            provider_id=booking.provider_id,
-            service_id=booking.service_id,
-            status=booking.status,
-            booking_date=booking.booking_date,
-            service_details=booking.service.name if booking.service else None,  # Assuming 'name' in Service model
-            payment_status=booking.payment_status
-        )
-        for booking in bookings
-    ]
-
-
-
+    return bookings
 
 
 @router.patch("/bookings/{booking_id}", response_model=BookingResponse)
@@ -103,30 +169,15 @@ def update_booking_status(
         payment_status: str = None,  # Optional, only update if provided
         db: Session = Depends(get_db)
 ):
-    db_booking = db.query(Booking).filter(Booking.id == booking_id).first()  # Filter by 'id', not 'booking_id'
+    db_booking = booking_crud.update_booking_status(
+        db=db,
+        booking_id=booking_id,
+        status=status,
+        payment_status=payment_status
+    )
 
     if not db_booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    # Update booking status if provided
-    if status:
-        db_booking.status = status
-
-    # Update payment status if provided
-    if payment_status:
-        db_booking.payment_status = payment_status
-
-    db.commit()
-    db.refresh(db_booking)
-
     # Return the updated booking as a BookingResponse
-    return BookingResponse(
-        booking_id=db_booking.id,
-        user_id=db_booking.user_id,
-        provider_id=db_booking.provider_id,
-        service_id=db_booking.service_id,
-        status=db_booking.status,
-        booking_date=db_booking.booking_date,
-        service_details=db_booking.service.name if db_booking.service else None,  # Assuming 'name' in Service model
-        payment_status=db_booking.payment_status
-    )
+    return db_booking
@@ -23,7 +23,6 @@ def approve_career_type(career_type_id: int, db: Session = Depends(get_db)):
 
 
 import logging
-logging.basicConfig(level=logging.DEBUG)
 
 logger = logging.getLogger(__name__)
 logger.debug("Career Type Router Loaded")
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from request_metrics import render_metrics
+
+router = APIRouter()
+
+
+# Prometheus text exposition format (version 0.0.4), scraped by the monitoring stack
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -2,6 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from models import User, Role
 from database import get_db
+from token_revocation import revoke_all_tokens
+from role_registry import role_registry
+from crud_operations.user_crud import add_user_roles
 
 router = APIRouter()
 
@@ -12,15 +15,18 @@ def assign_role(email: str, role_name: str, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    role = db.query(Role).filter(Role.name == role_name).first()
-    if not role:
+    role_id = role_registry.id_for(db, role_name)
+    if role_id is None:
         role = Role(name=role_name)
         db.add(role)
         db.commit()
         db.refresh(role)
+        role_registry.invalidate()
+        role_id = role.id
 
-    if role not in user.roles:
-        user.roles.append(role)
+    # A no-op when the user already has the role
+    if add_user_roles(db, user.id, [role_id]):
+        revoke_all_tokens(db, user.id)  # Existing tokens list the old roles
         db.commit()
 
     return {"message": f"Role '{role_name}' assigned to user '{email}'"}
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from crud_operations import service_crud  # Import the service CRUD operations
-from schemas import ServiceCreate, ServiceResponse  # Import the Pydantic schemas for validation
+from schemas import ServiceCreate, ServiceResponse, ServicePage  # Import the Pydantic schemas for validation
 from database import get_db
 from dependencies import get_current_user  # To get the current user (service provider)
+from pagination import DEFAULT_PAGE_SIZE, clamp_page_size
+from typing import Optional
+from catalogue_cache import catalogue_cache, cached_json_response
 
 router = APIRouter()
 
@@ -22,16 +25,57 @@ def create_service(
 
 # Get all services
 @router.get("/services/", response_model=list[ServiceResponse])
-def get_services(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return service_crud.get_services(db=db, skip=skip, limit=limit)
+def get_services(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    # Served from the catalogue cache; the database is only hit on a miss. Clamped first,
+    # so arbitrary skip/limit values can't each fill a cache entry.
+    skip, limit = max(skip, 0), clamp_page_size(limit)
+    body, etag = catalogue_cache.get_or_load(
+        f"services:{skip}:{limit}",
+        lambda: [ServiceResponse.model_validate(s) for s in service_crud.get_services(db=db, skip=skip, limit=limit)]
+    )
+    return cached_json_response(request, body, etag)
+
+# Search services (declared before /services/{service_id} so "search" isn't parsed as an ID)
+@router.get("/services/search", response_model=ServicePage)
+def search_services(
+    q: Optional[str] = None,  # Full-text query over name and description
+    category: Optional[str] = None,
+    career_type_id: Optional[int] = None,
+    provider_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: str = "newest",  # newest, price_asc or price_desc
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_db)
+):
+    if sort not in service_crud.SERVICE_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(sorted(service_crud.SERVICE_SORTS))}")
+
+    return service_crud.search_services(
+        db=db,
+        limit=clamp_page_size(limit),
+        cursor=cursor,
+        q=q,
+        category=category,
+        career_type_id=career_type_id,
+        provider_id=provider_id,
+        min_price=min_price,
+        max_price=max_price,
+        sort=sort
+    )
 
 # Get a service by ID
 @router.get("/services/{service_id}", response_model=ServiceResponse)
-def get_service(service_id: int, db: Session = Depends(get_db)):
-    db_service = service_crud.get_service_by_id(db=db, service_id=service_id)
-    if db_service is None:
+def get_service(request: Request, service_id: int, db: Session = Depends(get_db)):
+    def load_service():
+        db_service = service_crud.get_service_by_id(db=db, service_id=service_id)
+        return ServiceResponse.model_validate(db_service) if db_service is not None else None
+
+    cached = catalogue_cache.get_or_load(f"service:{service_id}", load_service)
+    if cached is None:
         raise HTTPException(status_code=404, detail="Service not found")
-    return db_service
+    return cached_json_response(request, *cached)
 
 # Update an existing service
 @router.put("/services/{service_id}", response_model=ServiceResponse)
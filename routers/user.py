@@ -1,28 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from models import User
 from schemas import UserCreate, UserResponse, ResetPasswordInput
 from database import get_db
 from dependencies import get_current_user
-from utils import hash_password, create_access_token, verify_token, log_activity
-from email_utils import send_password_reset_email
-from datetime import timedelta
-import os
-from email_utils import send_verification_email
-from urllib.parse import quote
+from utils import verify_token, log_activity
+from password_service import hash_password
+from token_revocation import revoke_all_tokens
+from email_utils import queue_verification_email, queue_password_reset_email
 
 
 router = APIRouter()
 
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:9550")
-
 @router.post("/users/")
 def create_user(
     user_data: UserCreate,  # Assuming UserCreate is the schema for the user registration
     db: Session = Depends(get_db)
 ):
     # Check if the user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = db.query(User).filter(func.lower(User.email) == user_data.email.lower()).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -36,6 +33,7 @@ def create_user(
     )
 
     db.add(new_user)
+    queue_verification_email(db, new_user.email)  # Delivered by the outbox relay once this commits
     db.commit()
     db.refresh(new_user)
 
@@ -47,43 +45,28 @@ def create_user(
         details=f"User {new_user.email} registered"
     )
 
-    # Corrected: Pass a dictionary containing the email
-    verification_token = create_access_token(data={"sub": new_user.email}, roles=[role.name for role in new_user.roles])
-
-    # Generate the verification URL (this will be used by the user to verify their email)
-    verification_url = f"{FRONTEND_URL}/verify/verify-email?token={quote(verification_token)}"
-
-    send_verification_email(
-        new_user.email,
-        "Please verify your email address",  # Subject passed here
-        f"Click the following link to verify your email: {verification_url}"  # Body passed here
-    )
-
     return {"message": "User created successfully. Please check your email for the verification link."}
 
 # **Get Current User**
 @router.get("/users/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
+def read_users_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    # The principal only holds what authorisation needs; the name can change without a new token
+    user = db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 # **Forgot Password**
 @router.post("/forgot-password")
-def forgot_password(email: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def forgot_password(email: str, db: Session = Depends(get_db)):
     # Query to check if the user exists
     user = db.query(User).filter(User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Generate the password reset token
-    token = create_access_token(
-        data={"sub": email},
-        roles=user.roles,  # Ensure `roles` is a list, e.g. ["user"]
-        expires_delta=timedelta(hours=1)
-    )
-    reset_link = f"{FRONTEND_URL}/reset-password?token={token}"
-
-    # Send the password reset email in the background
-    background_tasks.add_task(send_password_reset_email, user.email, "Reset your password", "")  # Updated task
+    # The reset link (and its token) is rendered by the outbox relay when the email goes out
+    queue_password_reset_email(db, user.email)
+    db.commit()
 
     return {"message": "Password reset link sent to your email."}
 
@@ -100,6 +83,7 @@ def reset_password(data: ResetPasswordInput, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
 
     user.hashed_password = hash_password(data.new_password)
+    revoke_all_tokens(db, user.id)  # Sessions opened with the old password end here
     db.commit()
 
     return {"message": "Password updated successfully"}
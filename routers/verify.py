@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from models import User
@@ -5,13 +6,14 @@ from utils import verify_token, log_activity
 from database import get_db
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.get("/verify-email")
 def verify_email(token: str, db: Session = Depends(get_db)):
-    print(f"Received token: {token}")  # Log the token received
     payload = verify_token(token)
     if not payload:
+        logger.info("Rejected email verification token", extra={"sample_key": "verify.invalid_token"})
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
     email = payload.get("sub")
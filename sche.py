@@ -1,107 +1,274 @@
+import logging
 import os
+import threading
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
-import pytz
-from email_utils import send_email_smtp  # Use the email utility function to send the email
-from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import aliased
+from email_dispatch import SMTPConnection
+from email_templates import email_templates, RenderedEmail
+import outbox
+from datetime import datetime, timedelta
 from models import Booking, User, Service  # Assuming these are your model classes
 from database import SessionLocal
+from db_pool import engine
+from availability import booking_local_now  # reminder_time is naive local time in REMINDER_TIMEZONE
 
 load_dotenv()
 
-# Get the FRONTEND_URL from the environment variables
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:9550")  # Default to localhost if not found
-
-# Initialize the scheduler
-scheduler = BackgroundScheduler()
-
-def send_reminder_email_job(customer_email: str, subject: str, booking_details: dict):
-    # Ensure keys exist before accessing
-    customer_name = booking_details.get('user_full_name', 'Customer')
-    provider_name = booking_details.get('provider_full_name', 'Provider')
-    service_name = booking_details.get('service_name', 'Service')
-    booking_date = booking_details.get('booking_date', 'Date not available')
-    reminder_link = f"{FRONTEND_URL}/view-booking/{booking_details.get('id', '')}"
-
-    # Create the HTML body for the email
-    html_body = f"""
-    <html>
-      <body style="font-family: Arial, sans-serif; line-height: 1.6;">
-        <div style="max-width: 600px; margin: auto; padding: 20px; border: 1px solid #eaeaea; border-radius: 8px;">
-          <h2 style="color: #333;">Reminder: Upcoming Booking</h2>
-          <p>Hi {customer_name},</p>
-          <p>This is a friendly reminder about your upcoming booking for the service:</p>
-
-          <div style="margin-top: 20px; padding: 10px; background-color: #f9f9f9; border-radius: 5px;">
-            <p><strong>Service Provider:</strong> {provider_name}</p>
-            <p><strong>Service:</strong> {service_name}</p>
-            <p><strong>Booking Date:</strong> {booking_date}</p>
-          </div>
-
-          <p>Please make sure to be on time. You can review or cancel the booking by clicking the link below:</p>
-          <p style="text-align: center;">
-            <a href="{reminder_link}" style="background-color: #FF5722; color: white; padding: 12px 20px; text-decoration: none; border-radius: 5px;">View Your Booking</a>
-          </p>
-
-          <p>Thank you for choosing our services! We look forward to serving you.</p>
-          <p style="color: #999; font-size: 12px;">This link will expire 1 hour before your booking time.</p>
-        </div>
-      </body>
-    </html>
-    """
-
-    send_email_smtp(customer_email, subject, html_body)
-
-def schedule_reminder_email(booking_details: dict, reminder_time: datetime):
-    db = SessionLocal()  # Get a new session for the background task
+logger = logging.getLogger(__name__)
 
-    try:
-        # Access data from the dictionary
-        user_id = booking_details['user_id']
-        provider_id = booking_details['provider_id']
-        service_id = booking_details['service_id']
-
-        # Reload related data (user, provider, service)
-        user = db.query(User).filter(User.id == user_id).first()
-        provider = db.query(User).filter(User.id == provider_id).first()
-        service = db.query(Service).filter(Service.id == service_id).first()
-
-        # Access the customer name, provider name, and service name
-        customer_name = user.full_name
-        provider_name = provider.full_name
-        service_name = service.name
-
-        # Prepare the email details
-        reminder_link = f"{FRONTEND_URL}/view-booking/{booking_details['id']}"
-
-        booking_details_dict = {
-            "user_full_name": customer_name,
-            "provider_full_name": provider_name,
-            "service_name": service_name,
-            "booking_date": booking_details['booking_date'],
-            "id": booking_details['id'],
-        }
+# Reminder dispatcher settings
+REMINDER_POLL_SECONDS = float(os.getenv("REMINDER_POLL_SECONDS", "30"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+REMINDER_LOCK_KEY = int(os.getenv("REMINDER_LOCK_KEY", "720301"))  # Postgres advisory lock id for leader election
+# Run the dispatcher inside the API process; set to false when running `python sche.py` as a worker instead
+REMINDER_DISPATCHER_EMBEDDED = os.getenv("REMINDER_DISPATCHER_EMBEDDED", "true").lower() in {"true", "1", "yes", "on"}
+
+# Digest mode: a customer with a due reminder gets one email covering all their bookings
+# whose reminders fall due within the window, instead of one email per booking
+REMINDER_DIGEST_ENABLED = os.getenv("REMINDER_DIGEST_ENABLED", "true").lower() in {"true", "1", "yes", "on"}
+REMINDER_DIGEST_WINDOW_MINUTES = int(os.getenv("REMINDER_DIGEST_WINDOW_MINUTES", "60"))
+
+REMINDER_SUBJECT = "Reminder: Your Upcoming Booking"
+REMINDER_DIGEST_SUBJECT = "Reminder: Your Upcoming Bookings"
+
+
+# Rendered from templates/email/booking_reminder.*
+def render_reminder_email(booking_details: dict) -> RenderedEmail:
+    return email_templates.render("booking_reminder", **booking_details)
+
+
+# Rendered from templates/email/booking_reminder_digest.*
+def render_reminder_digest_email(digest: dict) -> RenderedEmail:
+    return email_templates.render("booking_reminder_digest", **digest)
+
+
+EMAIL_BOOKING_REMINDER = "email.booking_reminder"
+EMAIL_BOOKING_REMINDER_DIGEST = "email.booking_reminder_digest"
+
+
+# Delivered by the outbox relay (outbox.py)
+@outbox.register_handler(EMAIL_BOOKING_REMINDER)
+def deliver_reminder_email(smtp: SMTPConnection, payload: dict):
+    email = render_reminder_email(payload["booking"])
+    smtp.send(payload["to_email"], REMINDER_SUBJECT, email.html, email.text)
+
+
+@outbox.register_handler(EMAIL_BOOKING_REMINDER_DIGEST)
+def deliver_reminder_digest_email(smtp: SMTPConnection, payload: dict):
+    email = render_reminder_digest_email(payload["digest"])
+    smtp.send(payload["to_email"], REMINDER_DIGEST_SUBJECT, email.html, email.text)
+
+
+def reminder_details(row) -> dict:
+    return {
+        "user_full_name": row.user_full_name,
+        "provider_full_name": row.provider_full_name,
+        "service_name": row.service_name,
+        "booking_date": str(row.booking_date),
+        "id": row.id,
+    }
+
+
+# One outbox payload per customer: the single-booking reminder as before, or a digest
+# of their bookings in date order when several are due together.
+# Without digest, every booking gets its own reminder.
+def reminder_messages(rows, digest: bool = True) -> list:
+    by_customer = {}
+    for row in rows:
+        key = row.customer_id if digest else row.id
+        by_customer.setdefault(key, []).append(row)
+    messages = []
+    for customer_rows in by_customer.values():
+        first = customer_rows[0]
+        if len(customer_rows) == 1:
+            messages.append((EMAIL_BOOKING_REMINDER, {"to_email": first.customer_email, "booking": reminder_details(first)}))
+            continue
+        customer_rows.sort(key=lambda row: row.booking_date)
+        messages.append((EMAIL_BOOKING_REMINDER_DIGEST, {
+            "to_email": first.customer_email,
+            "digest": {
+                "user_full_name": first.user_full_name,
+                "bookings": [reminder_details(row) for row in customer_rows],
+            },
+        }))
+    return messages
+
+
+# Reminders are driven by bookings.reminder_time: whichever process holds the
+# advisory lock polls for due, unsent reminders in batches and marks them sent.
+class ReminderDispatcher:
+    def __init__(self, poll_seconds: float = REMINDER_POLL_SECONDS, batch_size: int = REMINDER_BATCH_SIZE):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self._lock_connection = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.queued = 0  # Bookings whose reminder was handed to the outbox
+        self.emails = 0  # Emails those became (fewer than bookings with digests)
+        self.batches = 0
+        self.last_batch_size = 0
 
-        # Schedule the email job at the reminder time
-        scheduler.add_job(
-            send_reminder_email_job,
-            DateTrigger(run_date=reminder_time, timezone=pytz.timezone('Asia/Kuala_Lumpur')),
-            args=[user.email, "Reminder: Your Upcoming Booking", booking_details_dict]
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_connection is not None
+
+    def _try_acquire_leadership(self) -> bool:
+        if self._lock_connection is not None:
+            try:
+                self._lock_connection.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                # Lost the connection, and the session-level lock along with it
+                self._release_leadership()
+        # Autocommit so holding the lock doesn't also hold an open transaction
+        connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": REMINDER_LOCK_KEY}).scalar()
+        if acquired:
+            self._lock_connection = connection
+            return True
+        connection.close()
+        return False
+
+    def _release_leadership(self):
+        connection, self._lock_connection = self._lock_connection, None
+        if connection is None:
+            return
+        try:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": REMINDER_LOCK_KEY})
+        except Exception:
+            pass
+        finally:
+            connection.close()
+
+    def _reminder_query(self, db):
+        customer = aliased(User)
+        provider = aliased(User)
+        return (
+            db.query(
+                Booking.id,
+                Booking.booking_date,
+                customer.id.label("customer_id"),
+                customer.email.label("customer_email"),
+                customer.full_name.label("user_full_name"),
+                provider.full_name.label("provider_full_name"),
+                Service.name.label("service_name"),
+            )
+            .join(customer, Booking.user_id == customer.id)
+            .join(provider, Booking.provider_id == provider.id)
+            .join(Service, Booking.service_id == Service.id)
+            .filter(Booking.reminder_sent_at.is_(None))
+        )
+
+    def _due_query(self, db, now: datetime):
+        return (
+            self._reminder_query(db)
+            .filter(Booking.reminder_time <= now)
+            .order_by(Booking.reminder_time)
+            .limit(self.batch_size)
         )
 
-    except Exception as e:
-        print(f"Error scheduling reminder email: {e}")
+    def _fetch_due(self, db, now: datetime) -> list:
+        return self._due_query(db, now).all()
+
+    # The same customers' other reminders that are due (but fell outside this batch) or fall
+    # due within the digest window, pulled forward so they go out in the same email
+    def _fetch_for_digest(self, db, now: datetime, customer_ids: set, exclude_ids: set) -> list:
+        window_end = now + timedelta(minutes=REMINDER_DIGEST_WINDOW_MINUTES)
+        rows = (
+            self._reminder_query(db)
+            .filter(Booking.user_id.in_(customer_ids), Booking.reminder_time <= window_end)
+            .all()
+        )
+        return [row for row in rows if row.id not in exclude_ids]
+
+    # Hands due reminders to the outbox and marks them sent in the same transaction, so
+    # the leader never waits on SMTP and a reminder is neither lost nor queued twice
+    def dispatch_due(self) -> int:
+        now = booking_local_now()
+        db = SessionLocal()
+        try:
+            due = self._fetch_due(db, now)
+            rows = list(due)
+            if rows and REMINDER_DIGEST_ENABLED:
+                rows += self._fetch_for_digest(db, now, {row.customer_id for row in due}, {row.id for row in due})
+
+            emails = 0
+            if rows:
+                messages = reminder_messages(rows, digest=REMINDER_DIGEST_ENABLED)
+                for kind in (EMAIL_BOOKING_REMINDER, EMAIL_BOOKING_REMINDER_DIGEST):
+                    outbox.enqueue_many(db, kind, [payload for message_kind, payload in messages if message_kind == kind])
+                db.query(Booking).filter(Booking.id.in_([row.id for row in rows])).update(
+                    {Booking.reminder_sent_at: now}, synchronize_session=False
+                )
+                emails = len(messages)
+            db.commit()
+
+            self.queued += len(rows)
+            self.emails += emails
+            self.batches += 1
+            self.last_batch_size = len(due)
+            return len(due)
+        finally:
+            db.close()
 
-    finally:
-        # Ensure the session is closed after use
-        db.close()
+    def run_forever(self):
+        try:
+            while not self._stopping.is_set():
+                try:
+                    if self._try_acquire_leadership():
+                        # Keep draining while batches come back full, then wait for the next poll
+                        while self.dispatch_due() >= self.batch_size and not self._stopping.is_set():
+                            pass
+                except Exception:
+                    logger.exception("Error dispatching reminder emails")
+                self._stopping.wait(self.poll_seconds)
+        finally:
+            self._release_leadership()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="reminder-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "is_leader": self.is_leader,
+            "queued": self.queued,
+            "emails": self.emails,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+        }
+
+
+reminder_dispatcher = ReminderDispatcher()
 
 
 # Start the scheduler
 def start_scheduler():
-    scheduler.start()
+    if REMINDER_DISPATCHER_EMBEDDED:
+        reminder_dispatcher.start()
 
 # Gracefully shutdown the scheduler on app shutdown
 def stop_scheduler():
-    scheduler.shutdown()
+    reminder_dispatcher.stop()
+
+
+# Run the dispatcher as a standalone worker process: `python sche.py`
+if __name__ == "__main__":
+    from db_pool import configure_pool
+
+    configure_pool()
+    print(f"Reminder dispatcher polling every {REMINDER_POLL_SECONDS}s (batch size {REMINDER_BATCH_SIZE})")
+    try:
+        reminder_dispatcher.run_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, time
 
 
 class UserCreate(BaseModel):
@@ -36,6 +36,7 @@ class ServiceCreate(BaseModel):
     category: str  # The category of the service
     career_type_id: int  # The ID of the career type the service belongs to
     currency: str = 'MYR'  # The currency/unit (e.g., USD, EUR, etc.)
+    duration_minutes: int = Field(default=60, gt=0)  # How long one booking of this service takes
 
     class Config:
         from_attributes = True  # Use from_attributes instead of orm_mode
@@ -50,6 +51,11 @@ class ServiceResponse(ServiceCreate):
         from_attributes = True  # Use from_attributes instead of orm_mode
 
 
+class ServicePage(BaseModel):
+    items: List[ServiceResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to get the next page; None on the last page
+
+
 class UserProfileCreate(BaseModel):
     name: str
     bio: Optional[str] = None
@@ -110,6 +116,40 @@ class BookingResponse(BaseModel):
 
 
 
+class BookingPage(BaseModel):
+    items: List[BookingResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to get the next page; None on the last page
+
+
+
+# One weekly working-hours rule of a provider
+class AvailabilityRule(BaseModel):
+    weekday: int = Field(ge=0, le=6)  # 0 = Monday ... 6 = Sunday
+    start_time: time
+    end_time: time
+    slot_minutes: Optional[int] = Field(default=None, gt=0)  # Defaults to the service duration
+
+    class Config:
+        from_attributes = True
+
+
+class WorkingHoursUpdate(BaseModel):
+    service_id: Optional[int] = None  # None = rules that apply to all the provider's services
+    rules: List[AvailabilityRule]
+
+
+class AvailabilitySlot(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class AvailabilityResponse(BaseModel):
+    provider_id: int
+    service_id: int
+    slots: List[AvailabilitySlot]
+
+
+
 class AdminUserCreate(BaseModel):
     email: str
     full_name: str
@@ -122,6 +162,21 @@ class AdminUserCreate(BaseModel):
 
 
 
+# One row of a bulk user import (CSV columns / NDJSON keys of the same names)
+class BulkUserRow(BaseModel):
+    email: EmailStr
+    full_name: str
+    password: str
+    roles: List[str] = []
+    is_active: bool = True
+
+
+class BulkRoleAssignment(BaseModel):
+    role_name: str
+    emails: List[str]
+
+
+
 class ActivityLogResponse(BaseModel):
     id: int
     user_id: int
@@ -0,0 +1,109 @@
+# Service search benchmark against a scratch database (DATABASE_URL):
+#     python service_search_bench.py --services 1000000
+#
+# Times offset paging (get_services) against keyset paging (search_services) at increasing
+# depths, plus filtered and full-text searches, and prints their plans. Bench rows belong
+# to one tagged provider and are deleted before and after the run.
+import argparse
+import time
+from sqlalchemy import select, text
+from database import SessionLocal
+from db_pool import configure_pool, engine, explain_analyze
+from models import Service
+from pagination import encode_cursor
+from crud_operations.service_crud import get_services, search_services, search_services_select
+
+BENCH_PROVIDER_EMAIL = "service-bench@example.invalid"
+BENCH_CAREER_TYPE = "Service search benchmark"
+BENCH_WORDS = ("haircut", "massage", "tutoring", "plumbing", "yoga", "photography", "cleaning", "coaching",
+               "repair", "design", "catering", "consulting", "training", "delivery", "makeup", "therapy")
+
+
+# One bench provider and career type with `services` rows spread over 10 categories and a range of prices
+def seed(services: int):
+    with engine.begin() as connection:
+        provider_id = connection.execute(text(
+            "INSERT INTO users (email, full_name, hashed_password, is_active, is_verified, token_version) "
+            "VALUES (:email, 'Bench Provider', '', true, true, 0) RETURNING id"
+        ), {"email": BENCH_PROVIDER_EMAIL}).scalar()
+        career_type_id = connection.execute(text(
+            "INSERT INTO career_types (name, is_approved) VALUES (:name, true) RETURNING id"
+        ), {"name": BENCH_CAREER_TYPE}).scalar()
+        connection.execute(text(
+            "INSERT INTO services (name, description, price, category, currency, user_id, career_type_id, duration_minutes) "
+            "SELECT initcap((:words)[1 + i % 16]) || ' ' || i, "
+            "       (:words)[1 + (i / 16) % 16] || ' and ' || (:words)[1 + (i / 256) % 16] || ' by appointment', "
+            "       10 + (i::bigint * 7919) % 99000 / 100.0, 'category-' || i % 10, 'MYR', :provider_id, "
+            "       :career_type_id, 60 "
+            "FROM generate_series(1, :services) i"
+        ), {"words": list(BENCH_WORDS), "provider_id": provider_id, "career_type_id": career_type_id,
+            "services": services})
+        connection.execute(text("ANALYZE services"))
+
+
+def clean():
+    with engine.begin() as connection:
+        params = {"email": BENCH_PROVIDER_EMAIL, "career_type": BENCH_CAREER_TYPE}
+        connection.execute(text("DELETE FROM services WHERE user_id IN (SELECT id FROM users WHERE email = :email)"), params)
+        connection.execute(text("DELETE FROM users WHERE email = :email"), params)
+        connection.execute(text("DELETE FROM career_types WHERE name = :career_type"), params)
+
+
+def median_ms(call) -> float:
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[2] * 1000
+
+
+def run(services: int, page_size: int):
+    clean()
+    started = time.perf_counter()
+    seed(services)
+    print(f"seed {services:,} services in {time.perf_counter() - started:.1f} s")
+    db = SessionLocal()
+    try:
+        depths = [depth for depth in (0, 1000, 10000, 100000, 500000, 900000) if depth < services]
+        print(f"{'depth':>10} {'offset ms':>10} {'keyset ms':>10} {'price keyset ms':>16}")
+        for depth in depths:
+            newest_cursor = price_cursor = None
+            if depth:
+                last_id = db.execute(select(Service.id).order_by(Service.id.desc()).offset(depth - 1).limit(1)).scalar()
+                last = db.execute(select(Service.price, Service.id).order_by(Service.price, Service.id)
+                                  .offset(depth - 1).limit(1)).one()
+                newest_cursor, price_cursor = encode_cursor(last_id), encode_cursor(last.price, last.id)
+            offset_ms = median_ms(lambda: get_services(db, skip=depth, limit=page_size))
+            keyset_ms = median_ms(lambda: search_services(db, page_size, cursor=newest_cursor))
+            price_ms = median_ms(lambda: search_services(db, page_size, cursor=price_cursor, sort="price_asc"))
+            print(f"{depth:>10,} {offset_ms:>10.2f} {keyset_ms:>10.2f} {price_ms:>16.2f}")
+
+        searches = {
+            "q=yoga": {"q": "yoga"},
+            "q=yoga massage, price_asc": {"q": "yoga massage", "sort": "price_asc"},
+            "category, 100-200": {"category": "category-3", "min_price": 100, "max_price": 200},
+        }
+        for label, filters in searches.items():
+            print(f"{label:>28} {median_ms(lambda: search_services(db, page_size, **filters)):10.2f} ms")
+
+        deepest = depths[-1]
+        print(f"\noffset page at {deepest:,}:")
+        print(explain_analyze(db.connection(), select(Service).offset(deepest).limit(page_size)))
+        print(f"\nkeyset page at {deepest:,}:")
+        print(explain_analyze(db.connection(), search_services_select(page_size, cursor=newest_cursor)))
+        print("\nq=yoga:")
+        print(explain_analyze(db.connection(), search_services_select(page_size, q="yoga")))
+    finally:
+        db.close()
+        clean()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service search benchmark: offset vs keyset paging")
+    parser.add_argument("--services", type=int, default=1000000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    configure_pool()
+    run(args.services, args.page_size)
@@ -0,0 +1,107 @@
+# Local SMTP stand-in for running the outbox relay and benchmarking SMTP delivery offline.
+#
+# Start the sink:
+#     python smtp_sink.py --port 1025
+#
+# Point the app at it with SMTP_HOST=localhost SMTP_PORT=1025 SMTP_USE_TLS=false,
+# or measure delivery throughput over reused connections (one per relay worker) directly:
+#     python smtp_sink.py --port 1025 --bench 5000
+import argparse
+import os
+import threading
+import time
+
+# aiosmtpd is only needed for local testing, not in production
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.expected = None
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.received += 1
+            if self.expected is not None and self.received >= self.expected:
+                self._done.set()
+        return "250 Message accepted for delivery"
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        with self._lock:
+            self.expected = count
+            if self.received >= count:
+                return True
+        return self._done.wait(timeout)
+
+
+def run_benchmark(handler: CountingHandler, port: int, messages: int, connections: int):
+    # Configure SMTP before importing it so the connections talk to the sink
+    os.environ.update({"SMTP_HOST": "localhost", "SMTP_PORT": str(port), "SMTP_USE_TLS": "false"})
+    from email_dispatch import SMTPConnection
+
+    html_body = "<html><body><p>Benchmark message</p></body></html>"
+    pool = [SMTPConnection() for _ in range(connections)]
+
+    # Each thread owns one connection, like an outbox relay worker
+    def deliver(index: int, connection):
+        try:
+            for i in range(index, messages, connections):
+                connection.send(f"user{i}@example.com", "Benchmark", html_body, "Benchmark message")
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=deliver, args=(index, connection)) for index, connection in enumerate(pool)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    delivered = handler.wait_for(messages, timeout=max(60.0, messages / 10))
+    elapsed = time.perf_counter() - started
+
+    print(f"Delivered {handler.received}/{messages} messages in {elapsed:.2f}s "
+          f"({handler.received / elapsed:.0f} msg/s) with {connections} connection(s), "
+          f"{sum(c.connections_opened for c in pool)} opened")
+    if not delivered:
+        print("Timed out before all messages were delivered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink that counts received messages")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--bench", type=int, default=0, help="Send this many messages and exit")
+    parser.add_argument("--connections", type=int, default=2, help="Concurrent SMTP connections for --bench")
+    args = parser.parse_args()
+
+    if Controller is None:
+        raise SystemExit("aiosmtpd is required: pip install aiosmtpd")
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname=args.host, port=args.port)
+    controller.start()
+    try:
+        if args.bench:
+            run_benchmark(handler, args.port, args.bench, args.connections)
+            return
+        print(f"SMTP sink listening on {args.host}:{args.port}")
+        last = 0
+        while True:
+            time.sleep(1)
+            if handler.received != last:
+                print(f"received={handler.received} (+{handler.received - last}/s)")
+                last = handler.received
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
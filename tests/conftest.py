@@ -0,0 +1,45 @@
+import os
+import pytest
+
+# Database tests run against a disposable Postgres database whose tables are dropped and
+# recreated, e.g. TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost/serviceapp_test.
+# They are skipped when it is not set.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL  # Before database.py reads it
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from sqlalchemy import text
+    from database import Base
+    from db_pool import configure_pool, engine
+    from activity_log_partitions import run_maintenance
+    import models  # Registers the tables on Base.metadata
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))  # For the bookings exclusion constraint
+    configure_pool()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    run_maintenance()  # activity_logs is partitioned by month; create the current partitions
+    yield engine
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def db(db_engine):
+    from sqlalchemy import text
+    from database import Base, SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        with db_engine.begin() as connection:
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
@@ -0,0 +1,73 @@
+from datetime import date, datetime
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import text
+import activity_log_partitions
+from activity_log_partitions import DETACHED_MARKER, list_detached, list_partitions, partition_month, run_maintenance
+
+
+def test_expired_partitions_are_detached_then_dropped(db_engine, monkeypatch):
+    monkeypatch.setattr(activity_log_partitions, "ACTIVITY_LOG_RETENTION_MONTHS", 12)
+    run_maintenance(today=date(2001, 1, 15))
+    with db_engine.begin() as connection:
+        # Left behind by an earlier run that stopped between the detach and the drop
+        connection.execute(text("CREATE TABLE activity_logs_y2000m06 (LIKE activity_logs)"))
+        connection.execute(text(f"COMMENT ON TABLE activity_logs_y2000m06 IS '{DETACHED_MARKER}'"))
+
+    result = run_maintenance(today=date(2003, 1, 15))
+
+    assert {"activity_logs_y2000m06", "activity_logs_y2001m01", "activity_logs_y2001m04"} <= set(result["dropped"])
+    with db_engine.connect() as connection:
+        months = [partition_month(name) for name in list_partitions(connection)]
+        assert not [month for month in months if month is not None and month < date(2002, 1, 1)]
+        assert list_detached(connection) == []
+    run_maintenance()  # Restore the current partitions for the other tests
+
+
+def test_tables_detached_by_someone_else_are_kept(db_engine, monkeypatch):
+    monkeypatch.setattr(activity_log_partitions, "ACTIVITY_LOG_RETENTION_MONTHS", 12)
+    with db_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE activity_logs_y2000m07 (LIKE activity_logs)"))  # An operator's archive
+    try:
+        result = run_maintenance(today=date(2003, 1, 15))
+
+        assert "activity_logs_y2000m07" not in result["dropped"]
+        with db_engine.connect() as connection:
+            assert connection.execute(text("SELECT to_regclass('activity_logs_y2000m07')")).scalar() is not None
+    finally:
+        with db_engine.begin() as connection:
+            connection.execute(text("DROP TABLE activity_logs_y2000m07"))
+        run_maintenance()
+
+
+def test_retention_is_off_by_default(db_engine):
+    assert activity_log_partitions.ACTIVITY_LOG_RETENTION_MONTHS == 0
+    run_maintenance(today=date(2000, 1, 15))
+
+    result = run_maintenance(today=date(2010, 1, 15))
+
+    assert result["dropped"] == []
+    with db_engine.connect() as connection:
+        assert "activity_logs_y2000m01" in list_partitions(connection)
+    with db_engine.begin() as connection:
+        for name in list_partitions(connection):
+            if name.startswith(("activity_logs_y2000", "activity_logs_y2010")):
+                connection.execute(text(f"DROP TABLE {name}"))
+
+
+def test_rows_without_a_partition_go_to_the_default_and_move_once_it_exists(db, db_engine):
+    from models import ActivityLog
+
+    db.add(ActivityLog(action="late", timestamp=datetime(1999, 5, 2)))
+    db.commit()  # No partition for May 1999; kept in the default one
+
+    run_maintenance(today=date(1999, 5, 20))
+
+    with db_engine.begin() as connection:
+        assert connection.execute(text("SELECT count(*) FROM activity_logs_default")).scalar() == 0
+        assert connection.execute(text("SELECT action FROM activity_logs_y1999m05")).scalar() == "late"
+        for name in list_partitions(connection):
+            if name.startswith(("activity_logs_y1999", "activity_logs_y2000m0")):
+                connection.execute(text(f"DROP TABLE {name}"))
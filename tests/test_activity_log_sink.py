@@ -0,0 +1,39 @@
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import func, select
+from activity_log_sink import ActivityLogSink
+from models import ActivityLog, User
+
+
+def test_block_policy_does_not_block_the_event_loop():
+    sink = ActivityLogSink(max_buffer=1, overflow_policy="block")
+    assert sink.add(user_id=1, action="first")
+
+    async def add_from_handler():
+        started = time.perf_counter()
+        added = sink.add(user_id=1, action="second")
+        return added, time.perf_counter() - started
+
+    added, elapsed = asyncio.run(add_from_handler())
+    assert not added and elapsed < 0.1
+    assert sink.stats()["dropped"] == 1
+
+
+def test_a_refused_row_does_not_hold_back_the_rest(db):
+    user = User(email="someone@example.com", full_name="Someone", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    sink = ActivityLogSink()
+    for index in range(3):
+        sink.add(user_id=user.id, action=f"Action {index}")
+    sink.add(user_id=user.id + 1000, action="Unknown user")  # Foreign key violation
+
+    assert sink.flush() == 3
+    assert sink.stats()["rejected"] == 1
+    assert sink.stats()["buffered"] == 0
+    assert db.execute(select(func.count()).select_from(ActivityLog)).scalar() == 3
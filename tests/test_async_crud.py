@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+
+# The async CRUD modules run the same role, token and profile writes as the sync ones
+def _run(db_engine, work):
+    async def main():
+        async_engine = create_async_engine(db_engine.url.set(drivername="postgresql+asyncpg"))
+        try:
+            async with async_sessionmaker(async_engine, expire_on_commit=False)() as session:
+                return await work(session)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_async_user_crud_sets_roles_and_revokes_tokens(db, db_engine):
+    from models import Role, User
+    from crud_operations import async_user_crud
+    from role_registry import role_registry
+
+    db.add_all([Role(name="admin"), Role(name="customer")])
+    db.commit()
+    role_registry.invalidate()
+
+    async def work(session):
+        user = await async_user_crud.create_user(session, "async@example.com", "Async", "x", roles=["customer"])
+        updated = await async_user_crud.update_user(session, user.id, roles=["admin"])
+        return user.id, [role.name for role in updated.roles]
+
+    user_id, role_names = _run(db_engine, work)
+
+    assert role_names == ["admin"]
+    user = db.execute(select(User).where(User.id == user_id)).scalar_one()
+    assert [role.name for role in user.roles] == ["admin"]
+    assert user.token_version == 1
+
+
+def test_async_profile_and_career_type_crud(db, db_engine):
+    from models import User
+    from crud_operations import async_career_type, async_user_profile_crud
+    from schemas import UserProfileCreate, UserProfileUpdate
+
+    user = User(email="profile@example.com", full_name="Profile", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    async def work(session):
+        career_type = await async_career_type.create_career_type(session, "Tutor")
+        approved = await async_career_type.approve_career_type(session, career_type.id)
+        await async_user_profile_crud.create_user_profile(session, user.id, UserProfileCreate(name="Profile", bio="Hello"))
+        profile = await async_user_profile_crud.update_user_profile(session, user.id, UserProfileUpdate(name="Profile", bio="Updated"))
+        return approved.is_approved, profile.bio
+
+    assert _run(db_engine, work) == (True, "Updated")
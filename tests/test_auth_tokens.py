@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("jwt")
+
+import auth_tokens
+from auth_tokens import decode_token, issue_access_token, principal_from_claims
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    monkeypatch.setattr(auth_tokens, "_SIGNING_KEY", b"test-secret-key-with-enough-length-for-hs256")
+
+
+def make_user(**fields):
+    user = dict(id=7, email="a@example.com", full_name="Ann", is_active=True, is_verified=True,
+                roles=[SimpleNamespace(name="customer")], token_version=2)
+    user.update(fields)
+    return SimpleNamespace(**user)
+
+
+def test_access_token_claims_build_the_principal():
+    principal = principal_from_claims(decode_token(issue_access_token(make_user())))
+
+    assert (principal.id, principal.email, principal.is_verified) == (7, "a@example.com", True)
+    assert principal.role_names == {"customer"}
+
+
+def test_access_token_carries_no_claim_that_can_change_without_revocation():
+    payload = decode_token(issue_access_token(make_user()))
+
+    assert "name" not in payload
+    assert not hasattr(principal_from_claims(payload), "full_name")
+
+
+def test_tokens_without_claims_fall_back_to_the_database(monkeypatch):
+    payload = decode_token(issue_access_token(make_user()))
+    assert principal_from_claims({"sub": "a@example.com", "typ": "email_verification"}) is None
+
+    monkeypatch.setattr(auth_tokens, "AUTH_TRUST_TOKEN_CLAIMS", False)
+    assert principal_from_claims(payload) is None
@@ -0,0 +1,41 @@
+from datetime import date, datetime, timedelta
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pytz")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from availability import BOOKING_TIMEZONE, available_slots_params
+from models import Service, User
+from routers import booking_router
+
+
+def test_slots_start_from_the_booking_wall_clock():
+    not_before = available_slots_params(1, 1, date.today(), date.today())["not_before"]
+    local_now = datetime.now(BOOKING_TIMEZONE).replace(tzinfo=None)
+    assert abs(local_now - not_before) < timedelta(seconds=5)
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(booking_router.router, prefix="/bookings")
+    return TestClient(app)
+
+
+def test_availability_needs_a_service_of_that_provider(db, client):
+    provider = User(email="provider@example.com", full_name="Provider", hashed_password="x")
+    other = User(email="other@example.com", full_name="Other", hashed_password="x")
+    db.add_all([provider, other])
+    db.flush()
+    own = Service(name="Own", price=10.0, user_id=provider.id)
+    foreign = Service(name="Foreign", price=10.0, user_id=other.id)
+    db.add_all([own, foreign])
+    db.commit()
+
+    day = (date.today() + timedelta(days=1)).isoformat()
+    url = "/bookings/bookings/availability?provider_id={}&service_id={}&date_from={day}&date_to={day}"
+    assert client.get(url.format(provider.id, own.id, day=day)).status_code == 200
+    assert client.get(url.format(provider.id, foreign.id, day=day)).status_code == 404
+    assert client.get(url.format(provider.id, foreign.id + 100, day=day)).status_code == 404
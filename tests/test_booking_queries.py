@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from models import Booking, Service, User
+from routers import booking_router
+
+
+@contextmanager
+def count_statements(engine):
+    counter = [0]
+
+    def count(*args):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(booking_router.router, prefix="/bookings")
+    return TestClient(app)
+
+
+@pytest.fixture
+def parties(db):
+    customer = User(email="customer@example.com", full_name="Customer", hashed_password="x")
+    provider = User(email="provider@example.com", full_name="Provider", hashed_password="x")
+    db.add_all([customer, provider])
+    db.flush()
+    services = [Service(name=f"Service {i}", price=10.0, user_id=provider.id) for i in range(3)]
+    db.add_all(services)
+    db.commit()
+    return customer.id, provider.id, [service.id for service in services]
+
+
+def _add_bookings(db, parties, start: int, stop: int):
+    customer_id, provider_id, service_ids = parties
+    first = datetime(2030, 1, 1, 9)
+    db.add_all([
+        Booking(user_id=customer_id, provider_id=provider_id, service_id=service_ids[i % len(service_ids)],
+                booking_date=first + timedelta(hours=i), booking_end=first + timedelta(hours=i, minutes=30))
+        for i in range(start, stop)
+    ])
+    db.commit()
+
+
+def test_booking_lists_run_a_constant_number_of_statements(db, db_engine, client, parties):
+    customer_id, provider_id, _ = parties
+    endpoints = {
+        "customer bookings": f"/bookings/bookings/{customer_id}",
+        "customer page": f"/bookings/bookings/?user_id={customer_id}&limit=100",
+        "provider page": f"/bookings/bookings/?provider_id={provider_id}&limit=100",
+    }
+    counts = {name: [] for name in endpoints}
+    added = 0
+    for total in (1, 10, 50):
+        _add_bookings(db, parties, added, total)
+        added = total
+        for name, url in endpoints.items():
+            with count_statements(db_engine) as counter:
+                response = client.get(url)
+            assert response.status_code == 200
+            body = response.json()
+            assert len(body if isinstance(body, list) else body["items"]) == total
+            counts[name].append(counter[0])
+
+    for name, per_size in counts.items():
+        assert per_size[0] >= 1 and len(set(per_size)) == 1, f"{name}: {per_size} statements for 1, 10 and 50 bookings"
+
+
+def test_booking_status_defaults_to_pending_and_cannot_be_null(db, parties):
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+
+    customer_id, provider_id, service_ids = parties
+    booking = Booking(user_id=customer_id, provider_id=provider_id, service_id=service_ids[0])
+    db.add(booking)
+    db.commit()
+    assert booking.status == "pending"
+
+    with pytest.raises(IntegrityError):
+        db.execute(insert(Booking).values(user_id=customer_id, provider_id=provider_id, service_id=service_ids[0],
+                                          status=None))
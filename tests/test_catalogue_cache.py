@@ -0,0 +1,122 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+from starlette.requests import Request
+from catalogue_cache import VERSION_KEY, CatalogueCache, InMemoryBackend, RedisBackend, cached_json_response
+
+
+# Just enough of a Redis client for RedisBackend: values come back as bytes, like redis-py
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.expiries = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        self.expiries[key] = ex
+
+    def incr(self, key):
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+
+def _request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/services/", "headers": headers})
+
+
+def test_shared_backend_serves_hits_and_invalidates_across_instances():
+    client = FakeRedis()
+    worker_a = CatalogueCache(RedisBackend(client), ttl_seconds=60)
+    worker_b = CatalogueCache(RedisBackend(client), ttl_seconds=60)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [{"id": 1, "name": "Haircut"}]
+
+    body, etag = worker_a.get_or_load("services:0:10", loader)
+    assert worker_b.get_or_load("services:0:10", loader) == (body, etag)
+    assert len(loads) == 1
+    assert 60 in client.expiries.values()
+
+    worker_b.invalidate()
+    worker_a.get_or_load("services:0:10", loader)
+    assert len(loads) == 2
+    assert worker_a.stats()["version"] == 1
+
+
+def test_loader_returning_none_is_not_cached():
+    cache = CatalogueCache(RedisBackend(FakeRedis()))
+
+    assert cache.get_or_load("service:404", lambda: None) is None
+    assert cache.get_or_load("service:404", lambda: {"id": 404}) is not None
+
+
+def test_in_memory_backend_evicts_least_recently_used():
+    backend = InMemoryBackend(max_entries=2)
+    backend.incr(VERSION_KEY)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")  # b is now the least recently used
+    backend.set("c", b"3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+    assert backend.get("c") == b"3"
+    assert backend.get(VERSION_KEY) == 1  # Never evicted
+    assert len(backend) == 2
+    assert backend.evictions == 1
+
+
+def test_in_memory_backend_expires_entries():
+    backend = InMemoryBackend()
+    backend.set("a", b"1", ttl_seconds=-1)
+
+    assert backend.get("a") is None
+
+
+def test_invalidate_publishes_and_remote_invalidation_bumps_version():
+    published = []
+    cache = CatalogueCache(InMemoryBackend(), publish=lambda: published.append(1))
+    cache.get_or_load("services:0:10", lambda: [])
+
+    cache.invalidate()
+    cache.apply_remote_invalidation("")
+
+    assert published == [1]
+    assert cache.version() == 2
+    cache.get_or_load("services:0:10", lambda: [])
+    assert cache.stats()["misses"] == 2
+
+
+def test_cached_response_returns_304_for_matching_etag():
+    cache = CatalogueCache(InMemoryBackend())
+    body, etag = cache.get_or_load("services:0:10", lambda: [{"id": 1}])
+
+    assert cached_json_response(_request(), body, etag).status_code == 200
+    assert cached_json_response(_request(f'W/{etag}, "other"'), body, etag).status_code == 304
+    assert cached_json_response(_request('"other"'), body, etag).status_code == 200
+
+
+def test_service_list_cache_key_uses_clamped_page(monkeypatch):
+    pytest.importorskip("sqlalchemy")
+    from pagination import MAX_PAGE_SIZE
+    from routers import service_router
+
+    cache = CatalogueCache(InMemoryBackend())
+    monkeypatch.setattr(service_router, "catalogue_cache", cache)
+    calls = []
+    monkeypatch.setattr(service_router.service_crud, "get_services",
+                        lambda db, skip, limit: calls.append((skip, limit)) or [])
+
+    service_router.get_services(_request(), skip=-5, limit=10 ** 9, db=None)
+    service_router.get_services(_request(), skip=0, limit=MAX_PAGE_SIZE + 1, db=None)
+
+    assert calls == [(0, MAX_PAGE_SIZE)]
+    assert len(cache.backend) == 1
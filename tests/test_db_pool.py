@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from db_pool import instrument_engine
+
+
+def test_failed_statements_do_not_leak_start_times():
+    engine = instrument_engine(create_engine("sqlite://"))
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        assert connection.info["query_started_at"] == []
@@ -0,0 +1,67 @@
+import smtplib
+import pytest
+
+pytest.importorskip("dotenv")
+
+import email_dispatch
+from email_dispatch import SMTPConnection
+
+
+class FakeSMTP:
+    opened = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.fail_next = False
+        self.closed = False
+        FakeSMTP.opened.append(self)
+
+    def sendmail(self, from_addr, to_addr, message):
+        if self.fail_next:
+            raise smtplib.SMTPServerDisconnected("gone")
+        self.sent.append(to_addr)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_smtp(monkeypatch):
+    FakeSMTP.opened = []
+    monkeypatch.setattr(email_dispatch.smtplib, "SMTP", FakeSMTP)
+    monkeypatch.setattr(email_dispatch, "EMAIL_PASSWORD", None)
+
+
+def test_messages_share_one_connection():
+    connection = SMTPConnection(use_tls=False)
+    for i in range(3):
+        connection.send(f"user{i}@example.com", "Subject", "<p>Hi</p>", "Hi")
+
+    assert connection.connections_opened == 1
+    assert FakeSMTP.opened[0].sent == ["user0@example.com", "user1@example.com", "user2@example.com"]
+
+
+def test_connection_is_recycled_after_max_messages(monkeypatch):
+    monkeypatch.setattr(email_dispatch, "EMAIL_MAX_MESSAGES_PER_CONNECTION", 2)
+    connection = SMTPConnection(use_tls=False)
+    for i in range(3):
+        connection.send(f"user{i}@example.com", "Subject", "<p>Hi</p>")
+
+    assert connection.connections_opened == 2
+    assert FakeSMTP.opened[0].closed
+
+
+def test_failed_send_drops_the_connection():
+    connection = SMTPConnection(use_tls=False)
+    connection.send("a@example.com", "Subject", "<p>Hi</p>")
+    FakeSMTP.opened[0].fail_next = True
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        connection.send("b@example.com", "Subject", "<p>Hi</p>")
+    connection.send("b@example.com", "Subject", "<p>Hi</p>")
+
+    assert connection.connections_opened == 2
+    assert FakeSMTP.opened[1].sent == ["b@example.com"]
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from idempotency import REPLAY_HEADER
+from models import Booking, Service, User
+from routers import booking_router
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(booking_router.router, prefix="/bookings")
+    return TestClient(app)
+
+
+@pytest.fixture
+def parties(db):
+    provider = User(email="provider@example.com", full_name="Provider", hashed_password="x")
+    customers = [User(email=f"customer{i}@example.com", full_name=f"Customer {i}", hashed_password="x") for i in range(2)]
+    db.add_all([provider, *customers])
+    db.flush()
+    service = Service(name="Haircut", price=10.0, user_id=provider.id)
+    db.add(service)
+    db.commit()
+    return provider.id, service.id, [customer.id for customer in customers]
+
+
+def _booking(parties, customer: int = 0, hour: int = 9) -> dict:
+    provider_id, service_id, customer_ids = parties
+    start = datetime(2031, 3, 3, hour)
+    return {"user_id": customer_ids[customer], "provider_id": provider_id, "service_id": service_id,
+            "booking_date": start.isoformat(), "reminder_time": (start - timedelta(days=1)).isoformat()}
+
+
+def _post(client, body: dict, key: str = "key-1"):
+    return client.post("/bookings/bookings/", json=body, headers={"Idempotency-Key": key})
+
+
+def _booking_count(db) -> int:
+    return len(db.execute(select(Booking.id)).all())
+
+
+def test_retry_replays_the_stored_response(db, client, parties):
+    first = _post(client, _booking(parties))
+    retry = _post(client, _booking(parties))
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert retry.json() == first.json()
+    assert _booking_count(db) == 1
+
+
+def test_key_reused_for_a_different_request_is_refused(db, client, parties):
+    assert _post(client, _booking(parties)).status_code == 201
+
+    response = _post(client, _booking(parties, hour=11))
+
+    assert response.status_code == 422
+    assert _booking_count(db) == 1
+
+
+def test_keys_are_scoped_to_the_customer(db, client, parties):
+    assert _post(client, _booking(parties, customer=0)).status_code == 201
+
+    other = _post(client, _booking(parties, customer=1, hour=11))
+
+    assert other.status_code == 201
+    assert REPLAY_HEADER not in other.headers
+    assert _booking_count(db) == 2
+
+
+def test_expired_key_is_taken_over_instead_of_replayed(db, db_engine, client, parties):
+    assert _post(client, _booking(parties)).status_code == 201
+    with db_engine.begin() as connection:
+        connection.execute(text("UPDATE idempotency_keys SET created_at = now() - interval '30 days'"))
+
+    response = _post(client, _booking(parties, hour=11))
+
+    assert response.status_code == 201
+    assert REPLAY_HEADER not in response.headers
+    assert _booking_count(db) == 2
+
+
+def test_integrity_errors_other_than_the_overlap_are_not_reported_as_conflicts(db, client, parties, monkeypatch):
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+
+    # Any other constraint failing on the insert, here the users email index
+    monkeypatch.setattr(booking_router.booking_crud, "insert_booking_statement",
+                        lambda values: insert(User).values(email="provider@example.com"))
+
+    with pytest.raises(IntegrityError):
+        _post(client, _booking(parties))
+
+
+def test_overlap_violation_is_recognised_by_constraint_name():
+    from types import SimpleNamespace
+    from sqlalchemy.exc import IntegrityError
+
+    def error(constraint_name):
+        return IntegrityError("INSERT", {}, SimpleNamespace(diag=SimpleNamespace(constraint_name=constraint_name)))
+
+    assert booking_router._violated_constraint(error("ex_bookings_provider_no_overlap")) == \
+        booking_router.BOOKING_OVERLAP_CONSTRAINT
+    assert booking_router._violated_constraint(error("bookings_user_id_fkey")) != booking_router.BOOKING_OVERLAP_CONSTRAINT
+    assert booking_router._violated_constraint(IntegrityError("INSERT", {}, Exception())) is None
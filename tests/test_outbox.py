@@ -0,0 +1,150 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from outbox import OutboxRelay
+
+
+def test_backlog_is_counted_by_the_relay_at_most_once_per_interval(monkeypatch):
+    relay = OutboxRelay()
+    counts = []
+    monkeypatch.setattr(relay, "backlog", lambda: counts.append(1) or {"pending": len(counts)})
+
+    relay._maybe_refresh_backlog()
+    relay._maybe_refresh_backlog()
+
+    assert counts == [1]
+    assert relay.last_backlog == {"pending": 1}
+
+
+def test_metrics_scrape_reads_the_last_backlog_without_querying(monkeypatch):
+    pytest.importorskip("jwt")
+    import request_metrics
+
+    def no_query():
+        raise AssertionError("the scrape queried the outbox")
+
+    monkeypatch.setattr(request_metrics.outbox_relay, "backlog", no_query)
+    monkeypatch.setattr(request_metrics.outbox_relay, "last_backlog", None)
+    assert "outbox_pending " not in request_metrics.render_metrics()
+
+    monkeypatch.setattr(request_metrics.outbox_relay, "last_backlog",
+                        {"pending": 3, "oldest_pending_age_seconds": 12.5, "dead": 1})
+    rendered = request_metrics.render_metrics()
+    assert "outbox_pending 3.0" in rendered
+    assert "outbox_dead 1.0" in rendered
+
+
+def _message(db, message_id):
+    from models import OutboxMessage
+
+    db.expire_all()
+    return db.get(OutboxMessage, message_id)
+
+
+def test_relay_dispatches_by_kind_and_marks_sent(db, monkeypatch):
+    import outbox
+
+    delivered = []
+    monkeypatch.setattr(outbox, "HANDLERS", {"test.kind": lambda smtp, payload: delivered.append(payload)})
+    message = outbox.enqueue(db, "test.kind", {"to": "a@example.com"})
+    db.commit()
+
+    relay = OutboxRelay()
+    assert relay.relay_batch(None) == 1
+
+    assert delivered == [{"to": "a@example.com"}]
+    assert _message(db, message.id).sent_at is not None
+    assert relay.sent == 1
+    assert relay.relay_batch(None) == 0
+
+
+def test_failed_delivery_is_retried_with_backoff(db, monkeypatch):
+    from datetime import datetime, timezone
+    import outbox
+
+    def fail(smtp, payload):
+        raise RuntimeError("SMTP down")
+
+    monkeypatch.setattr(outbox, "HANDLERS", {"test.kind": fail})
+    message = outbox.enqueue(db, "test.kind", {})
+    db.commit()
+
+    relay = OutboxRelay()
+    relay.relay_batch(None)
+
+    row = _message(db, message.id)
+    assert (row.attempts, row.last_error, row.sent_at) == (1, "SMTP down", None)
+    assert row.available_at > datetime.now(timezone.utc)
+    assert relay.failed == 1
+    assert relay.relay_batch(None) == 0  # Backing off
+
+
+def test_relay_gives_up_after_max_attempts(db, monkeypatch):
+    import outbox
+
+    def fail(smtp, payload):
+        raise RuntimeError("rejected")
+
+    monkeypatch.setattr(outbox, "HANDLERS", {"test.kind": fail})
+    message = outbox.enqueue(db, "test.kind", {})
+    message.attempts = outbox.OUTBOX_MAX_ATTEMPTS - 1
+    db.commit()
+
+    relay = OutboxRelay()
+    relay.relay_batch(None)
+    row = _message(db, message.id)
+    row.available_at = row.created_at  # Backoff over
+    db.commit()
+
+    assert relay.dead == 1
+    assert relay.relay_batch(None) == 0
+    assert _message(db, message.id).attempts == outbox.OUTBOX_MAX_ATTEMPTS
+
+
+def test_claim_skips_locked_and_leased_rows(db, db_engine, monkeypatch):
+    from sqlalchemy import text
+    import outbox
+
+    delivered = []
+    monkeypatch.setattr(outbox, "HANDLERS", {"test.kind": lambda smtp, payload: delivered.append(payload["n"])})
+    locked = outbox.enqueue(db, "test.kind", {"n": 1})
+    outbox.enqueue(db, "test.kind", {"n": 2})
+    db.commit()
+
+    with db_engine.connect() as other:
+        other.execute(text("SELECT id FROM outbox WHERE id = :id FOR UPDATE"), {"id": locked.id})
+        assert OutboxRelay().relay_batch(None) == 1  # Doesn't wait on the locked row
+        other.rollback()
+    assert delivered == [2]
+
+    # A lease that hasn't run out keeps the row from other relays
+    db.execute(text("UPDATE outbox SET available_at = now() + interval '1 hour' WHERE id = :id"), {"id": locked.id})
+    db.commit()
+    assert OutboxRelay().relay_batch(None) == 0
+
+
+def test_handler_runs_without_holding_the_row_lock(db, db_engine, monkeypatch):
+    from sqlalchemy import text
+    import outbox
+
+    locked_elsewhere = []
+
+    def handler(smtp, payload):
+        with db_engine.connect() as other:
+            # NOWAIT raises if the relay still held the row lock while sending
+            other.execute(text("SELECT id FROM outbox WHERE id = :id FOR UPDATE NOWAIT"), {"id": payload["id"]})
+            other.rollback()
+        locked_elsewhere.append(payload["id"])
+
+    monkeypatch.setattr(outbox, "HANDLERS", {"test.kind": handler})
+    message = outbox.enqueue(db, "test.kind", {})
+    db.flush()
+    message.payload = {"id": message.id}
+    db.commit()
+
+    relay = OutboxRelay()
+    relay.relay_batch(None)
+
+    assert locked_elsewhere == [message.id]
+    assert relay.sent == 1
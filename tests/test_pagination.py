@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+from pagination import decode_cursor, encode_cursor
+
+
+def forged(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trips_with_its_types():
+    stamp = datetime(2026, 10, 18, 9, 30)
+    assert decode_cursor(encode_cursor(stamp, 42), datetime, int) == [stamp, 42]
+    assert decode_cursor(encode_cursor(12.5, 7), float, int) == [12.5, 7]
+    assert decode_cursor(forged([10, 7]), float, int) == [10.0, 7]
+
+
+@pytest.mark.parametrize("cursor, types", [
+    (forged(["x"]), (int,)),
+    (forged([True]), (int,)),
+    (forged([None, 3]), (float, int)),
+    (forged(["2026-10-18", 3]), (datetime, int)),
+    (forged([{"dt": "not a date"}, 3]), (datetime, int)),
+    (forged([{"dt": 5}, 3]), (datetime, int)),
+    (forged([1, 2]), (int,)),
+    (forged({"id": 1}), (int,)),
+    ("!!not base64!!", (int,)),
+])
+def test_forged_cursors_are_a_400(cursor, types):
+    with pytest.raises(HTTPException) as rejected:
+        decode_cursor(cursor, *types)
+    assert rejected.value.status_code == 400
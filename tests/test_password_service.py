@@ -0,0 +1,44 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+pytest.importorskip("passlib")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+from password_service import PasswordService
+
+
+@pytest.fixture
+def service():
+    service = PasswordService(pool_size=2, max_pending=2)
+    service._executor = ThreadPoolExecutor(max_workers=2)  # Same Future API, without spawning processes
+    yield service
+    service.shutdown()
+
+
+def test_sync_calls_release_their_slot(service):
+    hashed = service.hash_password("secret")
+
+    assert service.verify_password("secret", hashed)
+    assert not service.verify_password("wrong", hashed)
+    assert service.stats()["pending"] == 0
+    assert service.stats()["completed"] == 3
+
+
+def test_calls_beyond_max_pending_are_rejected(service):
+    service._pending = service.max_pending
+
+    with pytest.raises(HTTPException) as rejected:
+        service.hash_password("secret")
+    assert rejected.value.status_code == 503
+    assert service.rejected == 1
+
+
+def test_hash_many_keeps_the_input_order(service):
+    passwords = [f"password-{i}" for i in range(5)]
+
+    hashed = asyncio.run(service.hash_many(passwords))
+
+    assert [service.verify_password(p, h) for p, h in zip(passwords, hashed)] == [True] * 5
+    assert service.stats()["pending"] == 0
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("jwt")
+
+from rate_limit import (
+    DEFAULT_POLICIES, RATE_LIMIT_MAX_BODY_BYTES, ROUTE_LABEL_SCOPE_KEY,
+    InMemoryBucketStore, RateLimiter, RateLimitMiddleware, load_policies,
+)
+
+BOUNDARY = "limit-test-boundary"
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _call(middleware, client_host: str, content_type: str, body: bytes, path: str = "/auth/login/"):
+    statuses = []
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"",
+             "headers": [(b"content-type", content_type.encode())], "client": (client_host, 50000)}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    asyncio.run(middleware(scope, receive, send))
+    return statuses[0], scope
+
+
+def _multipart_login(username: str) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"username\"\r\n\r\n{username}\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"password\"\r\n\r\nguess\r\n"
+        f"--{BOUNDARY}--\r\n"
+    ).encode()
+
+
+@pytest.fixture
+def middleware():
+    limiter = RateLimiter(store=InMemoryBucketStore(), policies=load_policies(None), enabled=True)
+    return RateLimitMiddleware(_ok_app, limiter)
+
+
+def test_multipart_login_is_limited_per_email(middleware):
+    burst = next(int(p["rate"].split("/")[0]) for p in DEFAULT_POLICIES["POST /auth/login/"] if p["key"] == "email")
+    content_type = f"multipart/form-data; boundary={BOUNDARY}"
+    statuses = [
+        _call(middleware, f"10.0.0.{i}", content_type, _multipart_login("Victim@Example.com"))[0]
+        for i in range(burst + 1)
+    ]
+    assert statuses == [200] * burst + [429]
+
+
+def test_login_without_email_is_charged_to_the_ip(middleware):
+    burst = next(int(p["rate"].split("/")[0]) for p in DEFAULT_POLICIES["POST /auth/login/"] if p["key"] == "email")
+    statuses = [_call(middleware, "10.0.1.1", "application/json", b"{}")[0] for _ in range(burst + 1)]
+    assert statuses[-1] == 429
+
+
+def test_padded_login_body_is_refused(middleware):
+    body = b"username=victim%40example.com&password=guess&pad=" + b"x" * RATE_LIMIT_MAX_BODY_BYTES
+    status, _ = _call(middleware, "10.0.2.1", "application/x-www-form-urlencoded", body)
+    assert status == 413
+
+
+def test_rejections_carry_the_route_label(middleware):
+    scope = None
+    for _ in range(30):
+        status, scope = _call(middleware, "10.0.3.1", "application/json", b'{"email": "a@example.com"}', "/users/users/")
+        if status == 429:
+            break
+    assert status == 429
+    assert scope[ROUTE_LABEL_SCOPE_KEY] == "/users/users/"
+
+
+def test_bucket_store_never_grows_past_max_keys():
+    store = InMemoryBucketStore(max_keys=3)
+
+    async def main():
+        await store.take("a", rate=1 / 3600, burst=5)
+        await store.take("b", rate=1 / 3600, burst=5)
+        await store.take("c", rate=1 / 3600, burst=5)
+        await store.take("a", rate=1 / 3600, burst=5)  # b is now the least recently used
+        for key in ("d", "e"):
+            await store.take(key, rate=1 / 3600, burst=5)
+        return await store.take("a", rate=1 / 3600, burst=5)
+
+    allowed, _, tokens_left = asyncio.run(main())
+
+    assert len(store._buckets) == 3
+    assert list(store._buckets) == ["d", "e", "a"]
+    assert store.stats()["bucket_evictions"] == 2
+    assert allowed and tokens_left == pytest.approx(2, abs=0.01)  # a kept its state
+
+
+def test_bucket_store_drops_refilled_buckets_without_counting_evictions():
+    store = InMemoryBucketStore(max_keys=100)
+
+    async def main():
+        for key in ("a", "b"):
+            await store.take(key, rate=1000.0, burst=1)  # Refilled after a millisecond
+        await asyncio.sleep(0.01)
+        await store.take("c", rate=1000.0, burst=1)
+
+    asyncio.run(main())
+
+    assert list(store._buckets) == ["c"]
+    assert store.stats()["bucket_evictions"] == 0
@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("jinja2")
+
+from datetime import datetime
+from types import SimpleNamespace
+from sche import EMAIL_BOOKING_REMINDER, EMAIL_BOOKING_REMINDER_DIGEST, reminder_messages
+
+
+# Shaped like a row from ReminderDispatcher._reminder_query
+def _row(booking_id, customer_id, booking_date, service_name="Haircut"):
+    return SimpleNamespace(
+        id=booking_id,
+        booking_date=booking_date,
+        customer_id=customer_id,
+        customer_email=f"customer{customer_id}@example.com",
+        user_full_name=f"Customer {customer_id}",
+        provider_full_name="Provider",
+        service_name=service_name,
+    )
+
+
+def test_single_booking_gets_a_plain_reminder():
+    row = _row(1, 10, datetime(2030, 1, 1, 9))
+
+    assert reminder_messages([row]) == [(EMAIL_BOOKING_REMINDER, {
+        "to_email": "customer10@example.com",
+        "booking": {
+            "user_full_name": "Customer 10",
+            "provider_full_name": "Provider",
+            "service_name": "Haircut",
+            "booking_date": "2030-01-01 09:00:00",
+            "id": 1,
+        },
+    })]
+
+
+def test_bookings_of_one_customer_are_grouped_into_a_dated_digest():
+    rows = [
+        _row(1, 10, datetime(2030, 1, 1, 15), "Massage"),
+        _row(2, 20, datetime(2030, 1, 1, 10)),
+        _row(3, 10, datetime(2030, 1, 1, 9)),
+    ]
+
+    messages = reminder_messages(rows)
+
+    assert [kind for kind, payload in messages] == [EMAIL_BOOKING_REMINDER_DIGEST, EMAIL_BOOKING_REMINDER]
+    digest = messages[0][1]
+    assert digest["to_email"] == "customer10@example.com"
+    assert digest["digest"]["user_full_name"] == "Customer 10"
+    assert [booking["id"] for booking in digest["digest"]["bookings"]] == [3, 1]
+    assert messages[1][1]["booking"]["id"] == 2
+
+
+def test_without_digest_every_booking_gets_its_own_reminder():
+    rows = [_row(1, 10, datetime(2030, 1, 1, 15)), _row(2, 10, datetime(2030, 1, 1, 9))]
+
+    messages = reminder_messages(rows, digest=False)
+
+    assert [(kind, payload["booking"]["id"]) for kind, payload in messages] == [
+        (EMAIL_BOOKING_REMINDER, 1), (EMAIL_BOOKING_REMINDER, 2)
+    ]
+
+
+def test_no_rows_means_no_messages():
+    assert reminder_messages([]) == []
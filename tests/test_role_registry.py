@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from role_registry import RoleRegistry
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def execute(self, statement):
+        self.queries += 1
+        return self
+
+    def all(self):
+        return list(self.rows)
+
+
+def test_unknown_role_is_not_reloaded_again_within_the_miss_ttl():
+    db = FakeSession([(1, "admin")])
+    registry = RoleRegistry(miss_ttl_seconds=60)
+
+    assert registry.ids_for(db, ["Admin", "ghost"]) == ({"Admin": 1}, ["ghost"])
+    assert db.queries == 2  # Initial load, then one reload for the miss
+    assert registry.id_for(db, "ghost") is None
+    assert registry.id_for(db, "admin") == 1
+    assert db.queries == 2
+
+
+def test_miss_expires_and_invalidate_forgets_it():
+    db = FakeSession([(1, "admin")])
+    registry = RoleRegistry(miss_ttl_seconds=0)
+    registry.id_for(db, "ghost")
+    db.rows.append((2, "ghost"))
+
+    assert registry.id_for(db, "ghost") == 2  # The miss has already expired
+
+    registry = RoleRegistry(miss_ttl_seconds=60)
+    registry.id_for(db, "editor")
+    db.rows.append((3, "editor"))
+    registry.invalidate()  # As after creating the role in this process
+    assert registry.id_for(db, "editor") == 3
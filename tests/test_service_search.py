@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from models import CareerType, Service, User
+from crud_operations.service_crud import search_services
+
+
+def walk(db, sort: str) -> list:
+    ids, cursor = [], None
+    while True:
+        page = search_services(db, 2, cursor=cursor, sort=sort)
+        ids += [service.id for service in page.items]
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("sort", ["price_asc", "price_desc"])
+def test_price_sorts_page_through_every_priced_service(db, sort):
+    provider = User(email="provider@example.com", full_name="Provider", hashed_password="x")
+    career_type = CareerType(name="Trades", is_approved=True)
+    db.add_all([provider, career_type])
+    db.flush()
+    prices = [30.0, None, 10.0, 20.0, None, 10.0, 40.0]
+    services = [
+        Service(name=f"Service {i}", description="", price=price, category="repairs", user_id=provider.id,
+                career_type_id=career_type.id)
+        for i, price in enumerate(prices)
+    ]
+    db.add_all(services)
+    db.commit()
+
+    priced = sorted((s for s in services if s.price is not None), key=lambda s: (s.price, s.id),
+                    reverse=sort == "price_desc")
+
+    assert walk(db, sort) == [service.id for service in priced]
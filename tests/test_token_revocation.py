@@ -0,0 +1,93 @@
+import time
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from token_revocation import RevocationStore, _apply_after_commit
+import token_revocation
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = RevocationStore()
+    monkeypatch.setattr(token_revocation, "revocation_store", store)
+    return store
+
+
+@pytest.fixture
+def session():
+    with Session(create_engine("sqlite://")) as session:
+        session.execute(text("SELECT 1"))  # Begin a transaction, as the revoke_* statements do
+        yield session
+
+
+def test_revocation_is_applied_only_after_commit(store, session):
+    _apply_after_commit(session, {"kind": "version", "user_id": 7, "version": 3})
+    assert not store.is_revoked(7, {"tv": 2})
+
+    session.commit()
+
+    assert store.is_revoked(7, {"tv": 2})
+    assert not store.is_revoked(7, {"tv": 3})
+
+
+def test_rolled_back_revocation_is_discarded(store, session):
+    _apply_after_commit(session, {"kind": "version", "user_id": 7, "version": 3})
+    session.rollback()
+    session.execute(text("SELECT 1"))
+    session.commit()
+
+    assert not store.is_revoked(7, {"tv": 0})
+
+
+def test_listener_refuses_to_start_without_listen_support(store, monkeypatch):
+    monkeypatch.setattr(token_revocation, "engine", create_engine("sqlite://"))
+    listener = token_revocation.RevocationListener(store)
+
+    with pytest.raises(RuntimeError):
+        listener.start()
+    assert listener.stats()["listening"] is False
+
+
+def test_listener_loads_snapshot_before_start_returns(db, store):
+    from models import User
+
+    user = User(email="revoked@example.com", hashed_password="x", full_name="Revoked", token_version=4)
+    db.add(user)
+    db.commit()
+    listener = token_revocation.RevocationListener(store, poll_seconds=0.1)
+    listener.start()
+    try:
+        assert store.is_revoked(user.id, {"tv": 3})
+        assert not store.is_revoked(user.id, {"tv": 4})
+    finally:
+        listener.stop()
+
+
+def test_listener_dispatches_subscribed_channels(db_engine, store):
+    import threading
+
+    received = []
+    arrived = threading.Event()
+
+    def handler(payload):
+        received.append(payload)
+        if payload is not None:
+            arrived.set()
+
+    listener = token_revocation.RevocationListener(store, poll_seconds=0.1)
+    listener.subscribe("test_channel", handler)
+    listener.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:  # Resync call once LISTEN is in place
+            time.sleep(0.01)
+        with db_engine.begin() as connection:
+            connection.execute(text("SELECT pg_notify('test_channel', 'hello')"))
+        assert arrived.wait(5)
+    finally:
+        listener.stop()
+
+    assert received == [None, "hello"]
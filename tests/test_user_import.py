@@ -0,0 +1,59 @@
+import json
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import user_import
+from dependencies import admin_only
+from routers import admin_panel_user_management
+
+
+class _Admin:
+    id = 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Rows are validated and written elsewhere; this only checks the upload is still
+    # readable while the response streams
+    async def fake_import_chunk(chunk, seen, admin_id):
+        return [{"row": line_number, "email": raw["email"], "status": "created", "id": line_number}
+                for line_number, raw in chunk]
+
+    monkeypatch.setattr(user_import, "_import_chunk", fake_import_chunk)
+    app = FastAPI()
+    app.include_router(admin_panel_user_management.router)
+    app.dependency_overrides[admin_only] = lambda: _Admin()
+    return TestClient(app)
+
+
+def test_import_streams_a_multipart_upload(client):
+    csv_body = "email,full_name,password\n" + "".join(f"user{i}@example.com,User {i},secret{i}\n" for i in range(3))
+    response = client.post("/admin/users/import", files={"file": ("users.csv", csv_body.encode(), "text/csv")})
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["email"] for line in lines[:-1]] == [f"user{i}@example.com" for i in range(3)]
+    assert lines[-1] == {"summary": {"created": 3, "failed": 0}}
+
+
+def test_insert_users_skips_emails_taken_in_another_case(db):
+    from models import User
+    from crud_operations.bulk_user_crud import existing_emails, insert_users
+
+    db.add(User(email="taken@example.com", full_name="Taken", hashed_password="x"))
+    db.commit()
+    rows = [
+        {"email": email, "full_name": "New", "hashed_password": "x", "is_active": True, "role_ids": []}
+        for email in ("Taken@Example.com", "Fresh@Example.com")
+    ]
+
+    assert existing_emails(db, ["TAKEN@example.com"]) == {"taken@example.com"}
+    ids_by_email = insert_users(db, rows)  # As if the pre-check raced with a registration
+    db.commit()
+
+    assert list(ids_by_email) == ["Fresh@Example.com"]
+    assert db.query(User).count() == 2
@@ -0,0 +1,262 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from db_pool import engine
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "token_revocations"
+REVOCATION_POLL_SECONDS = float(os.getenv("REVOCATION_POLL_SECONDS", "5"))  # Max wait between notification checks
+REVOCATION_PRUNE_SECONDS = float(os.getenv("REVOCATION_PRUNE_SECONDS", "600"))  # Drop expired denylist entries
+
+BUMP_TOKEN_VERSION_SQL = text("UPDATE users SET token_version = token_version + 1 WHERE id = :user_id RETURNING token_version")
+INSERT_REVOKED_TOKEN_SQL = text(
+    "INSERT INTO revoked_tokens (jti, user_id, expires_at) VALUES (:jti, :user_id, :expires_at) "
+    "ON CONFLICT (jti) DO NOTHING"
+)
+BUMP_TOKEN_VERSIONS_SQL = text(
+    "UPDATE users SET token_version = token_version + 1 WHERE id = ANY(:user_ids) RETURNING id, token_version"
+)
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+# Session.info key holding the revocations to apply locally once the session commits
+PENDING_REVOCATIONS_KEY = "pending_revocations"
+
+
+# Everything a request needs to decide whether a token was revoked, held in memory:
+# the current token version of each user that has ever bumped it (tokens issued at an
+# older version are dead) and the ids of individually revoked, not yet expired tokens.
+class RevocationStore:
+    def __init__(self):
+        self._versions = {}  # user id -> current token version (only users with version > 0)
+        self._revoked = {}  # jti -> exp timestamp
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def is_revoked(self, user_id: int, payload: dict) -> bool:
+        # Tokens without a tv/jti claim count as version 0 and can't be denylisted
+        with self._lock:
+            if payload.get("tv", 0) < self._versions.get(user_id, 0) or payload.get("jti") in self._revoked:
+                self.rejected += 1
+                return True
+            return False
+
+    def apply_version(self, user_id: int, version: int):
+        with self._lock:
+            if version > self._versions.get(user_id, 0):
+                self._versions[user_id] = version
+
+    def apply_revoked(self, jti: str, exp: float):
+        if exp > time.time():
+            with self._lock:
+                self._revoked[jti] = exp
+
+    def apply_notification(self, payload: str):
+        self.apply_event(json.loads(payload))
+
+    def apply_event(self, event: dict):
+        if event["kind"] == "version":
+            self.apply_version(event["user_id"], event["version"])
+        elif event["kind"] == "versions":
+            for user_id, version in event["versions"]:
+                self.apply_version(user_id, version)
+        elif event["kind"] == "token":
+            self.apply_revoked(event["jti"], event["exp"])
+
+    def load_snapshot(self, connection):
+        versions = connection.execute(text("SELECT id, token_version FROM users WHERE token_version > 0")).all()
+        revoked = connection.execute(text(
+            "SELECT jti, extract(epoch FROM expires_at) FROM revoked_tokens WHERE expires_at > now()"
+        )).all()
+        with self._lock:
+            self._versions = {user_id: version for user_id, version in versions}
+            self._revoked = {jti: float(exp) for jti, exp in revoked}
+
+    def prune(self):
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"versioned_users": len(self._versions), "revoked_tokens": len(self._revoked), "rejected": self.rejected}
+
+
+revocation_store = RevocationStore()
+
+
+# pg_notify is transactional: other workers hear about it only once the caller commits
+def _notify_params(event: dict) -> dict:
+    return {"channel": REVOCATION_CHANNEL, "payload": json.dumps(event)}
+
+
+# This worker applies the change without waiting for its own notification, but likewise
+# only after the commit: a rolled back revocation must not leave a phantom token version
+# behind that rejects the user's valid tokens until restart.
+def _apply_after_commit(db, event: dict):
+    session = getattr(db, "sync_session", db)  # An AsyncSession wraps a Session
+    session.info.setdefault(PENDING_REVOCATIONS_KEY, []).append(event)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_revocations(session):
+    for pending in session.info.pop(PENDING_REVOCATIONS_KEY, ()):
+        revocation_store.apply_event(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_revocations(session):
+    session.info.pop(PENDING_REVOCATIONS_KEY, None)
+
+
+# Revoke one token (logout). The caller commits.
+def revoke_token(db, user_id: int, payload: dict):
+    jti = payload.get("jti")
+    if not jti:
+        return
+    db.execute(INSERT_REVOKED_TOKEN_SQL, {
+        "jti": jti, "user_id": user_id, "expires_at": datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+    })
+    revocation = {"kind": "token", "jti": jti, "exp": payload["exp"]}
+    db.execute(NOTIFY_SQL, _notify_params(revocation))
+    _apply_after_commit(db, revocation)
+
+
+# Revoke every token issued to a user so far (logout everywhere, deactivation,
+# password or role changes). The caller commits.
+def revoke_all_tokens(db, user_id: int):
+    version = db.execute(BUMP_TOKEN_VERSION_SQL, {"user_id": user_id}).scalar()
+    if version is None:
+        return
+    revocation = {"kind": "version", "user_id": user_id, "version": version}
+    db.execute(NOTIFY_SQL, _notify_params(revocation))
+    _apply_after_commit(db, revocation)
+
+
+# Same as revoke_all_tokens for many users at once: one UPDATE, and notifications
+# batched so each payload stays well under Postgres' 8000-byte limit
+def revoke_all_tokens_for_users(db, user_ids: list, batch_size: int = 200):
+    if not user_ids:
+        return
+    versions = [list(row) for row in db.execute(BUMP_TOKEN_VERSIONS_SQL, {"user_ids": list(user_ids)}).all()]
+    for start in range(0, len(versions), batch_size):
+        batch = versions[start:start + batch_size]
+        revocation = {"kind": "versions", "versions": batch}
+        db.execute(NOTIFY_SQL, _notify_params(revocation))
+        _apply_after_commit(db, revocation)
+
+
+# Notifications received within timeout seconds, returning as soon as there are any.
+# psycopg2 queues them on the connection after poll(); psycopg 3 (3.2+) yields them
+# from notifies(). Both notification types carry .channel and .payload.
+def _wait_for_notifications(dbapi_connection, driver: str, timeout: float) -> list:
+    if driver == "psycopg2":
+        if not select.select([dbapi_connection], [], [], timeout)[0]:
+            return []
+        dbapi_connection.poll()
+        notifications = list(dbapi_connection.notifies)
+        del dbapi_connection.notifies[:]
+        return notifications
+    return list(dbapi_connection.notifies(timeout=timeout, stop_after=1))
+
+
+LISTEN_DRIVERS = {"psycopg2", "psycopg"}
+
+
+# Keeps revocation_store in sync across worker processes: LISTENs on a dedicated
+# autocommit connection, and reloads the full snapshot after every (re)connect so
+# notifications missed while disconnected are not lost. start() loads the snapshot
+# before the first request and refuses to start when other workers' revocations
+# could never arrive, rather than accepting revoked tokens after a restart.
+# Other modules can subscribe() to further channels over the same connection.
+class RevocationListener:
+    def __init__(self, store: RevocationStore = revocation_store, poll_seconds: float = REVOCATION_POLL_SECONDS):
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self._handlers = {}  # channel -> handler(payload)
+        self._thread = None
+        self._stopping = threading.Event()
+        self.notifications = 0
+        self.reconnects = 0
+
+    # handler(payload) runs on the listener thread for each notification on channel, and
+    # with None after every (re)connect, since notifications may have been missed meanwhile.
+    # Subscribe before start().
+    def subscribe(self, channel: str, handler):
+        self._handlers[channel] = handler
+
+    def _listen(self):
+        connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            for channel in (REVOCATION_CHANNEL, *self._handlers):
+                connection.execute(text(f"LISTEN {channel}"))
+            self.store.load_snapshot(connection)  # After LISTEN, so nothing falls in between
+            for handler in self._handlers.values():
+                handler(None)
+            dbapi_connection = connection.connection.dbapi_connection
+            last_pruned = time.monotonic()
+            while not self._stopping.is_set():
+                for notification in _wait_for_notifications(dbapi_connection, engine.dialect.driver, self.poll_seconds):
+                    self.notifications += 1
+                    if notification.channel != REVOCATION_CHANNEL:
+                        self._handlers[notification.channel](notification.payload)
+                        continue
+                    try:
+                        self.store.apply_notification(notification.payload)
+                    except (ValueError, KeyError):
+                        logger.warning("Ignoring malformed revocation notification: %r", notification.payload)
+                if time.monotonic() - last_pruned >= REVOCATION_PRUNE_SECONDS:
+                    self.store.prune()
+                    connection.execute(text("DELETE FROM revoked_tokens WHERE expires_at <= now()"))
+                    last_pruned = time.monotonic()
+        finally:
+            connection.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Token revocation listener disconnected; reconnecting")
+                self.reconnects += 1
+                self._stopping.wait(self.poll_seconds)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if engine.dialect.driver not in LISTEN_DRIVERS:
+            raise RuntimeError(
+                "Token revocation needs DATABASE_URL with postgresql+psycopg2:// or postgresql+psycopg://, "
+                f"not driver '{engine.dialect.driver}'"
+            )
+        with engine.connect() as connection:
+            self.store.load_snapshot(connection)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="token-revocation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds + 5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            **self.store.stats(),
+            "listening": self._thread is not None,
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
+
+
+revocation_listener = RevocationListener()
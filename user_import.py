@@ -0,0 +1,209 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal
+from schemas import BulkUserRow
+from crud_operations.bulk_user_crud import existing_emails, role_ids_by_name, insert_users
+from password_service import hash_passwords
+from email_utils import queue_verification_emails
+from utils import log_activity
+
+load_dotenv()
+
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))  # Rows validated, hashed and inserted together
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "100000"))
+BULK_IMPORT_SPOOL_MAX_MEMORY = int(os.getenv("BULK_IMPORT_SPOOL_MAX_MEMORY", str(1024 * 1024)))  # Larger copies go to disk
+
+IMPORT_FORMATS = {"csv", "ndjson"}
+
+
+def detect_format(requested: str, filename: str, content_type: str) -> str:
+    if requested:
+        fmt = requested.lower()
+    elif (filename or "").lower().endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or ""):
+        fmt = "ndjson"
+    else:
+        fmt = "csv"
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format '{requested}'")
+    return fmt
+
+
+def _csv_row(row: dict) -> dict:
+    # Blank cells fall back to the schema defaults; roles are "admin;provider"
+    row = {key: value for key, value in row.items() if key and value not in (None, "")}
+    if "roles" in row:
+        row["roles"] = [name.strip() for name in row["roles"].split(";") if name.strip()]
+    if "is_active" in row:
+        row["is_active"] = row["is_active"].strip().lower() in {"true", "1", "yes", "on"}
+    return row
+
+
+# The UploadFile belongs to the request and may be closed as soon as the endpoint returns,
+# before the streamed response has read it, so the import works from its own copy
+async def spool_upload(upload) -> tempfile.SpooledTemporaryFile:
+    spooled = tempfile.SpooledTemporaryFile(max_size=BULK_IMPORT_SPOOL_MAX_MEMORY)
+    await upload.seek(0)
+    await run_in_threadpool(shutil.copyfileobj, upload.file, spooled)
+    spooled.seek(0)
+    return spooled
+
+
+# Yields (row number, dict) or (row number, error message), reading the spooled upload
+# incrementally so the file is never held in memory as a whole
+def iter_rows(binary_file, fmt: str):
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, _csv_row(row)
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        yield line_number, row if isinstance(row, dict) else "Each line must be a JSON object"
+
+
+def _lookup(emails: list, role_names: set) -> tuple:
+    db = SessionLocal()
+    try:
+        return existing_emails(db, emails), role_ids_by_name(db, role_names)
+    finally:
+        db.close()
+
+
+def _write(rows: list, admin_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        ids_by_email = insert_users(db, rows)
+        queue_verification_emails(db, list(ids_by_email))  # Same transaction as the users they verify
+        db.commit()
+        if ids_by_email:
+            # One log entry per chunk instead of one per user
+            log_activity(db=db, user_id=admin_id, action="Bulk Create Users",
+                         details=f"Imported {len(ids_by_email)} user(s)")
+        return ids_by_email
+    finally:
+        db.close()
+
+
+# Validates, hashes and inserts one chunk; returns the per-row results in input order
+async def _import_chunk(chunk: list, seen: set, admin_id: int) -> list:
+    results, candidates = [], []
+    for line_number, raw in chunk:
+        if isinstance(raw, str):
+            results.append({"row": line_number, "status": "error", "error": raw})
+            continue
+        try:
+            row = BulkUserRow.model_validate(raw)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results.append({"row": line_number, "email": raw.get("email"), "status": "error", "error": errors})
+            continue
+        if row.email.lower() in seen:
+            results.append({"row": line_number, "email": row.email, "status": "error", "error": "Duplicate email in upload"})
+            continue
+        seen.add(row.email.lower())
+        result = {"row": line_number, "email": row.email}
+        results.append(result)
+        candidates.append((result, row))
+
+    if not candidates:
+        return results
+
+    taken, role_ids = await run_in_threadpool(
+        _lookup, [row.email for _, row in candidates], {name for _, row in candidates for name in row.roles}
+    )
+    accepted = []
+    for result, row in candidates:
+        unknown = [name for name in row.roles if name.lower() not in role_ids]
+        if row.email.lower() in taken:
+            result.update(status="error", error="Email already registered")
+        elif unknown:
+            result.update(status="error", error=f"Unknown role(s): {', '.join(unknown)}")
+        else:
+            accepted.append((result, row))
+
+    if not accepted:
+        return results
+
+    hashed = await hash_passwords([row.password for _, row in accepted])
+    rows = [
+        {
+            "email": row.email,
+            "full_name": row.full_name,
+            "hashed_password": hashed_password,
+            "is_active": row.is_active,
+            "role_ids": [role_ids[name.lower()] for name in row.roles],
+        }
+        for (_, row), hashed_password in zip(accepted, hashed)
+    ]
+    try:
+        ids_by_email = await run_in_threadpool(_write, rows, admin_id)
+    except Exception as e:
+        for result, _ in accepted:
+            result.update(status="error", error=f"Chunk failed: {e}")
+        return results
+
+    for result, row in accepted:
+        user_id = ids_by_email.get(row.email)
+        if user_id is None:
+            # Registered concurrently between the lookup and the insert
+            result.update(status="error", error="Email already registered")
+            continue
+        result.update(status="created", id=user_id)
+    return results
+
+
+# NDJSON result stream: one line per input row, then a summary line.
+# Takes ownership of binary_file (see spool_upload) and closes it when done.
+async def import_users(binary_file, fmt: str, admin_id: int):
+    try:
+        async for line in _import_lines(binary_file, fmt, admin_id):
+            yield line
+    finally:
+        binary_file.close()
+
+
+async def _import_lines(binary_file, fmt: str, admin_id: int):
+    seen = set()
+    created = failed = total = 0
+    chunk = []
+
+    async def flush():
+        nonlocal created, failed
+        lines = []
+        for result in await _import_chunk(chunk, seen, admin_id):
+            if result["status"] == "created":
+                created += 1
+            else:
+                failed += 1
+            lines.append(json.dumps(result) + "\n")
+        chunk.clear()
+        return "".join(lines)
+
+    for line_number, raw in iter_rows(binary_file, fmt):
+        total += 1
+        if total > BULK_IMPORT_MAX_ROWS:
+            yield json.dumps({"row": line_number, "status": "error",
+                              "error": f"Import stopped after {BULK_IMPORT_MAX_ROWS} rows"}) + "\n"
+            break
+        chunk.append((line_number, raw))
+        if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+            yield await flush()
+    if chunk:
+        yield await flush()
+
+    yield json.dumps({"summary": {"created": created, "failed": failed}}) + "\n"